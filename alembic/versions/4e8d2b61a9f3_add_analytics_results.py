@@ -0,0 +1,37 @@
+"""Add analytics results
+
+Revision ID: 4e8d2b61a9f3
+Revises: c3a91f5e7d20
+Create Date: 2026-10-18 11:40:05.118342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '4e8d2b61a9f3'
+down_revision: Union[str, Sequence[str], None] = 'c3a91f5e7d20'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('analytics_results',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('metric', sa.String(), nullable=False),
+    sa.Column('cohort', sa.String(), nullable=True),
+    sa.Column('payload', sa.JSON(), nullable=False),
+    sa.Column('computed_at', sa.DateTime(timezone=True), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_analytics_results_metric'), 'analytics_results', ['metric'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index(op.f('ix_analytics_results_metric'), table_name='analytics_results')
+    op.drop_table('analytics_results')
@@ -0,0 +1,48 @@
+"""Add notification outbox
+
+Revision ID: 5f2c7a9e13d8
+Revises: e0c6a8f41b97
+Create Date: 2026-10-18 16:48:33.215904
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5f2c7a9e13d8'
+down_revision: Union[str, Sequence[str], None] = 'e0c6a8f41b97'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('notification_outbox',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('fire_at', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('chat_id', sa.String(), nullable=True),
+    sa.Column('status', sa.String(), nullable=False),
+    sa.Column('attempts', sa.Integer(), nullable=False),
+    sa.Column('next_attempt_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('last_error', sa.String(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.Column('sent_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'habit_id', 'fire_at', name='uq_notification_outbox_user_habit_fire')
+    )
+    op.create_index('ix_notification_outbox_claimable', 'notification_outbox', ['next_attempt_at'], unique=False,
+                    postgresql_where=sa.text("status IN ('pending', 'retrying', 'sending')"))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_notification_outbox_claimable', table_name='notification_outbox',
+                  postgresql_where=sa.text("status IN ('pending', 'retrying', 'sending')"))
+    op.drop_table('notification_outbox')
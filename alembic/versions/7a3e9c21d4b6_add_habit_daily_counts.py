@@ -0,0 +1,34 @@
+"""Add habit daily counts
+
+Revision ID: 7a3e9c21d4b6
+Revises: 5f2c7a9e13d8
+Create Date: 2026-10-18 19:05:12.638204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '7a3e9c21d4b6'
+down_revision: Union[str, Sequence[str], None] = '5f2c7a9e13d8'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('habit_daily_counts',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('habit_id', 'day')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('habit_daily_counts')
@@ -0,0 +1,32 @@
+"""Add records (habit_id, date) index
+
+Revision ID: 9b17c4e0d5a2
+Revises: 4e8d2b61a9f3
+Create Date: 2026-10-18 13:05:47.630912
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '9b17c4e0d5a2'
+down_revision: Union[str, Sequence[str], None] = '4e8d2b61a9f3'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Built concurrently so existing installs keep accepting check-ins
+    with op.get_context().autocommit_block():
+        op.create_index('ix_records_habit_id_date', 'records', ['habit_id', 'date', 'id'],
+                        unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_records_habit_id_date', table_name='records', postgresql_concurrently=True)
@@ -0,0 +1,37 @@
+"""Add habit stats
+
+Revision ID: c3a91f5e7d20
+Revises: 2fd06a584787
+Create Date: 2026-10-18 10:12:31.402117
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c3a91f5e7d20'
+down_revision: Union[str, Sequence[str], None] = '2fd06a584787'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('habit_stats',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('total_completions', sa.Integer(), nullable=False),
+    sa.Column('current_streak', sa.Integer(), nullable=False),
+    sa.Column('longest_streak', sa.Integer(), nullable=False),
+    sa.Column('last_completion', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('recent_days', sa.Integer(), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('habit_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('habit_stats')
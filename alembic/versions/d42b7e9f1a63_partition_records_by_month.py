@@ -0,0 +1,85 @@
+"""Partition records by month
+
+Revision ID: d42b7e9f1a63
+Revises: b81f4d2c6e05
+Create Date: 2026-10-18 21:37:02.554810
+
+"""
+import datetime
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd42b7e9f1a63'
+down_revision: Union[str, Sequence[str], None] = 'b81f4d2c6e05'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Months created beyond the current one; the partitions task keeps this window afterwards
+MONTHS_AHEAD = 3
+
+
+def _next_month(month: datetime.date) -> datetime.date:
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Rewrites the whole table: run during a maintenance window on large installs
+    op.execute("ALTER TABLE records RENAME TO records_unpartitioned")
+    op.execute("ALTER INDEX ix_records_habit_id_date RENAME TO ix_records_unpartitioned_habit_id_date")
+    op.execute("ALTER TABLE records_unpartitioned RENAME CONSTRAINT records_pkey TO records_unpartitioned_pkey")
+    op.execute("ALTER SEQUENCE records_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE records (
+            id integer NOT NULL DEFAULT nextval('records_id_seq'),
+            habit_id integer REFERENCES habits (id),
+            date timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT records_pkey PRIMARY KEY (id, date)
+        ) PARTITION BY RANGE (date)
+    """)
+    op.execute("ALTER SEQUENCE records_id_seq OWNED BY records.id")
+    op.execute("CREATE TABLE records_default PARTITION OF records DEFAULT")
+
+    bind = op.get_bind()
+    oldest = bind.execute(sa.text("SELECT min(date) FROM records_unpartitioned")).scalar()
+    today = datetime.datetime.now(datetime.UTC).date().replace(day=1)
+    month = min(oldest.astimezone(datetime.UTC).date().replace(day=1), today) if oldest else today
+    last = today
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while month <= last:
+        upper = _next_month(month)
+        op.execute(
+            f"CREATE TABLE records_y{month.year}m{month.month:02d} PARTITION OF records "
+            f"FOR VALUES FROM ('{month.isoformat()} 00:00:00+00') TO ('{upper.isoformat()} 00:00:00+00')"
+        )
+        month = upper
+
+    op.execute("INSERT INTO records (id, habit_id, date) SELECT id, habit_id, date FROM records_unpartitioned")
+    op.execute("DROP TABLE records_unpartitioned")
+    op.create_index('ix_records_habit_id_date', 'records', ['habit_id', 'date', 'id'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.execute("ALTER TABLE records RENAME TO records_partitioned")
+    op.execute("ALTER INDEX ix_records_habit_id_date RENAME TO ix_records_partitioned_habit_id_date")
+    op.execute("ALTER TABLE records_partitioned RENAME CONSTRAINT records_pkey TO records_partitioned_pkey")
+    op.execute("ALTER SEQUENCE records_id_seq OWNED BY NONE")
+    op.execute("""
+        CREATE TABLE records (
+            id integer NOT NULL DEFAULT nextval('records_id_seq'),
+            habit_id integer REFERENCES habits (id),
+            date timestamp with time zone NOT NULL DEFAULT now(),
+            CONSTRAINT records_pkey PRIMARY KEY (id)
+        )
+    """)
+    op.execute("ALTER SEQUENCE records_id_seq OWNED BY records.id")
+    op.execute("INSERT INTO records (id, habit_id, date) SELECT id, habit_id, date FROM records_partitioned")
+    # Dropping the parent drops every partition with it
+    op.execute("DROP TABLE records_partitioned")
+    op.create_index('ix_records_habit_id_date', 'records', ['habit_id', 'date', 'id'], unique=False)
@@ -0,0 +1,34 @@
+"""Add habits next_reminder_at
+
+Revision ID: e0c6a8f41b97
+Revises: 9b17c4e0d5a2
+Create Date: 2026-10-18 15:22:10.508471
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e0c6a8f41b97'
+down_revision: Union[str, Sequence[str], None] = '9b17c4e0d5a2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('habits', sa.Column('next_reminder_at', sa.DateTime(timezone=True), nullable=True))
+    # Reminders already in the past have been sent by the old polling task
+    op.execute("UPDATE habits SET next_reminder_at = reminder_date WHERE reminder_date > now()")
+    op.create_index('ix_habits_next_reminder_at', 'habits', ['next_reminder_at'], unique=False,
+                    postgresql_where=sa.text('next_reminder_at IS NOT NULL'))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_habits_next_reminder_at', table_name='habits',
+                  postgresql_where=sa.text('next_reminder_at IS NOT NULL'))
+    op.drop_column('habits', 'next_reminder_at')
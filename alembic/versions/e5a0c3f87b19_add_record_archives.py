@@ -0,0 +1,37 @@
+"""Add record archives
+
+Revision ID: e5a0c3f87b19
+Revises: d42b7e9f1a63
+Create Date: 2026-10-18 22:05:41.318207
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5a0c3f87b19'
+down_revision: Union[str, Sequence[str], None] = 'd42b7e9f1a63'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('record_archives',
+    sa.Column('habit_id', sa.Integer(), nullable=False),
+    sa.Column('version', sa.Integer(), nullable=False),
+    sa.Column('archived_before', sa.DateTime(timezone=True), nullable=False),
+    sa.Column('record_count', sa.Integer(), nullable=False),
+    sa.Column('archived_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['habit_id'], ['habits.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('habit_id')
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    # Archived records only exist in the files under ARCHIVE_DIR afterwards
+    op.drop_table('record_archives')
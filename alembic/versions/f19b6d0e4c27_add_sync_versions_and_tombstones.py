@@ -0,0 +1,54 @@
+"""Add sync versions and tombstones
+
+Revision ID: f19b6d0e4c27
+Revises: e5a0c3f87b19
+Create Date: 2026-10-18 23:12:09.604415
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f19b6d0e4c27'
+down_revision: Union[str, Sequence[str], None] = 'e5a0c3f87b19'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+CURRENT_XID = sa.text('pg_current_xact_id()::text::bigint')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('users', sa.Column('change_version', sa.BigInteger(), server_default='0', nullable=False))
+    for table in ('habits', 'records'):
+        # A volatile default would rewrite the table, so existing rows get version 0 first;
+        # clients start with a full sync anyway
+        op.add_column(table, sa.Column('change_version', sa.BigInteger(), server_default='0', nullable=False))
+        op.alter_column(table, 'change_version', server_default=CURRENT_XID)
+    op.create_index('ix_habits_user_id_change_version', 'habits', ['user_id', 'change_version'], unique=False)
+    op.create_index('ix_records_habit_id_change_version', 'records', ['habit_id', 'change_version'], unique=False)
+    op.create_table('sync_tombstones',
+    sa.Column('id', sa.BigInteger(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('kind', sa.String(), nullable=False),
+    sa.Column('object_id', sa.Integer(), nullable=False),
+    sa.Column('change_version', sa.BigInteger(), server_default=CURRENT_XID, nullable=False),
+    sa.Column('deleted_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=False),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sync_tombstones_user_id_change_version', 'sync_tombstones', ['user_id', 'change_version'], unique=False)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sync_tombstones_user_id_change_version', table_name='sync_tombstones')
+    op.drop_table('sync_tombstones')
+    op.drop_index('ix_records_habit_id_change_version', table_name='records')
+    op.drop_index('ix_habits_user_id_change_version', table_name='habits')
+    for table in ('records', 'habits'):
+        op.drop_column(table, 'change_version')
+    op.drop_column('users', 'change_version')
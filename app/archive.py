@@ -0,0 +1,221 @@
+"""
+Cold record archive.
+
+The archive task (app.tasks.archive) moves records older than
+ARCHIVE_AFTER_DAYS out of Postgres into one file per habit under
+ARCHIVE_DIR: a 2 x n int64 .npy array whose first row holds the record
+timestamps (microseconds since the Unix epoch, UTC) and whose second row
+holds the record ids, sorted by (date, id). `record_archives` names the
+current file of each habit and the bound below which its records may be
+archived. Every archival run writes a new file version and switches the row
+over in the transaction that deletes the records, so a reader sees either
+the old or the new file, never a half-written one.
+
+Files are opened with np.load(mmap_mode="r"), so reading a page costs two
+binary searches and only touches the pages it returns. NumPy cannot
+memory-map members of a compressed .npz, so the files stay uncompressed; at
+16 bytes per record they are still far smaller than a records row plus its
+index entry. Deleting archived records writes a new version without them,
+under the same habit lock and version switch as archival.
+"""
+import datetime
+import os
+from collections import Counter
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional
+
+import numpy as np
+
+from app import stats
+from app.core.config import settings
+
+EPOCH = datetime.datetime(1970, 1, 1, tzinfo=datetime.UTC)
+
+
+class ArchivedRecord(NamedTuple):
+    """Same shape as the (habit_id, date, id) rows crud.get_records reads from Postgres."""
+    habit_id: int
+    date: datetime.datetime
+    id: int
+
+
+def to_micros(moment: datetime.datetime) -> int:
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.UTC)
+    return (moment - EPOCH) // datetime.timedelta(microseconds=1)
+
+
+def from_micros(value: int) -> datetime.datetime:
+    return EPOCH + datetime.timedelta(microseconds=int(value))
+
+
+def archive_path(habit_id: int, version: int) -> Path:
+    # Fan out over 256 directories so none of them grows unbounded
+    return Path(settings.ARCHIVE_DIR) / f"{habit_id % 256:02x}" / f"habit-{habit_id}-v{version}.npy"
+
+
+def from_rows(rows) -> np.ndarray:
+    """Build a sorted archive array from (date, id) rows."""
+    array = np.array([(to_micros(date), record_id) for date, record_id in rows], dtype=np.int64).reshape(-1, 2).T
+    return array[:, np.lexsort((array[1], array[0]))]
+
+
+def merge(first: np.ndarray, second: np.ndarray) -> np.ndarray:
+    array = np.concatenate([first, second], axis=1)
+    return array[:, np.lexsort((array[1], array[0]))]
+
+
+def write(habit_id: int, version: int, array: np.ndarray) -> Path:
+    """Durably write a new archive file version; the file only appears once it is complete."""
+    path = archive_path(habit_id, version)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    partial = path.with_suffix(".partial")
+    with open(partial, "wb") as file:
+        np.save(file, np.ascontiguousarray(array, dtype=np.int64))
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(partial, path)
+    return path
+
+
+def remove(array: np.ndarray, habit_id: int, record_ids: Iterable[int]) -> tuple[np.ndarray, list[ArchivedRecord]]:
+    """Split the records with the given ids off an archive; returns the remaining array and the removed records."""
+    hit = np.isin(array[1], list(record_ids))
+    removed = [
+        ArchivedRecord(habit_id, from_micros(date), record_id)
+        for date, record_id in zip(array[0][hit].tolist(), array[1][hit].tolist())
+    ]
+    return np.ascontiguousarray(array[:, ~hit]), removed
+
+
+@lru_cache(maxsize=256)
+def load(habit_id: int, version: int) -> np.ndarray:
+    """Memory-map an archive file; versions never change once written, so mappings are cached."""
+    return np.load(archive_path(habit_id, version), mmap_mode="r")
+
+
+def discard(habit_id: int, keep: Iterable[Optional[int]] = ()):
+    """Delete a habit's archive files, except the versions in `keep`."""
+    kept = {archive_path(habit_id, version) for version in keep if version is not None}
+    for path in archive_path(habit_id, 0).parent.glob(f"habit-{habit_id}-v*.npy"):
+        if path not in kept:
+            path.unlink(missing_ok=True)
+
+
+def reaches(
+    archived_before: datetime.datetime,
+    date_from: Optional[datetime.datetime] = None,
+    after: Optional[tuple[datetime.datetime, int]] = None,
+) -> bool:
+    """Whether a query starting at `date_from` or the cursor `after` can touch archived records."""
+    bounds = [to_micros(moment) for moment in (date_from, after and after[0]) if moment is not None]
+    return not bounds or max(bounds) < to_micros(archived_before)
+
+
+def select_range(
+    array: np.ndarray,
+    habit_id: int,
+    date_from: Optional[datetime.datetime] = None,
+    date_to: Optional[datetime.datetime] = None,
+    after: Optional[tuple[datetime.datetime, int]] = None,
+    limit: Optional[int] = None,
+) -> list[ArchivedRecord]:
+    """Archived records in [date_from, date_to) following the (date, id) cursor `after`, ordered by (date, id)."""
+    dates, ids = array[0], array[1]
+    start, stop = 0, len(dates)
+    if date_from is not None:
+        start = int(np.searchsorted(dates, to_micros(date_from), "left"))
+    if date_to is not None:
+        stop = int(np.searchsorted(dates, to_micros(date_to), "left"))
+    if after is not None:
+        moment = to_micros(after[0])
+        first = int(np.searchsorted(dates, moment, "left"))
+        last = int(np.searchsorted(dates, moment, "right"))
+        start = max(start, first + int(np.searchsorted(ids[first:last], after[1], "right")))
+    if limit is not None:
+        stop = min(stop, start + limit)
+    return [
+        ArchivedRecord(habit_id, from_micros(date), record_id)
+        for date, record_id in zip(dates[start:stop].tolist(), ids[start:stop].tolist())
+    ]
+
+
+def days_of(array: np.ndarray) -> set[datetime.date]:
+    """Distinct record days (STATS_TIMEZONE) of an archive."""
+    return {stats.record_day(from_micros(value)) for value in np.unique(array[0]).tolist()}
+
+
+def add_to_stats(
+    array: np.ndarray, days: Iterable[datetime.date], total: int, last_completion: Optional[datetime.datetime],
+) -> tuple[list[datetime.date], int, Optional[datetime.datetime]]:
+    """Fold an archive into the (days, total, last completion) inputs of stats.compute_stats."""
+    if not array.shape[1]:
+        # Every archived record was deleted
+        return list(days), total, last_completion
+    last_archived = from_micros(array[0, -1])
+    return (
+        sorted(days_of(array).union(days)),
+        total + array.shape[1],
+        max(last_completion or last_archived, last_archived),
+    )
+
+
+def daily_counts(array: np.ndarray) -> Counter:
+    return Counter(stats.record_day(from_micros(value)) for value in array[0].tolist())
+
+
+class ExportMerger:
+    """
+    Interleaves archived records into export rows.
+
+    Rows are (habit_id, title, description, reminder_date, record_id, date)
+    ordered by habit, then (date, id), as crud.iter_export_rows streams them;
+    `archives` maps habit ids to their archive arrays.
+    """
+
+    def __init__(self, archives: dict[int, np.ndarray]):
+        self.archives = archives
+        self.habit = None
+        self.array = None
+        self.position = 0
+
+    def _archived(self, until: Optional[tuple[int, int]] = None) -> list[tuple]:
+        """Archived rows of the current habit up to the (micros, id) key `until`, or all that are left."""
+        if self.array is None:
+            return []
+        dates, ids = self.array[0], self.array[1]
+        stop = len(dates)
+        if until is not None:
+            stop = max(self.position, int(np.searchsorted(dates, until[0], "left")))
+            while stop < len(dates) and dates[stop] == until[0] and ids[stop] < until[1]:
+                stop += 1
+        habit_id, title, description, reminder_date = self.habit
+        rows = [
+            (habit_id, title, description, reminder_date, record_id, from_micros(date))
+            for date, record_id in zip(dates[self.position:stop].tolist(), ids[self.position:stop].tolist())
+        ]
+        self.position = stop
+        return rows
+
+    def feed(self, rows) -> list[tuple]:
+        merged = []
+        for row in rows:
+            if self.habit is None or row[0] != self.habit[0]:
+                merged.extend(self._archived())
+                self.habit = tuple(row[:4])
+                self.array = self.archives.get(row[0])
+                self.position = 0
+            if row[4] is None:
+                # A habit without live records: its archived ones, if any, replace the empty row
+                if self.array is None:
+                    merged.append(tuple(row))
+                continue
+            merged.extend(self._archived((to_micros(row[5]), row[4])))
+            merged.append(tuple(row))
+        return merged
+
+    def finish(self) -> list[tuple]:
+        rows = self._archived()
+        self.habit = self.array = None
+        return rows
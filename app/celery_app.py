@@ -1,10 +1,21 @@
+import time
+
 from celery import Celery
-from celery.signals import worker_shutting_down
+from celery.signals import (
+    task_failure,
+    task_postrun,
+    task_prerun,
+    task_retry,
+    worker_process_init,
+    worker_shutting_down,
+)
+from app.core import metrics, profiler
+from app.core.config import settings
 
 celery_app = Celery(
     "habittracker",
-    broker="redis://redis:6379/0",
-    backend="redis://redis:6379/0"
+    broker=settings.REDIS_URL,
+    backend=settings.REDIS_URL
 )
 
 celery_app.conf.update(
@@ -23,22 +34,79 @@ celery_app.conf.update(
     task_eager_propagates=True,
 )
 
-celery_app.autodiscover_tasks(["app.tasks.notifications"])
+celery_app.autodiscover_tasks([
+    "app.tasks.notifications", "app.tasks.habit_stats", "app.tasks.leaderboards", "app.tasks.partitions",
+    "app.tasks.archive", "app.tasks.sync",
+])
 
+# Reminders are fired by the event-driven scheduler (python -m app.tasks.scheduler)
 celery_app.conf.beat_schedule = {
-    "send-reminders-every-15-minutes": {
-        "task": "app.tasks.notifications.send_daily_reminders",
-        "schedule": 15.0,
+    "prune-notification-outbox-daily": {
+        "task": "notifications.prune_outbox",
+        "schedule": 24 * 60 * 60.0,
+    },
+    "ensure-record-partitions-daily": {
+        "task": "partitions.ensure_record_partitions",
+        "schedule": 24 * 60 * 60.0,
+    },
+    "prune-sync-tombstones-daily": {
+        "task": "sync.prune_tombstones",
+        "schedule": 24 * 60 * 60.0,
+    },
+    "archive-cold-records-daily": {
+        "task": "archive.archive_records",
+        "schedule": 24 * 60 * 60.0,
+    },
+    "rebuild-leaderboards-hourly": {
+        "task": "leaderboards.rebuild",
+        "schedule": 60 * 60.0,
     },
 }
 
 
+_task_started: dict[str, float] = {}
+_task_profiles = {}
+
+
+@task_prerun.connect
+def record_task_start(task_id=None, task=None, **kwargs):
+    _task_started[task_id] = time.perf_counter()
+    _task_profiles[task_id] = profiler.start(f"task {task.name}")
+
+
+@task_postrun.connect
+def record_task_duration(task_id=None, task=None, state=None, **kwargs):
+    profiler.finish(_task_profiles.pop(task_id, None))
+    started = _task_started.pop(task_id, None)
+    if started is not None:
+        metrics.TASK_DURATION.labels(task.name, state or "UNKNOWN").observe(time.perf_counter() - started)
+
+
+@task_retry.connect
+def record_task_retry(sender=None, **kwargs):
+    metrics.TASK_RETRIES.labels(sender.name).inc()
+
+
+@task_failure.connect
+def record_task_failure(sender=None, **kwargs):
+    metrics.TASK_FAILURES.labels(sender.name).inc()
+
+
+@worker_process_init.connect
+def warm_up_worker(**kwargs):
+    """Open the database profile's warm-up connections in each worker process."""
+    from app.core.sync_database import sync_db_manager
+    sync_db_manager.warm_up()
+
+
 @worker_shutting_down.connect
 def cleanup_worker(sender=None, **kwargs):
     """Cleanup database connections when worker shuts down."""
     try:
         from app.core.sync_database import cleanup_sync_db
+        from app.tasks.telegram import close_engine
         cleanup_sync_db()
+        close_engine()
         print("[INFO] Celery worker database cleanup completed")
     except Exception as e:
         print(f"[WARN] Error during worker cleanup: {e}")
\ No newline at end of file
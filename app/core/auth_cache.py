@@ -0,0 +1,109 @@
+"""
+Authenticated principal cache.
+
+`get_current_user` runs on every authenticated request. Decoded tokens are
+remembered until they expire and the user behind them is kept as a small
+`Principal` in an in-process TTL/LRU cache, optionally backed by Redis so
+that all API workers share one second tier. Entries are dropped through
+`invalidate_user` whenever a user is updated or deleted; the short local TTL
+bounds how long other workers may serve a stale entry.
+"""
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass
+from typing import Optional
+
+from jose import jwt, JWTError
+from redis.exceptions import RedisError
+
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.redis import get_redis
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    email: str
+    telegram_chat_id: Optional[str] = None
+
+
+class InvalidToken(Exception):
+    pass
+
+
+_tokens = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.ACCESS_TOKEN_EXPIRE_MINUTES * 60)
+_principals = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.AUTH_CACHE_TTL_SECONDS)
+
+
+def _token_key(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+
+def _redis_key(user_id: int) -> str:
+    return f"auth:user:{user_id}"
+
+
+def resolve_token(token: str) -> int:
+    """User id of a valid access token; raises InvalidToken otherwise."""
+    key = _token_key(token)
+    user_id = _tokens.get(key)
+    if user_id is not None:
+        return user_id
+
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+    except JWTError:
+        raise InvalidToken()
+    subject = payload.get("sub")
+    if subject is None:
+        raise InvalidToken()
+    user_id = int(subject)
+    expires_at = payload.get("exp")
+    if expires_at is not None:
+        # Never trust a cached token past its own expiry
+        _tokens.set(key, user_id, ttl=expires_at - time.time())
+    return user_id
+
+
+async def get_principal(user_id: int) -> Optional[Principal]:
+    principal = _principals.get(user_id)
+    if principal is not None or not settings.AUTH_CACHE_REDIS:
+        return principal
+    try:
+        raw = await get_redis().get(_redis_key(user_id))
+    except RedisError:
+        return None
+    if raw is None:
+        return None
+    principal = Principal(**json.loads(raw))
+    _principals.set(user_id, principal)
+    return principal
+
+
+async def remember(user) -> Principal:
+    principal = Principal(id=user.id, email=user.email, telegram_chat_id=user.telegram_chat_id)
+    _principals.set(user.id, principal)
+    if settings.AUTH_CACHE_REDIS:
+        try:
+            await get_redis().set(
+                _redis_key(user.id), json.dumps(asdict(principal)), ex=settings.AUTH_CACHE_TTL_SECONDS
+            )
+        except RedisError:
+            pass
+    return principal
+
+
+async def invalidate_user(user_id: int):
+    _principals.delete(user_id)
+    if settings.AUTH_CACHE_REDIS:
+        try:
+            await get_redis().delete(_redis_key(user_id))
+        except RedisError:
+            pass
+
+
+def clear():
+    _tokens.clear()
+    _principals.clear()
@@ -1,4 +1,5 @@
 import os
+from typing import Optional
 from pathlib import Path
 
 from pydantic_settings import BaseSettings
@@ -13,6 +14,78 @@ class Settings(BaseSettings):
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
     TELEGRAM_BOT_TOKEN: str
+    # Database engine profile (dev, test, prod, pgbouncer); the DB_* values below override it
+    DB_PROFILE: str = "dev"
+    DB_ECHO: Optional[bool] = None
+    DB_POOL_SIZE: Optional[int] = None
+    DB_MAX_OVERFLOW: Optional[int] = None
+    DB_POOL_TIMEOUT: Optional[float] = None
+    DB_POOL_RECYCLE: Optional[int] = None
+    DB_POOL_PRE_PING: Optional[bool] = None
+    DB_STATEMENT_CACHE_SIZE: Optional[int] = None
+    DB_WARMUP_CONNECTIONS: Optional[int] = None
+    # Read replicas ("host[:port]", comma separated), how reads pick one, and read-your-writes pinning
+    DB_REPLICA_HOSTS: str = ""
+    DB_REPLICA_STRATEGY: str = "round_robin"
+    DB_REPLICA_STICKY_SECONDS: int = 5
+    DB_REPLICA_RETRY_SECONDS: int = 30
+    # SQL profiler: on for everything, or per request via X-SQL-Profile when the header is allowed
+    SQL_PROFILE: bool = False
+    SQL_PROFILE_HEADER: bool = False
+    SQL_PROFILE_SLOW_MS: float = 100
+    SQL_PROFILE_REPEAT_THRESHOLD: int = 5
+    # Timezone used to bucket records into calendar days for statistics
+    STATS_TIMEZONE: str = "UTC"
+    # Process pool size and read chunk size for the analytics worker
+    ANALYTICS_WORKERS: Optional[int] = None
+    ANALYTICS_CHUNK_SIZE: int = 500_000
+    # Upper bound on rows accepted by a single bulk record import
+    BULK_MAX_ROWS: int = 100_000
+    # Upper bound on operations accepted by a single POST /batch
+    BATCH_MAX_OPERATIONS: int = 1000
+    # Delta sync keeps tombstones this long; older cursors get a full resync
+    SYNC_TOMBSTONE_RETENTION_DAYS: int = 90
+    # Change events over SSE: streams per API worker, pending events per stream, keep-alive interval
+    EVENTS_ENABLED: bool = True
+    EVENTS_MAX_STREAMS: int = 50_000
+    EVENTS_QUEUE_SIZE: int = 4
+    EVENTS_HEARTBEAT_SECONDS: float = 25
+    REDIS_URL: str = "redis://redis:6379/0"
+    # Authenticated user cache; Redis adds a tier shared by all API workers
+    AUTH_CACHE_TTL_SECONDS: int = 30
+    AUTH_CACHE_MAX_ENTRIES: int = 10_000
+    AUTH_CACHE_REDIS: bool = False
+    # Per-user Redis cache of list responses, invalidated on every write
+    RESPONSE_CACHE_ENABLED: bool = False
+    RESPONSE_CACHE_TTL_SECONDS: int = 300
+    # Monthly partitions of records created ahead of time
+    RECORD_PARTITION_MONTHS_AHEAD: int = 3
+    # Cold record archive: records older than this many days move to per-habit files in ARCHIVE_DIR
+    ARCHIVE_AFTER_DAYS: int = 365
+    ARCHIVE_DIR: str = str(Path(__file__).resolve().parent.parent.parent / "archive")
+    # Redis leaderboards and how many past weekly boards stay queryable
+    LEADERBOARDS_ENABLED: bool = True
+    LEADERBOARD_WEEKS_KEPT: int = 4
+    # Reminder scheduler: claim batch size and the longest sleep between schedule checks
+    REMINDER_BATCH_SIZE: int = 500
+    REMINDER_MAX_SLEEP_SECONDS: int = 60
+    # Port for the reminder scheduler's own Prometheus endpoint; off when unset
+    SCHEDULER_METRICS_PORT: Optional[int] = None
+    # Notification outbox: claim batch, lease while sending, attempts before giving up, retention
+    OUTBOX_BATCH_SIZE: int = 200
+    OUTBOX_LEASE_SECONDS: int = 300
+    OUTBOX_MAX_ATTEMPTS: int = 5
+    OUTBOX_RETENTION_DAYS: int = 30
+    # Telegram delivery: Bot API base URL (a local stub in tests), rate limits in msg/s, retries
+    TELEGRAM_API_URL: str = "https://api.telegram.org"
+    TELEGRAM_GLOBAL_RATE: float = 30
+    TELEGRAM_PER_CHAT_RATE: float = 1
+    TELEGRAM_CONCURRENCY: int = 8
+    TELEGRAM_MAX_RETRIES: int = 3
+    # bcrypt cost and the thread pool that runs it off the event loop
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_QUEUE: int = 64
 
     @property
     def DATABASE_URL(self) -> str:
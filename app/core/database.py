@@ -1,9 +1,36 @@
+import asyncio
+
+from sqlalchemy import text
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+from app.core import metrics, profiler
 from app.core.config import settings
+from app.core.engine_profiles import engine_options, get_profile, pool_status
 
-engine = create_async_engine(settings.DATABASE_URL, echo=True)
+profile = get_profile()
+engine = create_async_engine(settings.DATABASE_URL, **engine_options(profile, "asyncpg"))
 async_session = async_sessionmaker(engine, expire_on_commit=False)
+metrics.instrument_engine(engine.sync_engine, "async")
+profiler.instrument_engine(engine.sync_engine)
+metrics.register_pool("async", lambda: pool_status(engine))
 
 async def get_db():
     async with async_session() as session:
         yield session
+
+async def warm_up():
+    """Open the profile's warm-up connections concurrently and return them to the pool."""
+    async def ping():
+        async with engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+
+    count = min(profile.warmup_connections, profile.pool_size) if profile.pooled else 0
+    if not count:
+        return
+    try:
+        await asyncio.gather(*(ping() for _ in range(count)))
+        print(f"[INFO] Database pool warmed up with {count} connections ({profile.name} profile)")
+    except Exception as exc:
+        print(f"[WARN] Database warm-up failed: {exc}")
+
+def get_pool_status() -> dict:
+    return {"profile": profile.name, **pool_status(engine)}
@@ -0,0 +1,109 @@
+"""
+Engine profiles shared by the async (API) and sync (Celery) database managers.
+
+A profile is a named set of pool and driver options picked with DB_PROFILE;
+individual DB_* settings override single values of the chosen profile.
+
+- dev: small pool, SQL echo on
+- test: no pooling, every session opens its own connection
+- prod: larger pool with short checkout timeouts, warmed up at startup
+- pgbouncer: for PgBouncer in transaction mode, where server connections
+  change between transactions, so asyncpg's prepared statement caches are
+  switched off and statement names are made unique
+"""
+import uuid
+from dataclasses import dataclass, replace
+from typing import Optional
+
+from sqlalchemy.pool import NullPool
+
+from app.core.config import settings
+
+
+@dataclass(frozen=True)
+class EngineProfile:
+    name: str
+    echo: bool = False
+    pool_size: int = 5
+    max_overflow: int = 10
+    pool_timeout: float = 30
+    pool_recycle: int = 3600
+    pool_pre_ping: bool = True
+    # asyncpg prepared statement cache per connection; 0 disables it
+    statement_cache_size: int = 100
+    # Connections opened at startup so the first requests do not pay for the handshake
+    warmup_connections: int = 0
+    pooled: bool = True
+
+
+PROFILES = {
+    "dev": EngineProfile("dev", echo=True, warmup_connections=1),
+    "test": EngineProfile("test", pool_pre_ping=False, pooled=False),
+    "prod": EngineProfile(
+        "prod", pool_size=20, max_overflow=10, pool_timeout=10, pool_recycle=1800, warmup_connections=5
+    ),
+    "pgbouncer": EngineProfile(
+        "pgbouncer", pool_size=20, max_overflow=10, pool_timeout=10, pool_recycle=1800,
+        statement_cache_size=0, warmup_connections=5,
+    ),
+}
+
+OVERRIDES = {
+    "echo": "DB_ECHO",
+    "pool_size": "DB_POOL_SIZE",
+    "max_overflow": "DB_MAX_OVERFLOW",
+    "pool_timeout": "DB_POOL_TIMEOUT",
+    "pool_recycle": "DB_POOL_RECYCLE",
+    "pool_pre_ping": "DB_POOL_PRE_PING",
+    "statement_cache_size": "DB_STATEMENT_CACHE_SIZE",
+    "warmup_connections": "DB_WARMUP_CONNECTIONS",
+}
+
+
+def get_profile(name: Optional[str] = None) -> EngineProfile:
+    name = name or settings.DB_PROFILE
+    if name not in PROFILES:
+        raise ValueError(f"Unknown DB_PROFILE {name!r}, expected one of {', '.join(PROFILES)}")
+    overrides = {
+        field: getattr(settings, setting)
+        for field, setting in OVERRIDES.items()
+        if getattr(settings, setting) is not None
+    }
+    return replace(PROFILES[name], **overrides)
+
+
+def engine_options(profile: EngineProfile, driver: str) -> dict:
+    """Keyword arguments for create_engine/create_async_engine; driver is "asyncpg" or "psycopg2"."""
+    options = {"echo": profile.echo, "pool_pre_ping": profile.pool_pre_ping}
+    if profile.pooled:
+        options.update(
+            pool_size=profile.pool_size,
+            max_overflow=profile.max_overflow,
+            pool_timeout=profile.pool_timeout,
+            pool_recycle=profile.pool_recycle,
+        )
+    else:
+        options["poolclass"] = NullPool
+    if driver == "asyncpg":
+        connect_args = {
+            "prepared_statement_cache_size": profile.statement_cache_size,
+            "statement_cache_size": profile.statement_cache_size,
+        }
+        if profile.statement_cache_size == 0:
+            connect_args["prepared_statement_name_func"] = lambda: f"__asyncpg_{uuid.uuid4()}__"
+        options["connect_args"] = connect_args
+    return options
+
+
+def pool_status(engine) -> dict:
+    """Checked-in/checked-out/overflow counts of an engine's pool."""
+    pool = engine.pool
+    if not hasattr(pool, "checkedout"):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_in": pool.checkedin(),
+        "checked_out": pool.checkedout(),
+        "overflow": max(pool.overflow(), 0),
+    }
@@ -0,0 +1,129 @@
+"""
+Per-user change events pushed to connected clients (GET /events).
+
+After every committed write crud publishes a small event on the user's Redis
+channel. Each API worker keeps a single pub/sub connection for all of its
+clients: it is subscribed to a user's channel while at least one of that
+user's streams is open, and a reader task hands incoming events to those
+streams' queues. An idle stream therefore costs a small queue, a suspended
+coroutine and its socket; no Redis connection and no database session.
+
+Events only say that something changed; clients fetch the change itself
+with GET /sync and their cursor, and do the same after reconnecting. That
+makes events safe to drop: when a stream's queue is full, the client
+already has a pending notification and further ones are discarded.
+"""
+import asyncio
+import datetime
+from typing import Optional
+
+import orjson
+from redis.asyncio.client import PubSub
+from redis.exceptions import RedisError
+
+from app.core.config import settings
+from app.core.metrics import EVENT_STREAMS
+from app.core.redis import get_redis
+
+CHANNEL_PREFIX = "events:user:"
+
+
+class TooManyStreams(Exception):
+    pass
+
+
+def channel(user_id: int) -> str:
+    return f"{CHANNEL_PREFIX}{user_id}"
+
+
+async def publish(user_id: int, event: dict):
+    """Best effort: clients also resync whenever they (re)connect."""
+    if not settings.EVENTS_ENABLED:
+        return
+    try:
+        await get_redis().publish(channel(user_id), orjson.dumps(event))
+    except RedisError:
+        pass
+
+
+async def publish_change(user_id: int):
+    await publish(user_id, {"type": "changed", "at": datetime.datetime.now(datetime.UTC).isoformat()})
+
+
+class EventHub:
+    def __init__(self, max_streams: int, queue_size: int):
+        self.max_streams = max_streams
+        self.queue_size = queue_size
+        self._queues: dict[int, set[asyncio.Queue]] = {}
+        self._streams = 0
+        self._pubsub: Optional[PubSub] = None
+        self._reader: Optional[asyncio.Task] = None
+
+    @property
+    def streams(self) -> int:
+        return self._streams
+
+    async def open(self, user_id: int) -> asyncio.Queue:
+        """Register a stream for the user; raises TooManyStreams at the per-worker limit and RedisError."""
+        if self._streams >= self.max_streams:
+            raise TooManyStreams
+        queue = asyncio.Queue(self.queue_size)
+        queues = self._queues.setdefault(user_id, set())
+        queues.add(queue)
+        self._streams += 1
+        EVENT_STREAMS.inc()
+        try:
+            if len(queues) == 1:
+                if self._pubsub is None:
+                    self._pubsub = get_redis().pubsub(ignore_subscribe_messages=True)
+                await self._pubsub.subscribe(channel(user_id))
+            if self._reader is None or self._reader.done():
+                self._reader = asyncio.create_task(self._read())
+        except BaseException:
+            await self.close(user_id, queue)
+            raise
+        return queue
+
+    async def close(self, user_id: int, queue: asyncio.Queue):
+        queues = self._queues.get(user_id)
+        if queues is None or queue not in queues:
+            return
+        queues.discard(queue)
+        self._streams -= 1
+        EVENT_STREAMS.dec()
+        if not queues:
+            del self._queues[user_id]
+            try:
+                await self._pubsub.unsubscribe(channel(user_id))
+            except RedisError:
+                pass
+
+    def _deliver(self, message: dict):
+        user_id = int(message["channel"][len(CHANNEL_PREFIX):])
+        for queue in self._queues.get(user_id, ()):
+            try:
+                queue.put_nowait(message["data"])
+            except asyncio.QueueFull:
+                pass
+
+    async def _read(self):
+        while self._queues:
+            try:
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            except (RedisError, OSError) as exc:
+                # The client reconnects and resubscribes on the next read
+                print(f"[WARN] Event subscription interrupted: {exc}")
+                await asyncio.sleep(1)
+                continue
+            if message is not None and message["type"] == "message":
+                self._deliver(message)
+
+    async def shutdown(self):
+        if self._reader is not None:
+            self._reader.cancel()
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+        self._pubsub = self._reader = None
+
+
+hub = EventHub(settings.EVENTS_MAX_STREAMS, settings.EVENTS_QUEUE_SIZE)
@@ -0,0 +1,146 @@
+"""
+Prometheus metrics for the API, the database engines and background work.
+
+The API serves them at /metrics. Metrics recorded in other processes
+(Celery worker children, several uvicorn workers) are aggregated there when
+every process shares a PROMETHEUS_MULTIPROC_DIR; the reminder scheduler can
+also expose its own endpoint on SCHEDULER_METRICS_PORT.
+"""
+import os
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Callable, Optional
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from prometheus_client.core import GaugeMetricFamily
+from sqlalchemy import event
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds", "Request latency by route template", ["method", "route", "status"]
+)
+REQUEST_DB_QUERIES = Histogram(
+    "http_request_db_queries", "Database statements executed per request", ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_seconds", "Time spent in database statements per request", ["route"]
+)
+DB_QUERIES = Counter("db_queries", "Database statements executed", ["engine"])
+DB_QUERY_TIME = Histogram("db_query_duration_seconds", "Database statement latency", ["engine"])
+
+TASK_DURATION = Histogram("celery_task_duration_seconds", "Celery task run time", ["task", "state"])
+TASK_RETRIES = Counter("celery_task_retries", "Celery task retries", ["task"])
+TASK_FAILURES = Counter("celery_task_failures", "Celery tasks that raised", ["task"])
+
+REMINDERS_FOUND = Counter("reminders_found", "Due reminders moved into the notification outbox")
+REMINDERS_SENT = Counter("reminders_sent", "Reminder messages delivered")
+REMINDERS_FAILED = Counter("reminders_failed", "Reminder messages given up on")
+
+EVENT_STREAMS = Gauge("event_streams_open", "Open GET /events streams", multiprocess_mode="livesum")
+
+
+@dataclass
+class QueryStats:
+    count: int = 0
+    seconds: float = 0.0
+
+
+_request_queries: ContextVar[Optional[QueryStats]] = ContextVar("request_queries", default=None)
+
+
+def instrument_engine(engine, name: str):
+    """Count and time every statement of a (sync) engine; pass `async_engine.sync_engine` for async ones."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_started"].pop()
+        DB_QUERIES.labels(name).inc()
+        DB_QUERY_TIME.labels(name).observe(elapsed)
+        stats = _request_queries.get()
+        if stats is not None:
+            stats.count += 1
+            stats.seconds += elapsed
+
+
+_pools: dict[str, Callable[[], Optional[dict]]] = {}
+
+
+def register_pool(name: str, status: Callable[[], Optional[dict]]):
+    """Expose an engine's pool counters; `status` returns engine_profiles.pool_status() or None."""
+    _pools[name] = status
+
+
+class PoolCollector:
+    """Reads pool counters at scrape time instead of tracking them on every checkout."""
+
+    def collect(self):
+        gauge = GaugeMetricFamily("db_pool_connections", "Database pool connections", labels=["engine", "state"])
+        for name, status in _pools.items():
+            counters = status()
+            if not counters:
+                continue
+            for state in ("size", "checked_in", "checked_out", "overflow"):
+                if state in counters:
+                    gauge.add_metric([name, state], counters[state])
+        yield gauge
+
+
+_pool_collector = PoolCollector()
+REGISTRY.register(_pool_collector)
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording latency and database usage per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        stats = QueryStats()
+        token = _request_queries.set(stats)
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started
+            _request_queries.reset(token)
+            # The router stores the matched route in the scope; unmatched paths share one label
+            route = getattr(scope.get("route"), "path", "unmatched")
+            REQUEST_LATENCY.labels(scope["method"], route, str(status)).observe(elapsed)
+            REQUEST_DB_QUERIES.labels(route).observe(stats.count)
+            REQUEST_DB_TIME.labels(route).observe(stats.seconds)
+
+
+def render() -> bytes:
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        registry.register(_pool_collector)
+        return generate_latest(registry)
+    return generate_latest(REGISTRY)
+
@@ -0,0 +1,54 @@
+"""
+Password hashing off the event loop.
+
+bcrypt is deliberately slow, so hashing and verification run on a dedicated
+thread pool (bcrypt releases the GIL). At most PASSWORD_HASH_WORKERS
+operations run at once and up to PASSWORD_HASH_MAX_QUEUE more may wait for a
+thread; beyond that callers get PasswordHasherBusy instead of piling up.
+"""
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+
+from passlib.context import CryptContext
+
+from app.core.config import settings
+
+MAX_BCRYPT_LENGTH = 72
+
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
+
+_executor = ThreadPoolExecutor(max_workers=settings.PASSWORD_HASH_WORKERS, thread_name_prefix="bcrypt")
+_slots: Optional[asyncio.Semaphore] = None
+
+
+class PasswordHasherBusy(Exception):
+    pass
+
+
+def _truncate(password: str) -> bytes:
+    return password.encode("utf-8")[:MAX_BCRYPT_LENGTH]
+
+
+async def _run(func, *args):
+    global _slots
+    if _slots is None:
+        _slots = asyncio.Semaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_MAX_QUEUE)
+    if _slots.locked():
+        raise PasswordHasherBusy()
+    async with _slots:
+        return await asyncio.get_running_loop().run_in_executor(_executor, func, *args)
+
+
+async def hash_password(password: str) -> str:
+    return await _run(pwd_context.hash, _truncate(password))
+
+
+async def verify_password(password: str, hashed: str) -> tuple[bool, Optional[str]]:
+    """
+    Check a password against its hash.
+
+    Returns (valid, new_hash); new_hash is set when the stored hash uses
+    outdated parameters (e.g. a lower BCRYPT_ROUNDS) and should be replaced.
+    """
+    return await _run(pwd_context.verify_and_update, _truncate(password), hashed)
@@ -0,0 +1,181 @@
+"""
+Opt-in SQL profiler.
+
+While a profile is active (per request, Celery task or `profile()` block),
+every statement executed on an instrumented engine is grouped by its SQL
+text. Statements repeated SQL_PROFILE_REPEAT_THRESHOLD times or more are
+reported as likely N+1 patterns, and statements slower than
+SQL_PROFILE_SLOW_MS get their plan captured. EXPLAIN runs inside a savepoint
+that is rolled back, so a failing EXPLAIN cannot abort the request's
+transaction; ANALYZE executes the statement again, so it is only used for
+SELECTs that neither lock rows nor hide writes in a CTE, and everything
+else gets a plain EXPLAIN. The report is printed when the profile ends.
+
+Profiling is on for everything with SQL_PROFILE, or per request with an
+`X-SQL-Profile: 1` header when SQL_PROFILE_HEADER is allowed.
+"""
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from dataclasses import dataclass, field
+from typing import Optional
+
+from sqlalchemy import event
+
+from app.core.config import settings
+
+HEADER = "x-sql-profile"
+STATEMENT_PREVIEW = 160
+SAVEPOINT = "sql_profile_explain"
+# Writes (including data-modifying CTEs) and row locks: FOR UPDATE, FOR NO KEY UPDATE, FOR [KEY] SHARE
+_SIDE_EFFECTS = re.compile(r"\b(insert|update|delete|merge|share)\b", re.IGNORECASE)
+
+
+@dataclass
+class StatementGroup:
+    statement: str
+    count: int = 0
+    seconds: float = 0.0
+
+
+@dataclass
+class SlowStatement:
+    statement: str
+    seconds: float
+    plan: list[str]
+
+
+@dataclass
+class Profile:
+    label: str
+    started: float = field(default_factory=time.perf_counter)
+    groups: dict[str, StatementGroup] = field(default_factory=dict)
+    slow: list[SlowStatement] = field(default_factory=list)
+
+    def add(self, statement: str, seconds: float):
+        group = self.groups.get(statement)
+        if group is None:
+            group = self.groups[statement] = StatementGroup(statement)
+        group.count += 1
+        group.seconds += seconds
+
+    @property
+    def repeated(self) -> list[StatementGroup]:
+        return [group for group in self.groups.values() if group.count >= settings.SQL_PROFILE_REPEAT_THRESHOLD]
+
+    def report(self) -> str:
+        total = sum(group.count for group in self.groups.values())
+        db_ms = sum(group.seconds for group in self.groups.values()) * 1000
+        elapsed_ms = (time.perf_counter() - self.started) * 1000
+        lines = [
+            f"[PROFILE] {self.label}: {total} statements, {db_ms:.1f} ms in database, {elapsed_ms:.1f} ms total"
+        ]
+        for group in self.groups.values():
+            lines.append(f"[PROFILE]   {group.count:>4}x {group.seconds * 1000:8.1f} ms  {_preview(group.statement)}")
+        for group in self.repeated:
+            lines.append(f"[PROFILE]   N+1? {group.count} identical statements: {_preview(group.statement)}")
+        for slow in self.slow:
+            lines.append(f"[PROFILE]   slow {slow.seconds * 1000:.1f} ms: {_preview(slow.statement)}")
+            lines.extend(f"[PROFILE]       {line}" for line in slow.plan)
+        return "\n".join(lines)
+
+
+_current: ContextVar[Optional[Profile]] = ContextVar("sql_profile", default=None)
+
+
+def _preview(statement: str) -> str:
+    flat = " ".join(statement.split())
+    return flat if len(flat) <= STATEMENT_PREVIEW else flat[:STATEMENT_PREVIEW] + "..."
+
+
+def can_analyze(statement: str) -> bool:
+    """Whether running the statement a second time is harmless."""
+    return statement.lstrip().lower().startswith(("select", "with")) and not _SIDE_EFFECTS.search(statement)
+
+
+def _explain(conn, statement: str, parameters) -> list[str]:
+    """Plan of a statement, run on the raw DBAPI connection so it is not profiled itself."""
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if can_analyze(statement) else "EXPLAIN "
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute(f"SAVEPOINT {SAVEPOINT}")
+    except Exception as exc:
+        cursor.close()
+        return [f"EXPLAIN failed: {exc}"]
+    try:
+        cursor.execute(prefix + statement, parameters)
+        return [row[0] for row in cursor.fetchall()]
+    except Exception as exc:
+        return [f"EXPLAIN failed: {exc}"]
+    finally:
+        try:
+            cursor.execute(f"ROLLBACK TO SAVEPOINT {SAVEPOINT}")
+            cursor.execute(f"RELEASE SAVEPOINT {SAVEPOINT}")
+        finally:
+            cursor.close()
+
+
+def instrument_engine(engine):
+    """Feed an engine's statements to the active profile; pass `async_engine.sync_engine` for async ones."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if _current.get() is not None:
+            conn.info.setdefault("profile_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        profile = _current.get()
+        started = conn.info.get("profile_started")
+        if profile is None or not started:
+            return
+        elapsed = time.perf_counter() - started.pop()
+        profile.add(statement, elapsed)
+        if elapsed * 1000 >= settings.SQL_PROFILE_SLOW_MS and not executemany:
+            profile.slow.append(SlowStatement(statement, elapsed, _explain(conn, statement, parameters)))
+
+
+@contextmanager
+def profile(label: str, enabled: Optional[bool] = None):
+    """Profile the statements run inside the block; defaults to the SQL_PROFILE setting."""
+    if not (settings.SQL_PROFILE if enabled is None else enabled) or _current.get() is not None:
+        yield None
+        return
+    current = Profile(label)
+    token = _current.set(current)
+    try:
+        yield current
+    finally:
+        _current.reset(token)
+        print(current.report())
+
+
+def start(label: str) -> Optional[Token]:
+    """Begin a profile outside a `with` block (e.g. between Celery signals); returns a token for `finish`."""
+    if not settings.SQL_PROFILE:
+        return None
+    return _current.set(Profile(label))
+
+
+def finish(token: Optional[Token]):
+    if token is None:
+        return
+    current = _current.get()
+    _current.reset(token)
+    if current is not None:
+        print(current.report())
+
+
+class ProfilerMiddleware:
+    """ASGI middleware profiling requests when the setting or the request header asks for it."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        requested = settings.SQL_PROFILE_HEADER and dict(scope["headers"]).get(HEADER.encode()) == b"1"
+        with profile(f"{scope['method']} {scope['path']}", enabled=settings.SQL_PROFILE or requested):
+            await self.app(scope, receive, send)
@@ -0,0 +1,27 @@
+"""Shared Redis clients for the API (async) and Celery/worker processes (sync)."""
+import redis
+import redis.asyncio as aioredis
+
+from app.core.config import settings
+
+# Published whenever a habit's reminder time changes so the scheduler wakes up early
+REMINDER_WAKE_CHANNEL = "reminders:wake"
+
+_async_client = None
+_sync_client = None
+
+
+def get_redis() -> aioredis.Redis:
+    """Lazily created asyncio client, one per process."""
+    global _async_client
+    if _async_client is None:
+        _async_client = aioredis.from_url(settings.REDIS_URL)
+    return _async_client
+
+
+def get_sync_redis() -> redis.Redis:
+    """Lazily created blocking client, one per process."""
+    global _sync_client
+    if _sync_client is None:
+        _sync_client = redis.from_url(settings.REDIS_URL)
+    return _sync_client
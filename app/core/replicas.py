@@ -0,0 +1,158 @@
+"""
+Read replica routing.
+
+DB_REPLICA_HOSTS lists replica hosts ("host" or "host:port", comma
+separated) that share the primary's credentials and database name. Read-only
+work asks `read_session` for a session: it gets a healthy replica picked
+round-robin or by fewest checked-out connections (DB_REPLICA_STRATEGY), and
+falls back to the next replica and finally the primary when a replica cannot
+be reached; an unreachable replica is skipped for DB_REPLICA_RETRY_SECONDS.
+
+For read-your-writes, crud pins a user to the primary for
+DB_REPLICA_STICKY_SECONDS after each committed write. Pins live in process
+and in Redis, so every API worker honours them.
+
+Any second Postgres with the same schema works for local testing, e.g.
+DB_REPLICA_HOSTS=localhost:5433.
+"""
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
+
+from app.core import metrics, profiler
+from app.core.cache import TTLCache
+from app.core.config import settings
+from app.core.database import async_session, profile
+from app.core.engine_profiles import engine_options, pool_status
+from app.core.redis import get_redis
+
+STRATEGIES = ("round_robin", "least_connections")
+
+
+@dataclass
+class Replica:
+    name: str
+    engine: AsyncEngine
+    sessionmaker: async_sessionmaker
+    down_until: float = 0.0
+
+    @property
+    def healthy(self) -> bool:
+        return time.monotonic() >= self.down_until
+
+    def checked_out(self) -> int:
+        return pool_status(self.engine).get("checked_out", 0)
+
+
+def replica_url(host: str) -> str:
+    host, _, port = host.strip().partition(":")
+    return (
+        f"postgresql+asyncpg://{settings.DB_USER}:{settings.DB_PASSWORD}"
+        f"@{host}:{port or settings.DB_PORT}/{settings.DB_NAME}"
+    )
+
+
+class ReplicaSet:
+    def __init__(self, hosts: list[str], strategy: str = "round_robin"):
+        if strategy not in STRATEGIES:
+            raise ValueError(f"Unknown DB_REPLICA_STRATEGY {strategy!r}, expected one of {', '.join(STRATEGIES)}")
+        self.strategy = strategy
+        self.replicas = []
+        for host in hosts:
+            engine = create_async_engine(replica_url(host), **engine_options(profile, "asyncpg"))
+            name = f"replica:{host.strip()}"
+            metrics.instrument_engine(engine.sync_engine, name)
+            metrics.register_pool(name, lambda engine=engine: pool_status(engine))
+            profiler.instrument_engine(engine.sync_engine)
+            self.replicas.append(Replica(name, engine, async_sessionmaker(engine, expire_on_commit=False)))
+        self._turn = itertools.count()
+
+    def candidates(self) -> list[Replica]:
+        """Healthy replicas in the order they should be tried."""
+        healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            return []
+        if self.strategy == "least_connections":
+            return sorted(healthy, key=Replica.checked_out)
+        start = next(self._turn) % len(healthy)
+        return healthy[start:] + healthy[:start]
+
+    def mark_down(self, replica: Replica):
+        replica.down_until = time.monotonic() + settings.DB_REPLICA_RETRY_SECONDS
+
+    def status(self) -> list[dict]:
+        return [
+            {"name": replica.name, "healthy": replica.healthy, **pool_status(replica.engine)}
+            for replica in self.replicas
+        ]
+
+    async def dispose(self):
+        for replica in self.replicas:
+            await replica.engine.dispose()
+
+
+replica_set = ReplicaSet(
+    [host for host in settings.DB_REPLICA_HOSTS.split(",") if host.strip()],
+    settings.DB_REPLICA_STRATEGY,
+)
+
+_pins = TTLCache(settings.AUTH_CACHE_MAX_ENTRIES, settings.DB_REPLICA_STICKY_SECONDS)
+
+
+def _pin_key(user_id: int) -> str:
+    return f"replica:pin:{user_id}"
+
+
+async def pin_to_primary(user_id: int):
+    """Route the user's reads to the primary for DB_REPLICA_STICKY_SECONDS; call after committing a write."""
+    if not replica_set.replicas:
+        return
+    _pins.set(user_id, True)
+    try:
+        await get_redis().set(_pin_key(user_id), 1, ex=settings.DB_REPLICA_STICKY_SECONDS)
+    except RedisError:
+        pass
+
+
+async def is_pinned(user_id: int) -> bool:
+    if _pins.get(user_id):
+        return True
+    try:
+        return bool(await get_redis().exists(_pin_key(user_id)))
+    except RedisError:
+        return False
+
+
+def is_replica(session: AsyncSession) -> bool:
+    return "replica" in session.info
+
+
+@asynccontextmanager
+async def read_session(user_id: Optional[int] = None):
+    """Session for read-only work on a replica, or on the primary when none is usable or the user just wrote."""
+    if replica_set.replicas and not (user_id is not None and await is_pinned(user_id)):
+        for replica in replica_set.candidates():
+            session: AsyncSession = replica.sessionmaker()
+            try:
+                # Check out a connection now so an unreachable replica is detected before any query runs
+                await session.connection()
+            except (OSError, asyncio.TimeoutError, DBAPIError) as exc:
+                await session.close()
+                replica_set.mark_down(replica)
+                print(f"[WARN] {replica.name} unavailable, skipping for {settings.DB_REPLICA_RETRY_SECONDS}s: {exc}")
+                continue
+            session.info["replica"] = replica.name
+            try:
+                yield session
+            finally:
+                await session.close()
+            return
+    async with async_session() as session:
+        yield session
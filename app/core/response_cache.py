@@ -0,0 +1,125 @@
+"""
+Per-user read cache for list endpoints, with strong ETags.
+
+Every user has a version token in Redis that the crud write paths replace
+after each commit. Cached bodies are stored under keys that include that
+version, so a write makes all of the user's cached responses unreachable at
+once. ETags are derived from the version too: answering a conditional
+request with 304 costs one Redis GET and no database query.
+
+Bodies built on a read replica are only stored when the user is still not
+pinned to the primary afterwards. crud pins before it bumps the version, so
+a build that saw the new version of a write the replica may not have
+replayed yet always sees the pin too, and is served uncached without an ETag.
+"""
+import hashlib
+import json
+import uuid
+from typing import Awaitable, Callable, Optional
+
+from fastapi import Request, Response
+from redis.exceptions import RedisError
+
+from app.core import replicas
+from app.core.config import settings
+from app.core.redis import get_redis
+
+CACHE_CONTROL = "private, no-cache"
+
+Builder = Callable[[], Awaitable[tuple[bytes, dict]]]
+
+
+def _version_key(user_id: int) -> str:
+    return f"cache:version:{user_id}"
+
+
+def _request_key(request: Request, variant: str) -> str:
+    query = "&".join(sorted(f"{key}={value}" for key, value in request.query_params.multi_items()))
+    return hashlib.sha256(f"{request.url.path}?{query}|{variant}".encode()).hexdigest()[:32]
+
+
+async def bump_user_version(user_id: int):
+    """Invalidate every cached response of a user; call after committing a write."""
+    if not settings.RESPONSE_CACHE_ENABLED:
+        return
+    try:
+        # A fresh random token rather than INCR: versions never repeat, even if Redis loses its data
+        await get_redis().set(_version_key(user_id), uuid.uuid4().hex)
+    except RedisError:
+        pass
+
+
+async def _current_version(user_id: int) -> Optional[str]:
+    redis = get_redis()
+    version = await redis.get(_version_key(user_id))
+    if version is None:
+        await redis.set(_version_key(user_id), uuid.uuid4().hex, nx=True)
+        version = await redis.get(_version_key(user_id))
+    return version.decode() if version is not None else None
+
+
+def _matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def _pack(headers: dict, body: bytes) -> bytes:
+    return json.dumps(headers).encode() + b"\n" + body
+
+
+def _unpack(raw: bytes) -> tuple[dict, bytes]:
+    headers, body = raw.split(b"\n", 1)
+    return json.loads(headers), body
+
+
+async def cached_response(
+    request: Request,
+    user_id: int,
+    build: Builder,
+    media_type: str = "application/json",
+    variant: str = "",
+    replica: bool = False,
+) -> Response:
+    """
+    Serve a user's cached response, a 304, or build and cache a fresh one.
+
+    `build` returns the body and any extra headers; it only runs on a miss.
+    `variant` separates representations of the same URL (e.g. media types).
+    `replica` tells that `build` reads from a replica session.
+    Falls back to building uncached whenever Redis is disabled or unavailable.
+    """
+    version = None
+    if settings.RESPONSE_CACHE_ENABLED:
+        try:
+            version = await _current_version(user_id)
+        except RedisError:
+            version = None
+    if version is None:
+        body, headers = await build()
+        return Response(body, media_type=media_type, headers=headers)
+
+    request_key = _request_key(request, variant)
+    etag = f'"{user_id}-{version}-{request_key[:12]}"'
+    if _matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+    key = f"cache:response:{user_id}:{version}:{request_key}"
+    redis = get_redis()
+    try:
+        raw = await redis.get(key)
+    except RedisError:
+        raw = None
+    if raw is not None:
+        headers, body = _unpack(raw)
+    else:
+        body, headers = await build()
+        if replica and await replicas.is_pinned(user_id):
+            # A write committed after the replica was chosen; the body may predate `version`
+            return Response(body, media_type=media_type, headers=headers)
+        try:
+            await redis.set(key, _pack(headers, body), ex=settings.RESPONSE_CACHE_TTL_SECONDS)
+        except RedisError:
+            pass
+    return Response(body, media_type=media_type, headers={**headers, "ETag": etag, "Cache-Control": CACHE_CONTROL})
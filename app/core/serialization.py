@@ -0,0 +1,106 @@
+"""
+Fast response bodies for listing endpoints.
+
+Rows are selected as plain column tuples and encoded straight to bytes with
+orjson (or msgpack when the client sends `Accept: application/msgpack`),
+skipping pydantic model construction. The output matches what the
+`HabitOut`/`RecordOut` response models would produce. Bodies above
+COMPRESS_MIN_BYTES are compressed with brotli or gzip, whichever the
+client accepts first.
+"""
+import datetime
+import gzip
+from typing import Iterable, NamedTuple, Optional, Sequence
+
+import brotli
+import msgpack
+import orjson
+from fastapi import Request
+
+JSON = "application/json"
+MSGPACK = "application/msgpack"
+MSGPACK_ALIASES = {MSGPACK, "application/x-msgpack"}
+
+COMPRESS_MIN_BYTES = 1024
+GZIP_LEVEL = 5
+BROTLI_QUALITY = 4
+
+HABIT_COLUMNS = ("title", "description", "reminder_date", "id")
+RECORD_COLUMNS = ("habit_id", "date", "id")
+
+
+class Representation(NamedTuple):
+    media_type: str
+    encoding: Optional[str]
+
+    @property
+    def key(self) -> str:
+        """Identifies the representation in response cache keys."""
+        return f"{self.media_type};{self.encoding or 'identity'}"
+
+
+def _accepted(header: str) -> list[str]:
+    """Values of an Accept-style header, highest q first; q=0 entries dropped."""
+    weighted = []
+    for position, part in enumerate(header.split(",")):
+        value, *params = [piece.strip() for piece in part.split(";")]
+        quality = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    quality = float(param[2:])
+                except ValueError:
+                    quality = 0.0
+        if value and quality > 0:
+            weighted.append((-quality, position, value.lower()))
+    return [value for _, _, value in sorted(weighted)]
+
+
+def negotiate(request: Request) -> Representation:
+    media_type = JSON
+    for value in _accepted(request.headers.get("accept", "")):
+        if value in MSGPACK_ALIASES:
+            media_type = MSGPACK
+            break
+        if value in (JSON, "application/*", "*/*"):
+            break
+
+    encoding = None
+    for value in _accepted(request.headers.get("accept-encoding", "")):
+        if value in ("br", "gzip"):
+            encoding = value
+            break
+    return Representation(media_type, encoding)
+
+
+def _msgpack_default(value):
+    if isinstance(value, datetime.datetime):
+        return orjson.dumps(value, option=orjson.OPT_UTC_Z)[1:-1].decode()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def encode_rows(columns: Sequence[str], rows: Iterable[Sequence], media_type: str = JSON) -> bytes:
+    items = [dict(zip(columns, row)) for row in rows]
+    if media_type == MSGPACK:
+        return msgpack.packb(items, default=_msgpack_default)
+    return orjson.dumps(items, option=orjson.OPT_UTC_Z)
+
+
+def compress(body: bytes, encoding: Optional[str]) -> tuple[bytes, Optional[str]]:
+    """Compress a body for `encoding`; small bodies are returned as they are."""
+    if encoding is None or len(body) < COMPRESS_MIN_BYTES:
+        return body, None
+    if encoding == "br":
+        return brotli.compress(body, quality=BROTLI_QUALITY), "br"
+    return gzip.compress(body, compresslevel=GZIP_LEVEL), "gzip"
+
+
+def render_rows(
+    representation: Representation, columns: Sequence[str], rows: Iterable[Sequence]
+) -> tuple[bytes, dict]:
+    """Body and headers for a list of rows in the negotiated representation."""
+    body, encoding = compress(encode_rows(columns, rows, representation.media_type), representation.encoding)
+    headers = {"Vary": "Accept, Accept-Encoding"}
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return body, headers
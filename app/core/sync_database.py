@@ -4,9 +4,12 @@ This module provides sync database connections for Celery workers
 separate from the async FastAPI database connections.
 """
 from contextlib import contextmanager
-from sqlalchemy import create_engine
+from typing import Optional
+from sqlalchemy import create_engine, text
 from sqlalchemy.orm import sessionmaker, Session
+from app.core import metrics, profiler
 from app.core.config import settings
+from app.core.engine_profiles import engine_options, get_profile, pool_status
 
 
 class SyncDatabaseManager:
@@ -16,21 +19,51 @@ class SyncDatabaseManager:
         self._engine = None
         self._session_factory = None
     
-    def get_session(self) -> Session:
-        """Get a new synchronous database session for Celery tasks."""
+    def _ensure_engine(self):
         if self._engine is None:
-            self._engine = create_engine(
-                settings.SYNC_DATABASE_URL, 
-                echo=False,
-                pool_pre_ping=True,  # Verify connections before use
-                pool_recycle=3600,   # Recycle connections every hour
-            )
+            # Same profile as the API engine, but never echo from workers
+            options = engine_options(get_profile(), "psycopg2")
+            options["echo"] = False
+            self._engine = create_engine(settings.SYNC_DATABASE_URL, **options)
+            metrics.instrument_engine(self._engine, "sync")
+            profiler.instrument_engine(self._engine)
             self._session_factory = sessionmaker(
                 self._engine, 
                 expire_on_commit=False
             )
-        
+        return self._engine
+
+    def get_session(self) -> Session:
+        """Get a new synchronous database session for Celery tasks."""
+        self._ensure_engine()
         return self._session_factory()
+
+    def warm_up(self):
+        """Open the profile's warm-up connections and return them to the pool."""
+        profile = get_profile()
+        count = min(profile.warmup_connections, profile.pool_size) if profile.pooled else 0
+        if not count:
+            return
+        engine = self._ensure_engine()
+        # Held open together so the pool has to create `count` distinct connections
+        connections = []
+        try:
+            for _ in range(count):
+                connection = engine.connect()
+                connections.append(connection)
+                connection.execute(text("SELECT 1"))
+            print(f"[INFO] Sync database pool warmed up with {count} connections ({profile.name} profile)")
+        except Exception as exc:
+            print(f"[WARN] Sync database warm-up failed: {exc}")
+        finally:
+            for connection in connections:
+                connection.close()
+
+    def pool_status(self) -> Optional[dict]:
+        """Pool counters, or None while no engine has been created in this process."""
+        if self._engine is None:
+            return None
+        return pool_status(self._engine)
     
     def close(self):
         """Close the database engine."""
@@ -42,6 +75,7 @@ class SyncDatabaseManager:
 
 # Global instance for Celery tasks
 sync_db_manager = SyncDatabaseManager()
+metrics.register_pool("sync", sync_db_manager.pool_status)
 
 
 @contextmanager
@@ -1,25 +1,28 @@
+import base64
 import datetime
-from sqlalchemy import or_
+from collections import Counter
+from sqlalchemy import Date, Integer, column, or_, delete, func, insert, literal_column, tuple_, update, values
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 from sqlalchemy.orm import selectinload, Session
+from redis.exceptions import RedisError
 
-from app import schemas
-from app.models import User, Habit, Record
-from passlib.context import CryptContext
-
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from app import archive, leaderboards, schemas, stats
+from app.core import auth_cache, events, passwords, replicas, response_cache
+from app.core.redis import REMINDER_WAKE_CHANNEL, get_redis
+from app.models import (
+    User, Habit, Record, HabitStats, HabitDailyCount, AnalyticsResult, NotificationOutbox, Friendship,
+    RecordArchive, SyncTombstone, CURRENT_XID,
+)
 
 # ---------- Users ----------
 async def get_user_by_email(db: AsyncSession, email: str):
     result = await db.execute(select(User).where(User.email == email))
     return result.scalars().first()
 
-MAX_BCRYPT_LENGTH = 72
-
 async def create_user(db, user):
-    password_bytes = user.password.encode("utf-8")[:MAX_BCRYPT_LENGTH]
-    hashed = pwd_context.hash(password_bytes)
+    hashed = await passwords.hash_password(user.password)
 
     db_user = User(email=user.email, password_hash=hashed, telegram_chat_id=user.telegram_chat_id)
     db.add(db_user)
@@ -28,69 +31,817 @@ async def create_user(db, user):
     return db_user
 
 
-def verify_password(plain, hashed):
-    return pwd_context.verify(plain, hashed)
+async def authenticate_user(db: AsyncSession, email: str, password: str):
+    """Return the user for valid credentials, upgrading outdated password hashes on the way."""
+    user = await get_user_by_email(db, email)
+    if not user:
+        return None
+    valid, new_hash = await passwords.verify_password(password, user.password_hash)
+    if not valid:
+        return None
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+    return user
+
+
+async def update_user(db: AsyncSession, user_id: int, data: schemas.UserUpdate):
+    db_user = await db.get(User, user_id)
+    if db_user is None:
+        return None
+    for key, value in data.model_dump(exclude_unset=True).items():
+        setattr(db_user, key, value)
+    await db.commit()
+    await auth_cache.invalidate_user(user_id)
+    return db_user
+
+
+async def delete_user(db: AsyncSession, user_id: int):
+    habit_ids = await _delete_habits(db, Habit.user_id == user_id)
+    result = await db.execute(delete(User).where(User.id == user_id))
+    await db.commit()
+    for habit_id in habit_ids:
+        archive.discard(habit_id)
+    await auth_cache.invalidate_user(user_id)
+    await _user_data_changed(user_id)
+    await leaderboards.remove_user(user_id)
+    return result.rowcount > 0
+
+
+# ---------- Friends ----------
+async def add_friend(db: AsyncSession, user_id: int, friend_email: str):
+    """Befriend another user by email, in both directions; returns the friend or None when unknown."""
+    friend = await get_user_by_email(db, friend_email)
+    if friend is None or friend.id == user_id:
+        return None
+    stmt = pg_insert(Friendship).values([
+        {"user_id": user_id, "friend_id": friend.id},
+        {"user_id": friend.id, "friend_id": user_id},
+    ])
+    await db.execute(stmt.on_conflict_do_nothing())
+    await db.commit()
+    return friend
+
+async def remove_friend(db: AsyncSession, user_id: int, friend_id: int):
+    result = await db.execute(
+        delete(Friendship).where(or_(
+            (Friendship.user_id == user_id) & (Friendship.friend_id == friend_id),
+            (Friendship.user_id == friend_id) & (Friendship.friend_id == user_id),
+        ))
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+async def get_friend_ids(db: AsyncSession, user_id: int) -> list[int]:
+    result = await db.execute(select(Friendship.friend_id).where(Friendship.user_id == user_id))
+    return list(result.scalars().all())
+
+
+async def _record_change(db: AsyncSession, user_id: int, deleted: dict[str, list[int]] | None = None):
+    """
+    Inside a write transaction: raise the user's change version for delta sync
+    and leave tombstones for deleted habits/records, keyed by kind.
+    """
+    await db.execute(
+        update(User).where(User.id == user_id)
+        .values(change_version=func.greatest(User.change_version, CURRENT_XID))
+    )
+    tombstones = [
+        {"user_id": user_id, "kind": kind, "object_id": object_id}
+        for kind, object_ids in (deleted or {}).items() for object_id in object_ids
+    ]
+    if tombstones:
+        await db.execute(insert(SyncTombstone), tombstones)
+
+async def _user_data_changed(user_id: int):
+    """
+    After committing a write: drop the user's cached reads, keep their reads
+    on the primary for a while and notify their connected devices.
+    """
+    # Pin before bumping: a replica read that sees the new version must also see the pin
+    await replicas.pin_to_primary(user_id)
+    await response_cache.bump_user_version(user_id)
+    await events.publish_change(user_id)
 
 
 # ---------- Habits ----------
 async def create_habit(db: AsyncSession, user_id: int, habit: schemas.HabitCreate):
     db_habit = Habit(user_id=user_id, **habit.model_dump())
+    db_habit.next_reminder_at = db_habit.reminder_date
     db.add(db_habit)
+    await _record_change(db, user_id)
     await db.commit()
     await db.refresh(db_habit)
+    await _user_data_changed(user_id)
+    if db_habit.next_reminder_at is not None:
+        await _wake_reminder_scheduler(db_habit.next_reminder_at)
     return db_habit
 
+async def _wake_reminder_scheduler(fire_at: datetime.datetime):
+    """Best effort: the scheduler also re-checks on its own at least every REMINDER_MAX_SLEEP_SECONDS."""
+    try:
+        await get_redis().publish(REMINDER_WAKE_CHANNEL, fire_at.isoformat())
+    except RedisError:
+        pass
+
 async def get_habits(db: AsyncSession, user_id: int):
     result = await db.execute(select(Habit).where(Habit.user_id == user_id))
     return result.scalars().all()
 
+async def get_habit_rows(db: AsyncSession, user_id: int):
+    """A user's habits as plain (title, description, reminder_date, id) rows."""
+    result = await db.execute(
+        select(Habit.title, Habit.description, Habit.reminder_date, Habit.id)
+        .where(Habit.user_id == user_id)
+    )
+    return result.all()
+
+async def get_habits_with_records(db: AsyncSession, user_id: int, since: datetime.datetime):
+    """Habits of a user with their records since `since`, loaded in two queries."""
+    result = await db.execute(
+        select(Habit)
+        .where(Habit.user_id == user_id)
+        .options(selectinload(Habit.records.and_(Record.date >= since)))
+        .order_by(Habit.id)
+    )
+    habits = result.scalars().all()
+    for habit in habits:
+        habit.records.sort(key=lambda record: (record.date, record.id))
+    return habits
+
+async def _delete_habits(db: AsyncSession, *where) -> list[int]:
+    """
+    Delete the habits matching `where` together with their records; returns their ids.
+
+    Rows referencing habits in other tables go with them through ON DELETE
+    CASCADE. The caller discards the habits' archive files after committing.
+    """
+    await db.execute(delete(Record).where(Record.habit_id.in_(select(Habit.id).where(*where))))
+    result = await db.execute(delete(Habit).where(*where).returning(Habit.id))
+    return list(result.scalars().all())
+
 async def delete_habit(db: AsyncSession, habit_id: int, user_id: int):
-    result = await db.execute(select(Habit).where(Habit.id == habit_id, Habit.user_id == user_id))
-    habit = result.scalars().first()
+    habit = await _lock_habit(db, habit_id, user_id)
     if habit:
-        await db.delete(habit)
+        await _delete_habits(db, Habit.id == habit_id)
+        await _record_change(db, user_id, {"habit": [habit_id]})
         await db.commit()
+        archive.discard(habit_id)
+        await _user_data_changed(user_id)
+        await leaderboards.resync_user(db, user_id)
     return habit
 
 # ---------- Records ----------
-async def create_record(db: AsyncSession, record: schemas.RecordCreate):
+async def create_record(db: AsyncSession, record: schemas.RecordCreate, user_id: int):
+    habit = await _lock_habit(db, record.habit_id, user_id)
+    if habit is None:
+        return None
     db_record = Record(**record.model_dump())
+    if db_record.date.tzinfo is None:
+        # Stats compare it with the aware timestamps loaded from the database
+        db_record.date = db_record.date.replace(tzinfo=datetime.UTC)
     db.add(db_record)
+    await db.flush()
+    await _on_record_added(db, db_record)
+    await _record_change(db, user_id)
     await db.commit()
     await db.refresh(db_record)
+    await _user_data_changed(user_id)
+    await leaderboards.record_changed(db, user_id, db_record.date, 1)
     return db_record
 
-async def get_records(db: AsyncSession, habit_id: int):
-    result = await db.execute(select(Record).where(Record.habit_id == habit_id))
-    return result.scalars().all()
+BULK_CHUNK_SIZE = 5000
+
+async def bulk_create_records(db: AsyncSession, user_id: int, records: list[schemas.RecordCreate]):
+    """
+    Insert many records in one transaction.
+
+    Ownership of the referenced habits is checked once; records pointing at
+    other habits are skipped and their positions returned. Rows go through
+    COPY on asyncpg and a batched executemany otherwise.
+    """
+    habit_ids = {record.habit_id for record in records}
+    result = await db.execute(
+        select(Habit.id)
+        .where(Habit.id.in_(habit_ids), Habit.user_id == user_id)
+        .order_by(Habit.id)
+        .with_for_update()
+    )
+    owned = set(result.scalars().all())
+    rejected = [index for index, record in enumerate(records) if record.habit_id not in owned]
+    rows = [
+        (record.habit_id, record.date if record.date.tzinfo else record.date.replace(tzinfo=datetime.UTC))
+        for record in records if record.habit_id in owned
+    ]
 
-async def delete_record(db: AsyncSession, habit_id: int, record_id: int):
+    connection = await db.connection()
+    driver_connection = (await connection.get_raw_connection()).driver_connection
+    for start in range(0, len(rows), BULK_CHUNK_SIZE):
+        chunk = rows[start:start + BULK_CHUNK_SIZE]
+        if hasattr(driver_connection, "copy_records_to_table"):
+            await driver_connection.copy_records_to_table(
+                Record.__tablename__, records=chunk, columns=["habit_id", "date"]
+            )
+        else:
+            await db.execute(insert(Record), [{"habit_id": habit_id, "date": date} for habit_id, date in chunk])
+
+    daily_counts = Counter((habit_id, stats.record_day(date)) for habit_id, date in rows)
+    await _add_daily_counts(db, daily_counts)
+    for habit_id in sorted({habit_id for habit_id, _ in rows}):
+        await recompute_habit_stats(db, habit_id)
+    if rows:
+        await _record_change(db, user_id)
+    await db.commit()
+    await _user_data_changed(user_id)
+    if rows:
+        await leaderboards.resync_user(db, user_id)
+    return len(rows), rejected
+
+async def get_records(
+    db: AsyncSession,
+    habit_id: int,
+    user_id: int,
+    date_from: datetime.datetime | None = None,
+    date_to: datetime.datetime | None = None,
+    after: tuple[datetime.datetime, int] | None = None,
+    limit: int = 100,
+):
+    """
+    One page of a habit's records ordered by (date, id).
+
+    Records come back as plain (habit_id, date, id) rows, together with the
+    cursor of the next page, or None on the last one. When the requested range
+    reaches below the habit's archive bound, archived records are merged in.
+    """
+    stmt = (
+        select(Record.habit_id, Record.date, Record.id)
+        .join(Habit, Habit.id == Record.habit_id)
+        .where(Record.habit_id == habit_id, Habit.user_id == user_id)
+        .order_by(Record.date, Record.id)
+        .limit(limit + 1)
+    )
+    if date_from is not None:
+        stmt = stmt.where(Record.date >= date_from)
+    if date_to is not None:
+        stmt = stmt.where(Record.date < date_to)
+    if after is not None:
+        # The plain date bound lets the index scan start at the cursor
+        stmt = stmt.where(Record.date >= after[0], tuple_(Record.date, Record.id) > tuple_(*after))
+    result = await db.execute(stmt)
+    records = result.all()
+
+    archived = await db.execute(
+        select(RecordArchive.version, RecordArchive.archived_before)
+        .join(Habit, Habit.id == RecordArchive.habit_id)
+        .where(RecordArchive.habit_id == habit_id, Habit.user_id == user_id)
+    )
+    archived = archived.first()
+    if archived is not None and archive.reaches(archived.archived_before, date_from, after):
+        array = archive.load(habit_id, archived.version)
+        records = sorted(
+            [*records, *archive.select_range(array, habit_id, date_from, date_to, after, limit + 1)],
+            key=lambda record: (record.date, record.id),
+        )[:limit + 1]
+
+    if len(records) <= limit:
+        return records, None
+    records = records[:limit]
+    return records, encode_record_cursor(records[-1])
+
+def encode_record_cursor(record) -> str:
+    raw = f"{record.date.isoformat()}|{record.id}".encode()
+    return base64.urlsafe_b64encode(raw).decode()
+
+def decode_record_cursor(cursor: str) -> tuple[datetime.datetime, int]:
+    """Raises ValueError for malformed cursors."""
+    date, record_id = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return datetime.datetime.fromisoformat(date), int(record_id)
+
+async def delete_record(db: AsyncSession, habit_id: int, record_id: int, user_id: int):
+    habit = await _lock_habit(db, habit_id, user_id)
+    if habit is None:
+        return None
     result = await db.execute(select(Record).where(Record.id == record_id, Record.habit_id == habit_id))
     record = result.scalars().first()
+    keep = None
     if record:
         await db.delete(record)
+        await db.flush()
+    else:
+        removed, keep = await _delete_archived_records(db, habit_id, [record_id])
+        record = removed[0] if removed else None
+    if record:
+        await _on_record_removed(db, record)
+        await _record_change(db, user_id, {"record": [record.id]})
         await db.commit()
+        if keep is not None:
+            archive.discard(habit_id, keep=keep)
+        await _user_data_changed(user_id)
+        await leaderboards.record_changed(db, user_id, record.date, -1)
     return record
 
+async def _delete_archived_records(db: AsyncSession, habit_id: int, record_ids) -> tuple[list, tuple | None]:
+    """
+    Remove records from a locked habit's archive by switching it to a new file version without them.
+
+    Returns the removed records and the file versions to keep once the
+    transaction has committed (for archive.discard), or None when none of
+    the ids was archived. As in archival, the previous version stays for
+    readers that looked it up just before the commit.
+    """
+    archived = await db.get(RecordArchive, habit_id)
+    if archived is None:
+        return [], None
+    array, removed = archive.remove(archive.load(habit_id, archived.version), habit_id, record_ids)
+    if not removed:
+        return [], None
+    previous = archived.version
+    archived.version = previous + 1
+    archived.record_count = array.shape[1]
+    archive.write(habit_id, archived.version, array)
+    await db.flush()
+    return removed, (archived.version, previous)
+
+
+# ---------- Batch ----------
+async def apply_batch(db: AsyncSession, user_id: int, operations: list) -> list[dict]:
+    """
+    Apply an ordered list of habit and record operations in one transaction.
+
+    The user's referenced habits are locked once and every operation is
+    checked in order against them, so e.g. a record created after its habit
+    was deleted in the same batch fails. The work then runs as one statement
+    per kind: habit inserts, record deletes, record inserts, habit deletes.
+    Like the bulk import, operations pointing at missing habits or records
+    fail on their own and the rest is committed together. Returns one
+    {"index", "status", "id", "error"} dict per operation.
+    """
+    results = [{"index": index, "status": 200, "id": None, "error": None} for index in range(len(operations))]
+    referenced = {op.habit_id for op in operations if getattr(op, "habit_id", None) is not None}
+    alive = set()
+    if referenced:
+        result = await db.execute(
+            select(Habit.id)
+            .where(Habit.id.in_(referenced), Habit.user_id == user_id)
+            .order_by(Habit.id)
+            .with_for_update()
+        )
+        alive = set(result.scalars().all())
+
+    # Habits created by the batch cannot be referenced by id earlier in it, so they are inserted first
+    new_habits = [(index, op) for index, op in enumerate(operations) if op.op == "create_habit"]
+    refs = {}
+    reminders = []
+    if new_habits:
+        result = await db.execute(
+            insert(Habit).returning(Habit.id, Habit.next_reminder_at, sort_by_parameter_order=True),
+            [
+                {"user_id": user_id, **op.model_dump(exclude={"op", "ref"}), "next_reminder_at": op.reminder_date}
+                for _, op in new_habits
+            ],
+        )
+        for (index, op), (habit_id, next_reminder_at) in zip(new_habits, result.all()):
+            results[index].update(status=201, id=habit_id)
+            if next_reminder_at is not None:
+                reminders.append(next_reminder_at)
+            alive.add(habit_id)
+            if op.ref is not None:
+                refs[op.ref] = index
+
+    deleted_habits, new_records, record_deletes = [], [], []
+    for index, op in enumerate(operations):
+        if op.op == "create_habit":
+            continue
+        habit_id = op.habit_id
+        if habit_id is None:
+            created_at = refs.get(op.habit_ref)
+            habit_id = results[created_at]["id"] if created_at is not None and created_at < index else None
+        if habit_id not in alive:
+            results[index].update(status=404, error="Habit not found")
+        elif op.op == "delete_habit":
+            alive.discard(habit_id)
+            deleted_habits.append(habit_id)
+        elif op.op == "create_record":
+            date = op.date if op.date.tzinfo else op.date.replace(tzinfo=datetime.UTC)
+            new_records.append((index, habit_id, date))
+        else:
+            record_deletes.append((index, habit_id, op.record_id))
+
+    removed_counts = Counter()
+    deleted_records = []
+    archive_keeps = {}
+    if record_deletes:
+        keys = [(habit_id, record_id) for _, habit_id, record_id in record_deletes]
+        result = await db.execute(
+            delete(Record)
+            .where(tuple_(Record.habit_id, Record.id).in_(keys))
+            .returning(Record.habit_id, Record.id, Record.date)
+        )
+        removed = {}
+        for habit_id, record_id, date in result.all():
+            removed[(habit_id, record_id)] = date
+        missing = {}
+        for habit_id, record_id in keys:
+            if (habit_id, record_id) not in removed:
+                missing.setdefault(habit_id, []).append(record_id)
+        for habit_id, record_ids in sorted(missing.items()):
+            archived, keep = await _delete_archived_records(db, habit_id, record_ids)
+            for record in archived:
+                removed[(habit_id, record.id)] = record.date
+            if keep is not None:
+                archive_keeps[habit_id] = keep
+        for (habit_id, _), date in removed.items():
+            removed_counts[(habit_id, stats.record_day(date))] += 1
+        for index, habit_id, record_id in record_deletes:
+            if removed.pop((habit_id, record_id), None) is None:
+                results[index].update(status=404, error="Record not found")
+            else:
+                results[index]["id"] = record_id
+                deleted_records.append(record_id)
+
+    if new_records:
+        result = await db.execute(
+            insert(Record).returning(Record.id, sort_by_parameter_order=True),
+            [{"habit_id": habit_id, "date": date} for _, habit_id, date in new_records],
+        )
+        for (index, _, _), record_id in zip(new_records, result.scalars().all()):
+            results[index].update(status=201, id=record_id)
+
+    await _add_daily_counts(db, Counter((habit_id, stats.record_day(date)) for _, habit_id, date in new_records))
+    await _subtract_daily_counts(db, removed_counts)
+    touched = {habit_id for _, habit_id, _ in new_records} | {habit_id for habit_id, _ in removed_counts}
+    for habit_id in sorted(touched - set(deleted_habits)):
+        await recompute_habit_stats(db, habit_id)
+    if deleted_habits:
+        await _delete_habits(db, Habit.id.in_(deleted_habits))
+    if new_habits or touched or deleted_habits:
+        await _record_change(db, user_id, {"habit": deleted_habits, "record": deleted_records})
+    await db.commit()
+
+    for habit_id, keep in archive_keeps.items():
+        archive.discard(habit_id, keep=keep)
+    for habit_id in deleted_habits:
+        archive.discard(habit_id)
+    await _user_data_changed(user_id)
+    if touched or deleted_habits:
+        await leaderboards.resync_user(db, user_id)
+    if reminders:
+        # Read back from the database, so naive and aware reminder dates compare as timestamptz
+        await _wake_reminder_scheduler(min(reminders))
+    return results
+
+
+# ---------- Delta sync ----------
+SNAPSHOT_XMIN = literal_column("pg_snapshot_xmin(pg_current_snapshot())::text::bigint")
+
+async def get_changes(db: AsyncSession, user_id: int, since: int | None = None) -> dict:
+    """
+    A user's habits, records and tombstones changed since version `since`, or everything when None.
+
+    Versions are ids of the writing transactions, which commit out of order,
+    so the returned "version" to resume from is the oldest transaction still
+    running: whatever commits later has a version at or above it. Changes
+    committed in between may be sent twice, which clients apply idempotently.
+    An idle user costs the single users lookup.
+    """
+    result = await db.execute(select(User.change_version, SNAPSHOT_XMIN).where(User.id == user_id))
+    user_version, xmin = result.one()
+    changes = {"version": xmin, "habits": [], "records": [], "deleted_habits": [], "deleted_records": []}
+    if since is not None and user_version < since:
+        return changes
+
+    habits = (
+        select(Habit.id, Habit.title, Habit.description, Habit.reminder_date)
+        .where(Habit.user_id == user_id)
+        .order_by(Habit.id)
+    )
+    records = (
+        select(Record.habit_id, Record.date, Record.id)
+        .join(Habit, Habit.id == Record.habit_id)
+        .where(Habit.user_id == user_id)
+        .order_by(Record.habit_id, Record.date, Record.id)
+    )
+    if since is not None:
+        habits = habits.where(Habit.change_version >= since)
+        records = records.where(Record.change_version >= since)
+        tombstones = await db.execute(
+            select(SyncTombstone.kind, SyncTombstone.object_id)
+            .where(SyncTombstone.user_id == user_id, SyncTombstone.change_version >= since)
+        )
+        for kind, object_id in tombstones.all():
+            changes[f"deleted_{kind}s"].append(object_id)
+    changes["habits"] = (await db.execute(habits)).mappings().all()
+    changes["records"] = (await db.execute(records)).mappings().all()
+    if since is None:
+        # Archived records are part of the full state; archival itself is not a change for deltas
+        archived = await db.execute(
+            select(RecordArchive.habit_id, RecordArchive.version)
+            .join(Habit, Habit.id == RecordArchive.habit_id)
+            .where(Habit.user_id == user_id)
+        )
+        archived_records = [
+            record._asdict()
+            for habit_id, version in archived.all()
+            for record in archive.select_range(archive.load(habit_id, version), habit_id)
+        ]
+        if archived_records:
+            changes["records"] = sorted(
+                [*map(dict, changes["records"]), *archived_records],
+                key=lambda record: (record["habit_id"], record["date"], record["id"]),
+            )
+    return changes
+
+def encode_sync_cursor(version: int, issued_at: datetime.datetime | None = None) -> str:
+    issued_at = issued_at or datetime.datetime.now(datetime.UTC)
+    return base64.urlsafe_b64encode(f"{version}|{int(issued_at.timestamp())}".encode()).decode()
+
+def decode_sync_cursor(cursor: str) -> tuple[int, datetime.datetime]:
+    """Raises ValueError for malformed cursors."""
+    version, issued_at = base64.urlsafe_b64decode(cursor.encode()).decode().split("|")
+    return int(version), datetime.datetime.fromtimestamp(int(issued_at), datetime.UTC)
+
+
+# ---------- Habit stats ----------
+async def _lock_habit(db: AsyncSession, habit_id: int, user_id: int):
+    """Fetch an owned habit and lock it so concurrent writes update its stats in turn."""
+    result = await db.execute(
+        select(Habit).where(Habit.id == habit_id, Habit.user_id == user_id).with_for_update()
+    )
+    return result.scalars().first()
+
+async def _get_or_create_stats(db: AsyncSession, habit_id: int):
+    habit_stats = await db.get(HabitStats, habit_id)
+    if habit_stats is None:
+        habit_stats = HabitStats(habit_id=habit_id, **stats.compute_stats([], 0, None))
+        db.add(habit_stats)
+    return habit_stats
+
+async def _add_daily_counts(db: AsyncSession, counts: dict[tuple[int, datetime.date], int]):
+    """Add to the `habit_daily_counts` rollup; keys are (habit_id, day)."""
+    values = [
+        {"habit_id": habit_id, "day": day, "count": count} for (habit_id, day), count in sorted(counts.items())
+    ]
+    for start in range(0, len(values), BULK_CHUNK_SIZE):
+        stmt = pg_insert(HabitDailyCount).values(values[start:start + BULK_CHUNK_SIZE])
+        await db.execute(stmt.on_conflict_do_update(
+            index_elements=[HabitDailyCount.habit_id, HabitDailyCount.day],
+            set_={"count": HabitDailyCount.count + stmt.excluded.count},
+        ))
+
+async def _remove_daily_count(db: AsyncSession, habit_id: int, day: datetime.date) -> int:
+    """Take one record off the rollup and return how many are left on that day."""
+    key = (HabitDailyCount.habit_id == habit_id, HabitDailyCount.day == day)
+    result = await db.execute(
+        update(HabitDailyCount).where(*key).values(count=HabitDailyCount.count - 1).returning(HabitDailyCount.count)
+    )
+    remaining = result.scalar()
+    if remaining is not None and remaining <= 0:
+        await db.execute(delete(HabitDailyCount).where(*key))
+    return remaining or 0
+
+async def _subtract_daily_counts(db: AsyncSession, counts: dict[tuple[int, datetime.date], int]):
+    """Take records off the `habit_daily_counts` rollup in one statement, dropping days that reach zero."""
+    if not counts:
+        return
+    deltas = values(
+        column("habit_id", Integer), column("day", Date), column("count", Integer), name="deltas"
+    ).data([(habit_id, day, count) for (habit_id, day), count in sorted(counts.items())])
+    await db.execute(
+        update(HabitDailyCount)
+        .where(HabitDailyCount.habit_id == deltas.c.habit_id, HabitDailyCount.day == deltas.c.day)
+        .values(count=HabitDailyCount.count - deltas.c.count)
+    )
+    await db.execute(
+        delete(HabitDailyCount)
+        .where(tuple_(HabitDailyCount.habit_id, HabitDailyCount.day).in_(list(counts)), HabitDailyCount.count <= 0)
+    )
+
+async def _on_record_added(db: AsyncSession, record: Record):
+    await _add_daily_counts(db, {(record.habit_id, stats.record_day(record.date)): 1})
+    habit_stats = await _get_or_create_stats(db, record.habit_id)
+    if not stats.apply_completion(habit_stats, record.date):
+        await recompute_habit_stats(db, record.habit_id)
+
+async def _on_record_removed(db: AsyncSession, record: Record):
+    remaining = await _remove_daily_count(db, record.habit_id, stats.record_day(record.date))
+    habit_stats = await _get_or_create_stats(db, record.habit_id)
+    if not stats.apply_removal(habit_stats, record.date, remaining > 0):
+        await recompute_habit_stats(db, record.habit_id)
+
+async def recompute_habit_stats(db: AsyncSession, habit_id: int):
+    """Rebuild one habit's stats from its live and archived records inside the current transaction."""
+    day = stats.day_column(Record.date)
+    result = await db.execute(
+        select(func.count(), func.max(Record.date)).where(Record.habit_id == habit_id)
+    )
+    total, last_completion = result.one()
+    result = await db.execute(
+        select(day).where(Record.habit_id == habit_id).group_by(day).order_by(day)
+    )
+    days = result.scalars().all()
+    archived = await db.get(RecordArchive, habit_id)
+    if archived is not None:
+        array = archive.load(habit_id, archived.version)
+        days, total, last_completion = archive.add_to_stats(array, days, total, last_completion)
+    habit_stats = await _get_or_create_stats(db, habit_id)
+    for key, value in stats.compute_stats(days, total, last_completion).items():
+        setattr(habit_stats, key, value)
+    return habit_stats
+
+async def get_habit_stats(db: AsyncSession, habit_id: int, user_id: int):
+    result = await db.execute(
+        select(Habit.id, HabitStats)
+        .outerjoin(HabitStats, HabitStats.habit_id == Habit.id)
+        .where(Habit.id == habit_id, Habit.user_id == user_id)
+    )
+    row = result.first()
+    if row is None:
+        return None
+    return stats.snapshot(row[0], row[1])
+
+async def get_habit_calendar(db: AsyncSession, habit_id: int, user_id: int, year: int):
+    """Records per day of `year` from the daily rollup, or None when the habit is not the user's."""
+    owned = await db.scalar(select(Habit.id).where(Habit.id == habit_id, Habit.user_id == user_id))
+    if owned is None:
+        return None
+    start = datetime.date(year, 1, 1)
+    end = datetime.date(year + 1, 1, 1)
+    result = await db.execute(
+        select(HabitDailyCount.day, HabitDailyCount.count)
+        .where(HabitDailyCount.habit_id == habit_id, HabitDailyCount.day >= start, HabitDailyCount.day < end)
+    )
+    counts = [0] * (end - start).days
+    for day, count in result.all():
+        counts[(day - start).days] = count
+    return counts
+
+
+# ---------- Export ----------
+EXPORT_BATCH_SIZE = 2000
+
+async def iter_export_rows(db: AsyncSession, user_id: int):
+    """
+    Stream a user's habits joined with their records in batches.
+
+    Uses a server-side cursor, so only one batch is held in memory at a time.
+    Habits without records yield a single row with empty record columns.
+    Archived records are interleaved from their memory-mapped files.
+    """
+    result = await db.execute(
+        select(RecordArchive.habit_id, RecordArchive.version)
+        .join(Habit, Habit.id == RecordArchive.habit_id)
+        .where(Habit.user_id == user_id, RecordArchive.record_count > 0)
+    )
+    merger = archive.ExportMerger({
+        habit_id: archive.load(habit_id, version) for habit_id, version in result.all()
+    })
+    stmt = (
+        select(Habit.id, Habit.title, Habit.description, Habit.reminder_date, Record.id, Record.date)
+        .outerjoin(Record, Record.habit_id == Habit.id)
+        .where(Habit.user_id == user_id)
+        .order_by(Habit.id, Record.date, Record.id)
+        .execution_options(yield_per=EXPORT_BATCH_SIZE)
+    )
+    result = await db.stream(stmt)
+    async for partition in result.partitions():
+        rows = merger.feed(partition)
+        if rows:
+            yield rows
+    rows = merger.finish()
+    if rows:
+        yield rows
+
+
+# ---------- Analytics ----------
+async def get_analytics_results(db: AsyncSession, metric: str | None = None):
+    stmt = select(AnalyticsResult).order_by(AnalyticsResult.metric, AnalyticsResult.cohort)
+    if metric:
+        stmt = stmt.where(AnalyticsResult.metric == metric)
+    result = await db.execute(stmt)
+    return result.scalars().all()
+
 
 # ---------- Sync versions for Celery tasks ----------
-def get_users_with_due_reminders_sync(db: Session):
-    """Synchronous version for Celery tasks."""
+OUTBOX_ACTIVE_STATUSES = ("pending", "retrying", "sending")
+
+def claim_due_reminders_sync(db: Session, limit: int):
+    """
+    Take up to `limit` due reminders off the schedule.
+
+    Clearing `next_reminder_at` in the same statement makes each reminder fire
+    once; SKIP LOCKED lets several schedulers run side by side. Returns
+    (habit_id, user_id, fire_at) rows; the caller commits.
+    """
     now = datetime.datetime.now(datetime.UTC)
-    # Convert to naive datetime for database comparison
-    now_naive = now.replace(tzinfo=None)
+    due = (
+        select(Habit.id, Habit.next_reminder_at)
+        .where(Habit.next_reminder_at.is_not(None), Habit.next_reminder_at <= now)
+        .order_by(Habit.next_reminder_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+        .subquery()
+    )
+    stmt = (
+        update(Habit)
+        .where(Habit.id == due.c.id)
+        .values(next_reminder_at=None)
+        .returning(Habit.id, Habit.user_id, due.c.next_reminder_at)
+    )
+    return db.execute(stmt).all()
+
 
+def enqueue_reminders_sync(db: Session, claimed) -> int:
+    """
+    Write one outbox row per (user, habit, fire time).
+
+    Inserts are idempotent, so replaying a claim never queues a second message.
+    """
+    claimed = [row for row in claimed if row[1] is not None]
+    if not claimed:
+        return 0
+    chat_ids = get_chat_ids_sync(db, {user_id for _, user_id, _ in claimed})
     stmt = (
-        select(User)
-        .join(Habit, Habit.user_id == User.id)
-        .options(selectinload(User.habits))
+        pg_insert(NotificationOutbox)
+        .values([
+            {"habit_id": habit_id, "user_id": user_id, "fire_at": fire_at, "chat_id": chat_ids.get(user_id)}
+            for habit_id, user_id, fire_at in claimed
+        ])
+        .on_conflict_do_nothing(constraint="uq_notification_outbox_user_habit_fire")
+    )
+    return db.execute(stmt).rowcount
+
+
+def get_chat_ids_sync(db: Session, user_ids):
+    result = db.execute(select(User.id, User.telegram_chat_id).where(User.id.in_(user_ids)))
+    return dict(result.all())
+
+
+def claim_outbox_batch_sync(db: Session, limit: int, lease_seconds: int):
+    """
+    Lease up to `limit` deliverable outbox rows to this worker.
+
+    Rows move to `sending` until the lease expires; a worker that dies
+    mid-send leaves them to be claimed again afterwards. The caller commits.
+    """
+    now = datetime.datetime.now(datetime.UTC)
+    claimable = (
+        select(NotificationOutbox.id)
         .where(
-            Habit.reminder_date.is_not(None),
-            Habit.reminder_date <= now_naive
+            NotificationOutbox.status.in_(OUTBOX_ACTIVE_STATUSES),
+            NotificationOutbox.next_attempt_at <= now,
         )
-        .distinct()
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    stmt = (
+        update(NotificationOutbox)
+        .where(NotificationOutbox.id.in_(claimable.scalar_subquery()))
+        .values(
+            status="sending",
+            attempts=NotificationOutbox.attempts + 1,
+            next_attempt_at=now + datetime.timedelta(seconds=lease_seconds),
+        )
+        .returning(NotificationOutbox.id, NotificationOutbox.user_id, NotificationOutbox.chat_id, NotificationOutbox.attempts)
+    )
+    return db.execute(stmt).all()
+
+
+def mark_outbox_sync(db: Session, ids, status: str, error: str | None = None, retry_in: float | None = None):
+    now = datetime.datetime.now(datetime.UTC)
+    values = {"status": status, "last_error": error}
+    if status == "sent":
+        values["sent_at"] = now
+    if retry_in is not None:
+        values["next_attempt_at"] = now + datetime.timedelta(seconds=retry_in)
+    db.execute(update(NotificationOutbox).where(NotificationOutbox.id.in_(ids)).values(**values))
+
+
+def prune_outbox_sync(db: Session, older_than: datetime.datetime) -> int:
+    result = db.execute(
+        delete(NotificationOutbox)
+        .where(NotificationOutbox.status.in_(("sent", "failed")), NotificationOutbox.created_at < older_than)
     )
+    return result.rowcount
+
+
+def prune_tombstones_sync(db: Session, older_than: datetime.datetime) -> int:
+    result = db.execute(delete(SyncTombstone).where(SyncTombstone.deleted_at < older_than))
+    return result.rowcount
+
 
-    result = db.execute(stmt)
-    users = result.scalars().all()
-    return users
\ No newline at end of file
+def next_reminder_time_sync(db: Session):
+    """Earliest moment the scheduler has work: a pending reminder or an outbox retry."""
+    reminder = db.execute(
+        select(Habit.next_reminder_at)
+        .where(Habit.next_reminder_at.is_not(None))
+        .order_by(Habit.next_reminder_at)
+        .limit(1)
+    ).scalar()
+    retry = db.execute(
+        select(NotificationOutbox.next_attempt_at)
+        .where(NotificationOutbox.status.in_(OUTBOX_ACTIVE_STATUSES))
+        .order_by(NotificationOutbox.next_attempt_at)
+        .limit(1)
+    ).scalar()
+    return min((moment for moment in (reminder, retry) if moment is not None), default=None)
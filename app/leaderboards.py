@@ -0,0 +1,187 @@
+"""
+Leaderboards kept in Redis sorted sets.
+
+Boards, with user ids as members:
+
+- checkins/week: records per user in one ISO week (STATS_TIMEZONE days),
+  one set per week, expired LEADERBOARD_WEEKS_KEPT weeks after it ends
+- checkins/all: records per user, all time
+- streak/all: the user's best current streak across their habits
+
+Record writes in crud adjust the sets right after committing; habit
+deletion and bulk imports re-read the user's scores from Postgres. Updates
+are best effort: the reconciliation task (app.tasks.leaderboards) rebuilds
+every board from Postgres and also lets streaks of inactive users lapse.
+Ranks, pages and a user's position are O(log n) sorted set lookups.
+"""
+import datetime
+from typing import Optional
+
+from redis.exceptions import RedisError
+from sqlalchemy import func, select
+
+from app import stats
+from app.core.config import settings
+from app.core.redis import get_redis
+from app.models import Habit, HabitDailyCount, HabitStats
+
+METRICS = ("checkins", "streak")
+PERIODS = ("week", "all")
+
+
+def week_of(day: datetime.date) -> str:
+    year, week, _ = day.isocalendar()
+    return f"{year}-W{week:02d}"
+
+
+def week_start(day: datetime.date) -> datetime.date:
+    return day - datetime.timedelta(days=day.weekday())
+
+
+def current_day() -> datetime.date:
+    return stats.record_day(datetime.datetime.now(datetime.UTC))
+
+
+def board_key(metric: str, period: str, day: Optional[datetime.date] = None) -> str:
+    """Sorted set holding a board; week boards are keyed by the week containing `day` (today by default)."""
+    if metric not in METRICS or period not in PERIODS or (metric, period) == ("streak", "week"):
+        raise ValueError(f"No {metric}/{period} leaderboard")
+    if period == "week":
+        return f"leaderboard:{metric}:week:{week_of(day or current_day())}"
+    return f"leaderboard:{metric}:all"
+
+
+def week_expiry(day: datetime.date) -> datetime.datetime:
+    end = week_start(day) + datetime.timedelta(weeks=1 + settings.LEADERBOARD_WEEKS_KEPT)
+    return datetime.datetime.combine(end, datetime.time(), datetime.UTC)
+
+
+def streak_query(user_ids: Optional[list[int]] = None):
+    """(user_id, best current streak) rows; streaks whose last day is before yesterday have lapsed."""
+    yesterday = current_day() - datetime.timedelta(days=1)
+    stmt = (
+        select(Habit.user_id, func.max(HabitStats.current_streak))
+        .join(HabitStats, HabitStats.habit_id == Habit.id)
+        .where(stats.day_column(HabitStats.last_completion) >= yesterday, HabitStats.current_streak > 0)
+        .group_by(Habit.user_id)
+    )
+    if user_ids is not None:
+        stmt = stmt.where(Habit.user_id.in_(user_ids))
+    return stmt
+
+
+def checkins_query(since: Optional[datetime.date] = None, user_ids: Optional[list[int]] = None):
+    """(user_id, record count) rows, counting records on or after the day `since` when given."""
+    # Summed from the daily rollup, which still counts records moved to the archive
+    stmt = (
+        select(Habit.user_id, func.sum(HabitDailyCount.count))
+        .select_from(HabitDailyCount)
+        .join(Habit, Habit.id == HabitDailyCount.habit_id)
+        .group_by(Habit.user_id)
+    )
+    if since is not None:
+        stmt = stmt.where(HabitDailyCount.day >= since)
+    if user_ids is not None:
+        stmt = stmt.where(Habit.user_id.in_(user_ids))
+    return stmt
+
+
+async def _set_streak(db, pipe, user_id: int):
+    streak = (await db.execute(streak_query([user_id]))).first()
+    if streak:
+        pipe.zadd(board_key("streak", "all"), {user_id: streak[1]})
+    else:
+        pipe.zrem(board_key("streak", "all"), user_id)
+
+
+async def record_changed(db, user_id: int, moment: datetime.datetime, delta: int):
+    """Apply one committed record insert (+1) or delete (-1) to the boards."""
+    if not settings.LEADERBOARDS_ENABLED:
+        return
+    day = stats.record_day(moment)
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        pipe.zincrby(board_key("checkins", "all"), delta, user_id)
+        if week_expiry(day) > datetime.datetime.now(datetime.UTC):
+            key = board_key("checkins", "week", day)
+            pipe.zincrby(key, delta, user_id)
+            pipe.expireat(key, week_expiry(day))
+            pipe.zremrangebyscore(key, "-inf", 0)
+        pipe.zremrangebyscore(board_key("checkins", "all"), "-inf", 0)
+        await _set_streak(db, pipe, user_id)
+        await pipe.execute()
+    except RedisError as exc:
+        print(f"[WARN] Leaderboard update for user {user_id} skipped: {exc}")
+
+
+async def resync_user(db, user_id: int):
+    """Re-read all of a user's scores from Postgres, e.g. after a habit or many records changed."""
+    if not settings.LEADERBOARDS_ENABLED:
+        return
+    week = week_start(current_day())
+    total = (await db.execute(checkins_query(user_ids=[user_id]))).first()
+    this_week = (await db.execute(checkins_query(week, [user_id]))).first()
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for key, row in ((board_key("checkins", "all"), total), (board_key("checkins", "week"), this_week)):
+            if row:
+                pipe.zadd(key, {user_id: row[1]})
+            else:
+                pipe.zrem(key, user_id)
+        await _set_streak(db, pipe, user_id)
+        await pipe.execute()
+    except RedisError as exc:
+        print(f"[WARN] Leaderboard resync for user {user_id} skipped: {exc}")
+
+
+async def remove_user(user_id: int):
+    if not settings.LEADERBOARDS_ENABLED:
+        return
+    try:
+        pipe = get_redis().pipeline(transaction=False)
+        for metric, period in (("checkins", "all"), ("checkins", "week"), ("streak", "all")):
+            pipe.zrem(board_key(metric, period), user_id)
+        await pipe.execute()
+    except RedisError:
+        pass
+
+
+def _entries(pairs, first_rank: int) -> list[dict]:
+    return [
+        {"rank": first_rank + index, "user_id": int(member), "score": int(score)}
+        for index, (member, score) in enumerate(pairs)
+    ]
+
+
+async def page(metric: str, period: str, offset: int, limit: int) -> list[dict]:
+    """Entries ranked offset+1 .. offset+limit, best first."""
+    pairs = await get_redis().zrevrange(board_key(metric, period), offset, offset + limit - 1, withscores=True)
+    return _entries(pairs, offset + 1)
+
+
+async def position(metric: str, period: str, user_id: int) -> dict:
+    """A user's rank and score; rank is None while they are not on the board."""
+    key = board_key(metric, period)
+    pipe = get_redis().pipeline(transaction=False)
+    pipe.zrevrank(key, user_id)
+    pipe.zscore(key, user_id)
+    pipe.zcard(key)
+    rank, score, total = await pipe.execute()
+    return {
+        "user_id": user_id,
+        "rank": None if rank is None else rank + 1,
+        "score": int(score or 0),
+        "total": total,
+    }
+
+
+async def among(metric: str, period: str, user_ids: list[int]) -> list[dict]:
+    """Board restricted to the given users (e.g. a user and their friends)."""
+    if not user_ids:
+        return []
+    scores = await get_redis().zmscore(board_key(metric, period), user_ids)
+    ranked = sorted(
+        ((user_id, score or 0) for user_id, score in zip(user_ids, scores)),
+        key=lambda pair: (-pair[1], pair[0]),
+    )
+    return _entries(ranked, 1)
@@ -1,16 +1,49 @@
+from contextlib import asynccontextmanager
+
 import uvicorn
-from fastapi import FastAPI
-from app.routes import users, habits, records
+from fastapi import FastAPI, Response
+from app.core import database, events, metrics, profiler, replicas
+from app.core.sync_database import sync_db_manager
+from app.routes import users, habits, records, analytics, export, leaderboards, batch, sync, events as event_routes
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    await database.warm_up()
+    yield
+    await events.hub.shutdown()
+    await replicas.replica_set.dispose()
+    await database.engine.dispose()
 
-app = FastAPI(title="Async Habit Tracker API")
+app = FastAPI(title="Async Habit Tracker API", lifespan=lifespan)
+app.add_middleware(profiler.ProfilerMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
 app.include_router(users.router)
 app.include_router(habits.router)
 app.include_router(records.router)
+app.include_router(analytics.router)
+app.include_router(export.router)
+app.include_router(leaderboards.router)
+app.include_router(batch.router)
+app.include_router(sync.router)
+app.include_router(event_routes.router)
 
 @app.get("/")
 async def root():
     return {"message": "Habit Tracker API running!"}
 
+@app.get("/health/db")
+async def database_pool_status():
+    """Connection pool usage of this process's database engines."""
+    return {
+        "async": database.get_pool_status(),
+        "sync": sync_db_manager.pool_status(),
+        "replicas": replicas.replica_set.status(),
+    }
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    return Response(metrics.render(), media_type=metrics.CONTENT_TYPE_LATEST)
+
 if __name__ == "__main__":
     uvicorn.run(app, host="0.0.0.0", port=8000)
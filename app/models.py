@@ -1,14 +1,21 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, Date, Boolean, DateTime, func
+from sqlalchemy import (
+    BigInteger, Column, Integer, String, ForeignKey, Date, Boolean, DateTime, JSON, Index, UniqueConstraint, func, text,
+)
 from sqlalchemy.orm import declarative_base, relationship
 
 Base = declarative_base()
 
+# Row versions for delta sync are the id of the writing transaction (see crud.get_changes)
+CURRENT_XID = text("pg_current_xact_id()::text::bigint")
+
 class User(Base):
     __tablename__ = "users"
     id = Column(Integer, primary_key=True)
     email = Column(String, unique=True, nullable=False)
     password_hash = Column(String, nullable=False)
     telegram_chat_id = Column(String, nullable=True)
+    # Newest transaction that changed the user's habits or records; lets an idle sync stop at one lookup
+    change_version = Column(BigInteger, nullable=False, server_default="0")
     habits = relationship("Habit", back_populates="user")
 
 class Habit(Base):
@@ -21,16 +28,119 @@ class Habit(Base):
         DateTime(timezone=True),
         nullable=True
     )
+    # Pending fire time for the reminder scheduler, cleared once the reminder is sent
+    next_reminder_at = Column(DateTime(timezone=True), nullable=True)
+    change_version = Column(BigInteger, nullable=False, server_default=CURRENT_XID)
     user = relationship("User", back_populates="habits")
     records = relationship("Record", back_populates="habit")
 
+    __table_args__ = (
+        Index(
+            "ix_habits_next_reminder_at",
+            "next_reminder_at",
+            postgresql_where=next_reminder_at.is_not(None),
+        ),
+        Index("ix_habits_user_id_change_version", "user_id", "change_version"),
+    )
+
 class Record(Base):
+    """Range partitioned by month on `date` (see app.tasks.partitions), hence the (id, date) primary key."""
     __tablename__ = "records"
-    id = Column(Integer, primary_key=True)
+    id = Column(Integer, primary_key=True, autoincrement=True)
     habit_id = Column(Integer, ForeignKey("habits.id"))
     date = Column(
         DateTime(timezone=True),
         server_default=func.now(),
         nullable=False,
+        primary_key=True,
     )
+    change_version = Column(BigInteger, nullable=False, server_default=CURRENT_XID)
     habit = relationship("Habit", back_populates="records")
+
+    __table_args__ = (
+        # Serves per-habit date filters and keyset pagination on (date, id)
+        Index("ix_records_habit_id_date", "habit_id", "date", "id"),
+        Index("ix_records_habit_id_change_version", "habit_id", "change_version"),
+        {"postgresql_partition_by": "RANGE (date)"},
+    )
+
+class HabitStats(Base):
+    __tablename__ = "habit_stats"
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    total_completions = Column(Integer, nullable=False, default=0)
+    current_streak = Column(Integer, nullable=False, default=0)
+    longest_streak = Column(Integer, nullable=False, default=0)
+    last_completion = Column(DateTime(timezone=True), nullable=True)
+    # Bit i is set when the day i days before last_completion has a record
+    recent_days = Column(Integer, nullable=False, default=0)
+
+class Friendship(Base):
+    """One direction of a friendship; befriending stores both directions."""
+    __tablename__ = "friendships"
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    friend_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class HabitDailyCount(Base):
+    """Records per habit and calendar day (in STATS_TIMEZONE), kept up to date by the record write path."""
+    __tablename__ = "habit_daily_counts"
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False)
+
+class RecordArchive(Base):
+    """Where a habit's archived records live (see app.archive): every record dated before `archived_before`."""
+    __tablename__ = "record_archives"
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), primary_key=True)
+    # Bumped by every archival run; names the file currently holding the habit's archive
+    version = Column(Integer, nullable=False)
+    archived_before = Column(DateTime(timezone=True), nullable=False)
+    record_count = Column(Integer, nullable=False)
+    archived_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+class SyncTombstone(Base):
+    """A habit or record deleted by its user, kept SYNC_TOMBSTONE_RETENTION_DAYS for delta sync."""
+    __tablename__ = "sync_tombstones"
+    id = Column(BigInteger, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    kind = Column(String, nullable=False)  # "habit" or "record"
+    object_id = Column(Integer, nullable=False)
+    change_version = Column(BigInteger, nullable=False, server_default=CURRENT_XID)
+    deleted_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_sync_tombstones_user_id_change_version", "user_id", "change_version"),
+    )
+
+class AnalyticsResult(Base):
+    __tablename__ = "analytics_results"
+    id = Column(Integer, primary_key=True)
+    metric = Column(String, nullable=False, index=True)
+    cohort = Column(String, nullable=True)
+    payload = Column(JSON, nullable=False)
+    computed_at = Column(DateTime(timezone=True), nullable=False)
+
+class NotificationOutbox(Base):
+    __tablename__ = "notification_outbox"
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    habit_id = Column(Integer, ForeignKey("habits.id", ondelete="CASCADE"), nullable=False)
+    fire_at = Column(DateTime(timezone=True), nullable=False)
+    chat_id = Column(String, nullable=True)
+    # pending -> sending -> sent | retrying | failed
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    # When the row may next be claimed; doubles as the lease expiry while sending
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    last_error = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), nullable=False, server_default=func.now())
+    sent_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "habit_id", "fire_at", name="uq_notification_outbox_user_habit_fire"),
+        Index(
+            "ix_notification_outbox_claimable",
+            "next_attempt_at",
+            postgresql_where=status.in_(["pending", "retrying", "sending"]),
+        ),
+    )
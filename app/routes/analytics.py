@@ -0,0 +1,14 @@
+from fastapi import APIRouter, Depends
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, schemas
+from app.routes.users import get_current_user, get_read_db
+
+router = APIRouter(prefix="/analytics", tags=["Analytics"])
+
+@router.get("/", response_model=list[schemas.AnalyticsResultOut])
+async def get_analytics(
+    metric: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    return await crud.get_analytics_results(db, metric)
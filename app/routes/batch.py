@@ -0,0 +1,21 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app.core.database import get_db
+from app import crud, schemas
+from app.routes.users import get_current_user
+
+router = APIRouter(prefix="/batch", tags=["Batch"])
+
+@router.post("", response_model=schemas.BatchResult)
+async def apply_batch(
+    batch: schemas.BatchRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Run an ordered list of habit/record creates and deletes in one transaction, e.g. an offline client's queue."""
+    if len(batch.operations) > settings.BATCH_MAX_OPERATIONS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.BATCH_MAX_OPERATIONS} operations per batch"
+        )
+    return {"results": await crud.apply_batch(db, current_user.id, batch.operations)}
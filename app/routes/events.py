@@ -0,0 +1,66 @@
+import asyncio
+from fastapi import APIRouter, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
+from redis.exceptions import RedisError
+from app.core import events
+from app.core.config import settings
+from app.core.database import async_session
+from app.routes.users import resolve_principal
+
+router = APIRouter(prefix="/events", tags=["Events"])
+
+SSE_HEADERS = {
+    "Cache-Control": "no-cache",
+    # Keeps nginx from buffering the stream
+    "X-Accel-Buffering": "no",
+}
+
+@router.get("")
+async def stream_events(
+    request: Request,
+    access_token: str | None = Query(None, description="For EventSource, which cannot send headers"),
+):
+    """
+    Server-Sent Events stream of the current user's change notifications.
+
+    Each `changed` event means "call GET /sync with your cursor". Comments
+    are sent every EVENTS_HEARTBEAT_SECONDS so proxies keep idle streams open.
+    """
+    if not settings.EVENTS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not found")
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    token = token if scheme.lower() == "bearer" and token else access_token
+    if not token:
+        raise HTTPException(status_code=401, detail="Not authenticated")
+    # A short-lived session: the stream must not hold a database connection while it is open
+    async with async_session() as db:
+        current_user = await resolve_principal(token, db)
+
+    try:
+        queue = await events.hub.open(current_user.id)
+    except events.TooManyStreams:
+        raise HTTPException(status_code=503, detail="Too many open streams", headers={"Retry-After": "5"})
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Events unavailable")
+    return StreamingResponse(
+        _sse(current_user.id, queue),
+        media_type="text/event-stream",
+        headers=SSE_HEADERS,
+        # Also covers a client that is gone before the stream starts; closing twice is a no-op
+        background=BackgroundTask(events.hub.close, current_user.id, queue),
+    )
+
+async def _sse(user_id: int, queue: asyncio.Queue):
+    try:
+        # Tells EventSource how long to wait before reconnecting
+        yield b"retry: 5000\n\n"
+        while True:
+            try:
+                data = await asyncio.wait_for(queue.get(), settings.EVENTS_HEARTBEAT_SECONDS)
+            except asyncio.TimeoutError:
+                yield b": keep-alive\n\n"
+                continue
+            yield b"event: changed\ndata: " + data + b"\n\n"
+    finally:
+        await events.hub.close(user_id, queue)
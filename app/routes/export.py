@@ -0,0 +1,82 @@
+import csv
+import io
+import json
+from typing import Literal
+from fastapi import APIRouter, Depends
+from fastapi.responses import StreamingResponse
+from app.core.replicas import read_session
+from app import crud
+from app.routes.users import get_current_user
+
+router = APIRouter(prefix="/export", tags=["Export"])
+
+CSV_COLUMNS = ["habit_id", "habit_title", "habit_description", "reminder_date", "record_id", "date"]
+
+
+@router.get("/")
+async def export_records(
+    format: Literal["ndjson", "csv"] = "ndjson",
+    current_user=Depends(get_current_user)
+):
+    """Stream the full history of the current user as NDJSON or CSV."""
+    if format == "csv":
+        body, media_type = _csv_lines(current_user.id), "text/csv"
+    else:
+        body, media_type = _ndjson_lines(current_user.id), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="habits.{format}"'},
+    )
+
+
+async def _export_batches(user_id: int):
+    # The stream outlives the request handler, so it owns its session
+    async with read_session(user_id) as db:
+        async for batch in crud.iter_export_rows(db, user_id):
+            yield batch
+
+
+async def _ndjson_lines(user_id: int):
+    current_habit = None
+    async for batch in _export_batches(user_id):
+        lines = []
+        for habit_id, title, description, reminder_date, record_id, date in batch:
+            if habit_id != current_habit:
+                current_habit = habit_id
+                lines.append(json.dumps({
+                    "type": "habit",
+                    "id": habit_id,
+                    "title": title,
+                    "description": description,
+                    "reminder_date": reminder_date.isoformat() if reminder_date else None,
+                }))
+            if record_id is not None:
+                lines.append(json.dumps({
+                    "type": "record",
+                    "id": record_id,
+                    "habit_id": habit_id,
+                    "date": date.isoformat(),
+                }))
+        if lines:
+            yield ("\n".join(lines) + "\n").encode()
+
+
+async def _csv_lines(user_id: int):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(CSV_COLUMNS)
+    yield buffer.getvalue().encode()
+    async for batch in _export_batches(user_id):
+        buffer.seek(0)
+        buffer.truncate()
+        for habit_id, title, description, reminder_date, record_id, date in batch:
+            writer.writerow([
+                habit_id,
+                title,
+                description or "",
+                reminder_date.isoformat() if reminder_date else "",
+                "" if record_id is None else record_id,
+                date.isoformat() if date else "",
+            ])
+        yield buffer.getvalue().encode()
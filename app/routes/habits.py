@@ -1,11 +1,17 @@
-from fastapi import APIRouter, Depends, HTTPException
+import datetime
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
 from sqlalchemy.ext.asyncio import AsyncSession
 from app.core.database import get_db
+from app.core import replicas, serialization
+from app.core.response_cache import cached_response
 from app import crud, schemas
-from app.routes.users import get_current_user
+from app.stats import record_day
+from app.routes.users import get_current_user, get_read_db
 
 router = APIRouter(prefix="/habits", tags=["Habits"])
 
+DASHBOARD_DEFAULT_DAYS = 30
+
 @router.post("/", response_model=schemas.HabitOut)
 async def create_habit(
     habit: schemas.HabitCreate,
@@ -16,10 +22,30 @@ async def create_habit(
 
 @router.get("/", response_model=list[schemas.HabitOut])
 async def get_habits(
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(get_current_user)
 ):
-    return await crud.get_habits(db, current_user.id)
+    representation = serialization.negotiate(request)
+
+    async def build():
+        rows = await crud.get_habit_rows(db, current_user.id)
+        return serialization.render_rows(representation, serialization.HABIT_COLUMNS, rows)
+
+    return await cached_response(
+        request, current_user.id, build, representation.media_type, representation.key,
+        replica=replicas.is_replica(db),
+    )
+
+@router.get("/dashboard", response_model=list[schemas.HabitWithRecordsOut])
+async def get_dashboard(
+    since: datetime.datetime | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    if since is None:
+        since = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=DASHBOARD_DEFAULT_DAYS)
+    return await crud.get_habits_with_records(db, current_user.id, since)
 
 @router.delete("/{habit_id}")
 async def delete_habit(
@@ -31,3 +57,29 @@ async def delete_habit(
     if not deleted:
         raise HTTPException(status_code=404, detail="Habit not found")
     return {"ok": True}
+
+@router.get("/{habit_id}/stats", response_model=schemas.HabitStatsOut)
+async def get_habit_stats(
+    habit_id: int,
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    habit_stats = await crud.get_habit_stats(db, habit_id, current_user.id)
+    if habit_stats is None:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    return habit_stats
+
+@router.get("/{habit_id}/calendar", response_model=schemas.HabitCalendarOut)
+async def get_habit_calendar(
+    habit_id: int,
+    year: int | None = Query(None, ge=1970, le=2100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    """Records per day of a year (the current one by default), for heatmaps and weekly charts."""
+    if year is None:
+        year = record_day(datetime.datetime.now(datetime.UTC)).year
+    counts = await crud.get_habit_calendar(db, habit_id, current_user.id, year)
+    if counts is None:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    return {"habit_id": habit_id, "year": year, "start": datetime.date(year, 1, 1), "counts": counts}
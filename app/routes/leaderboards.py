@@ -0,0 +1,61 @@
+from typing import Literal
+from fastapi import APIRouter, Depends, HTTPException, Query
+from redis.exceptions import RedisError
+from sqlalchemy.ext.asyncio import AsyncSession
+from app import crud, leaderboards, schemas
+from app.core.config import settings
+from app.routes.users import get_current_user, get_read_db
+
+router = APIRouter(prefix="/leaderboards", tags=["Leaderboards"])
+
+Metric = Literal["checkins", "streak"]
+Period = Literal["week", "all"]
+
+def _check_board(metric: str, period: str):
+    if not settings.LEADERBOARDS_ENABLED:
+        raise HTTPException(status_code=404, detail="Leaderboards are disabled")
+    try:
+        leaderboards.board_key(metric, period)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+
+@router.get("/{metric}", response_model=list[schemas.LeaderboardEntry])
+async def get_leaderboard(
+    metric: Metric,
+    period: Period = "all",
+    offset: int = Query(0, ge=0),
+    limit: int = Query(50, ge=1, le=200),
+    current_user=Depends(get_current_user)
+):
+    _check_board(metric, period)
+    try:
+        return await leaderboards.page(metric, period, offset, limit)
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Leaderboards unavailable")
+
+@router.get("/{metric}/me", response_model=schemas.LeaderboardPosition)
+async def get_my_position(
+    metric: Metric,
+    period: Period = "all",
+    current_user=Depends(get_current_user)
+):
+    _check_board(metric, period)
+    try:
+        return await leaderboards.position(metric, period, current_user.id)
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Leaderboards unavailable")
+
+@router.get("/{metric}/friends", response_model=list[schemas.LeaderboardEntry])
+async def get_friends_leaderboard(
+    metric: Metric,
+    period: Period = "all",
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    """The current user ranked among their friends."""
+    _check_board(metric, period)
+    user_ids = [current_user.id, *await crud.get_friend_ids(db, current_user.id)]
+    try:
+        return await leaderboards.among(metric, period, user_ids)
+    except RedisError:
+        raise HTTPException(status_code=503, detail="Leaderboards unavailable")
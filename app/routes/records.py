@@ -1,8 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+import csv
+import datetime
+import io
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from pydantic import ValidationError
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
 from app.core.database import get_db
+from app.core import replicas, serialization
+from app.core.response_cache import cached_response
 from app import crud, schemas
-from app.routes.users import get_current_user
+from app.routes.users import get_current_user, get_read_db
 
 router = APIRouter(prefix="/records", tags=["Records"])
 
@@ -12,15 +20,99 @@ async def create_record(
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    return await crud.create_record(db, record)
+    created = await crud.create_record(db, record, current_user.id)
+    if not created:
+        raise HTTPException(status_code=404, detail="Habit not found")
+    return created
+
+@router.post("/bulk", response_model=schemas.BulkRecordResult)
+async def bulk_create_records(
+    request: Request,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    """Import records from a JSON array, a CSV body or an uploaded CSV/JSON file."""
+    try:
+        items = await _read_bulk_payload(request)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    if len(items) > settings.BULK_MAX_ROWS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ROWS} records per import")
+
+    valid, positions, errors = [], [], []
+    for index, item in enumerate(items):
+        try:
+            valid.append(schemas.RecordCreate.model_validate(item))
+            positions.append(index)
+        except ValidationError as exc:
+            error = exc.errors()[0]
+            field = ".".join(str(part) for part in error["loc"])
+            errors.append({"index": index, "error": f"{field}: {error['msg']}" if field else error["msg"]})
+
+    inserted, rejected = await crud.bulk_create_records(db, current_user.id, valid)
+    errors += [{"index": positions[i], "error": "Habit not found"} for i in rejected]
+    errors.sort(key=lambda error: error["index"])
+    return {"inserted": inserted, "failed": len(errors), "errors": errors}
+
+async def _read_bulk_payload(request: Request) -> list:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise ValueError("Expected a 'file' upload")
+        body = await upload.read()
+        is_csv = (upload.filename or "").lower().endswith(".csv") or "csv" in (upload.content_type or "")
+    else:
+        body = await request.body()
+        is_csv = "csv" in content_type
+
+    try:
+        text = body.decode("utf-8-sig")
+    except UnicodeDecodeError:
+        raise ValueError("Payload must be UTF-8")
+    if is_csv:
+        return list(csv.DictReader(io.StringIO(text)))
+    try:
+        items = json.loads(text)
+    except json.JSONDecodeError:
+        raise ValueError("Payload must be a JSON array or CSV")
+    if not isinstance(items, list):
+        raise ValueError("Payload must be a JSON array or CSV")
+    return items
 
 @router.get("/", response_model=list[schemas.RecordOut])
 async def get_records(
     habit_id: int,
-    db: AsyncSession = Depends(get_db),
+    request: Request,
+    date_from: datetime.datetime | None = Query(None, alias="from"),
+    date_to: datetime.datetime | None = Query(None, alias="to"),
+    cursor: str | None = None,
+    limit: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
     current_user=Depends(get_current_user)
 ):
-    return await crud.get_records(db, habit_id)
+    after = None
+    if cursor:
+        try:
+            after = crud.decode_record_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+    representation = serialization.negotiate(request)
+
+    async def build():
+        rows, next_cursor = await crud.get_records(
+            db, habit_id, current_user.id, date_from, date_to, after, limit
+        )
+        body, headers = serialization.render_rows(representation, serialization.RECORD_COLUMNS, rows)
+        if next_cursor:
+            headers["X-Next-Cursor"] = next_cursor
+        return body, headers
+
+    return await cached_response(
+        request, current_user.id, build, representation.media_type, representation.key,
+        replica=replicas.is_replica(db),
+    )
 
 @router.delete("/{record_id}")
 async def delete_record(
@@ -29,7 +121,7 @@ async def delete_record(
     db: AsyncSession = Depends(get_db),
     current_user=Depends(get_current_user)
 ):
-    deleted = await crud.delete_record(db, habit_id, record_id)
+    deleted = await crud.delete_record(db, habit_id, record_id, current_user.id)
     if not deleted:
         raise HTTPException(status_code=404, detail="Record not found")
     return {"ok": True}
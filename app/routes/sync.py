@@ -0,0 +1,32 @@
+import datetime
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.core.config import settings
+from app import crud, schemas
+from app.routes.users import get_current_user, get_read_db
+
+router = APIRouter(prefix="/sync", tags=["Sync"])
+
+@router.get("", response_model=schemas.SyncOut)
+async def sync(
+    cursor: str | None = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user=Depends(get_current_user)
+):
+    """Habits and records changed since `cursor`; without one, or once it is too old, the full state."""
+    since = None
+    if cursor:
+        try:
+            since, issued_at = crud.decode_sync_cursor(cursor)
+        except ValueError:
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+        retention = datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+        if issued_at < datetime.datetime.now(datetime.UTC) - retention:
+            # Tombstones the client has not seen may already be pruned
+            since = None
+    changes = await crud.get_changes(db, current_user.id, since)
+    return {
+        "cursor": crud.encode_sync_cursor(changes.pop("version")),
+        "reset": since is None,
+        **changes,
+    }
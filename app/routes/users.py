@@ -1,8 +1,10 @@
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from jose import jwt, JWTError
+from jose import jwt
 from datetime import datetime, timedelta, UTC
 from sqlalchemy.ext.asyncio import AsyncSession
+from app.core import auth_cache, replicas
+from app.core.passwords import PasswordHasherBusy
 from app.core.database import get_db
 from app.core.config import settings
 from app import schemas, crud, models
@@ -25,14 +27,20 @@ async def register(user: schemas.UserCreate, db: AsyncSession = Depends(get_db))
     existing = await crud.get_user_by_email(db, user.email)
     if existing:
         raise HTTPException(status_code=400, detail="User already exists")
-    return await crud.create_user(db, user)
+    try:
+        return await crud.create_user(db, user)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
 
 
 # ---------- Логин ----------
 @router.post("/token", response_model=schemas.Token)
 async def login(form_data: OAuth2PasswordRequestForm = Depends(), db: AsyncSession = Depends(get_db)):
-    user = await crud.get_user_by_email(db, form_data.username)
-    if not user or not crud.verify_password(form_data.password, user.password_hash):
+    try:
+        user = await crud.authenticate_user(db, form_data.username, form_data.password)
+    except PasswordHasherBusy:
+        raise HTTPException(status_code=503, detail="Server busy, try again", headers={"Retry-After": "1"})
+    if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
     access_token = create_access_token(
         {"sub": str(user.id)}, settings.ACCESS_TOKEN_EXPIRE_MINUTES
@@ -45,15 +53,74 @@ async def get_current_user(
     token: str = Depends(oauth2_scheme),
     db: AsyncSession = Depends(get_db)
 ):
+    return await resolve_principal(token, db)
+
+
+async def resolve_principal(token: str, db: AsyncSession):
+    """The user behind an access token, from the auth cache when possible."""
     try:
-        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise HTTPException(status_code=401, detail="Invalid token")
-    except JWTError:
+        user_id = auth_cache.resolve_token(token)
+    except auth_cache.InvalidToken:
         raise HTTPException(status_code=401, detail="Invalid token")
 
-    result = await db.get(models.User, int(user_id))
+    principal = await auth_cache.get_principal(user_id)
+    if principal is not None:
+        return principal
+
+    result = await db.get(models.User, user_id)
     if result is None:
         raise HTTPException(status_code=404, detail="User not found")
-    return result
+    return await auth_cache.remember(result)
+
+
+async def get_read_db(current_user=Depends(get_current_user)):
+    """Session for read-only routes: a replica, unless the current user has just written."""
+    async with replicas.read_session(current_user.id) as session:
+        yield session
+
+
+# ---------- Профиль ----------
+@router.patch("/me", response_model=schemas.UserOut)
+async def update_me(
+    data: schemas.UserUpdate,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    updated = await crud.update_user(db, current_user.id, data)
+    if updated is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return updated
+
+
+@router.delete("/me")
+async def delete_me(
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    if not await crud.delete_user(db, current_user.id):
+        raise HTTPException(status_code=404, detail="User not found")
+    return {"ok": True}
+
+
+# ---------- Друзья ----------
+@router.post("/me/friends", response_model=schemas.UserOut)
+async def add_friend(
+    data: schemas.FriendAdd,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    friend = await crud.add_friend(db, current_user.id, data.email)
+    if friend is None:
+        raise HTTPException(status_code=404, detail="User not found")
+    return friend
+
+
+@router.delete("/me/friends/{friend_id}")
+async def remove_friend(
+    friend_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user=Depends(get_current_user)
+):
+    if not await crud.remove_friend(db, current_user.id, friend_id):
+        raise HTTPException(status_code=404, detail="Friend not found")
+    return {"ok": True}
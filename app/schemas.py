@@ -1,6 +1,6 @@
 from datetime import date, datetime
-from pydantic import BaseModel, EmailStr, field_validator
-from typing import Optional, List
+from pydantic import BaseModel, EmailStr, Field, field_validator, model_validator
+from typing import Annotated, Any, Literal, Optional, List, Union
 
 
 class UserCreate(BaseModel):
@@ -9,6 +9,10 @@ class UserCreate(BaseModel):
     telegram_chat_id: Optional[str] = None
 
 
+class UserUpdate(BaseModel):
+    telegram_chat_id: Optional[str] = None
+
+
 class UserOut(BaseModel):
     id: int
     email: str
@@ -67,3 +71,133 @@ class RecordOut(RecordBase):
     date: datetime
     class ConfigDict:
         from_attributes = True
+
+
+class BulkRecordError(BaseModel):
+    index: int
+    error: str
+
+
+class BulkRecordResult(BaseModel):
+    inserted: int
+    failed: int
+    errors: List[BulkRecordError]
+
+
+class BatchCreateHabit(HabitBase):
+    op: Literal["create_habit"]
+    # Client-chosen name that later create_record operations of the batch can use as habit_ref
+    ref: Optional[str] = None
+
+
+class BatchDeleteHabit(BaseModel):
+    op: Literal["delete_habit"]
+    habit_id: int
+
+
+class BatchCreateRecord(BaseModel):
+    op: Literal["create_record"]
+    habit_id: Optional[int] = None
+    habit_ref: Optional[str] = None
+    date: datetime
+
+    @model_validator(mode="after")
+    def check_habit(self):
+        if (self.habit_id is None) == (self.habit_ref is None):
+            raise ValueError("Exactly one of habit_id and habit_ref is required")
+        return self
+
+
+class BatchDeleteRecord(BaseModel):
+    op: Literal["delete_record"]
+    habit_id: int
+    record_id: int
+
+
+BatchOperation = Annotated[
+    Union[BatchCreateHabit, BatchDeleteHabit, BatchCreateRecord, BatchDeleteRecord],
+    Field(discriminator="op"),
+]
+
+
+class BatchRequest(BaseModel):
+    operations: List[BatchOperation]
+
+    @model_validator(mode="after")
+    def check_refs(self):
+        refs = [op.ref for op in self.operations if isinstance(op, BatchCreateHabit) and op.ref is not None]
+        if len(refs) != len(set(refs)):
+            raise ValueError("Habit refs must be unique within a batch")
+        return self
+
+
+class BatchOperationResult(BaseModel):
+    index: int
+    # HTTP status the operation would have had on its own endpoint
+    status: int
+    id: Optional[int] = None
+    error: Optional[str] = None
+
+
+class BatchResult(BaseModel):
+    results: List[BatchOperationResult]
+
+
+class SyncOut(BaseModel):
+    cursor: str
+    # True when habits/records are the full current state and replace what the client has
+    reset: bool
+    habits: List[HabitOut]
+    records: List[RecordOut]
+    deleted_habits: List[int]
+    deleted_records: List[int]
+
+
+class HabitWithRecordsOut(HabitOut):
+    records: List[RecordOut]
+
+
+class HabitStatsOut(BaseModel):
+    habit_id: int
+    current_streak: int
+    longest_streak: int
+    total_completions: int
+    last_completion: Optional[datetime] = None
+    completion_rate_7d: float
+    completion_rate_30d: float
+
+
+class HabitCalendarOut(BaseModel):
+    habit_id: int
+    year: int
+    start: date
+    # Records per day, counts[0] being `start` (January 1st)
+    counts: List[int]
+
+
+class FriendAdd(BaseModel):
+    email: str
+
+
+class LeaderboardEntry(BaseModel):
+    rank: int
+    user_id: int
+    score: int
+
+
+class LeaderboardPosition(BaseModel):
+    user_id: int
+    # None while the user is not on the board
+    rank: Optional[int] = None
+    score: int
+    total: int
+
+
+class AnalyticsResultOut(BaseModel):
+    metric: str
+    cohort: Optional[str] = None
+    payload: dict[str, Any]
+    computed_at: datetime
+
+    class ConfigDict:
+        from_attributes = True
@@ -0,0 +1,149 @@
+"""
+Per-habit statistics helpers.
+
+Stats are kept in the `habit_stats` table and updated incrementally on every
+record write, so reading them never touches the `records` table. Recent
+activity is stored as a bitmask: bit `i` of `recent_days` is set when the day
+`i` days before the last completion day has at least one record.
+"""
+import datetime
+from typing import Iterable, Optional
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, cast, func, literal
+
+from app.core.config import settings
+
+RECENT_DAYS = 30
+RECENT_MASK = (1 << RECENT_DAYS) - 1
+
+
+def record_day(moment: datetime.datetime) -> datetime.date:
+    """Calendar day a record timestamp belongs to."""
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.UTC)
+    return moment.astimezone(ZoneInfo(settings.STATS_TIMEZONE)).date()
+
+
+def day_column(column):
+    """SQL expression matching `record_day` for a timestamptz column."""
+    # Rendered inline so the same expression can be used in GROUP BY
+    timezone = literal(settings.STATS_TIMEZONE, literal_execute=True)
+    return cast(func.timezone(timezone, column), Date)
+
+
+def apply_completion(stats, moment: datetime.datetime) -> bool:
+    """
+    Account for a new record in place.
+
+    Returns False when the record lands on an earlier day that may join or
+    split streaks; the caller then has to recompute the stats from scratch.
+    """
+    day = record_day(moment)
+    last_day = record_day(stats.last_completion) if stats.last_completion else None
+
+    if last_day is None:
+        stats.current_streak = 1
+        stats.recent_days = 1
+        stats.last_completion = moment
+    elif day > last_day:
+        gap = (day - last_day).days
+        stats.current_streak = stats.current_streak + 1 if gap == 1 else 1
+        stats.recent_days = ((stats.recent_days << gap) | 1) & RECENT_MASK if gap < RECENT_DAYS else 1
+        stats.last_completion = moment
+    elif day == last_day:
+        stats.recent_days |= 1
+        stats.last_completion = max(stats.last_completion, moment)
+    else:
+        offset = (last_day - day).days
+        if offset >= RECENT_DAYS or not stats.recent_days & (1 << offset):
+            return False
+
+    stats.total_completions += 1
+    stats.longest_streak = max(stats.longest_streak, stats.current_streak)
+    return True
+
+
+def apply_removal(stats, moment: datetime.datetime, day_still_active: bool) -> bool:
+    """
+    Account for a deleted record in place.
+
+    Only the cheap case is handled here: another record still covers the same
+    day and the deleted one was not the latest completion.
+    """
+    if not day_still_active or moment == stats.last_completion:
+        return False
+    stats.total_completions -= 1
+    return True
+
+
+def compute_stats(days: Iterable[datetime.date], total: int, last_completion: Optional[datetime.datetime]) -> dict:
+    """Build the stored stats columns from a habit's ascending distinct days."""
+    current = longest = 0
+    previous = None
+    days = list(days)
+    for day in days:
+        current = current + 1 if previous is not None and (day - previous).days == 1 else 1
+        longest = max(longest, current)
+        previous = day
+
+    recent = 0
+    if previous is not None:
+        for day in reversed(days):
+            offset = (previous - day).days
+            if offset >= RECENT_DAYS:
+                break
+            recent |= 1 << offset
+
+    return {
+        "total_completions": total,
+        "current_streak": current,
+        "longest_streak": longest,
+        "last_completion": last_completion,
+        "recent_days": recent,
+    }
+
+
+def completion_rate(stats, today: datetime.date, window: int) -> float:
+    """Share of the last `window` days (including today) with a completion."""
+    if not stats.last_completion:
+        return 0.0
+    last_day = record_day(stats.last_completion)
+    first_day = today - datetime.timedelta(days=window - 1)
+    active = 0
+    for offset in range(RECENT_DAYS):
+        if stats.recent_days & (1 << offset):
+            day = last_day - datetime.timedelta(days=offset)
+            if first_day <= day <= today:
+                active += 1
+    return round(active / window, 4)
+
+
+def snapshot(habit_id: int, stats, today: Optional[datetime.date] = None) -> dict:
+    """Public view of the stored stats as of `today`."""
+    if today is None:
+        today = record_day(datetime.datetime.now(datetime.UTC))
+    if stats is None:
+        return {
+            "habit_id": habit_id,
+            "current_streak": 0,
+            "longest_streak": 0,
+            "total_completions": 0,
+            "last_completion": None,
+            "completion_rate_7d": 0.0,
+            "completion_rate_30d": 0.0,
+        }
+
+    current = 0
+    if stats.last_completion and (today - record_day(stats.last_completion)).days <= 1:
+        current = stats.current_streak
+
+    return {
+        "habit_id": habit_id,
+        "current_streak": current,
+        "longest_streak": stats.longest_streak,
+        "total_completions": stats.total_completions,
+        "last_completion": stats.last_completion,
+        "completion_rate_7d": completion_rate(stats, today, 7),
+        "completion_rate_30d": completion_rate(stats, today, 30),
+    }
@@ -0,0 +1,228 @@
+"""
+Cross-user record analytics.
+
+Runs as its own process (`python -m app.tasks.analytics`), never inside the
+API or a Celery worker: completion days are streamed through the sync engine
+in large chunks, turned into NumPy arrays of day offsets and reduced in
+parallel on a process pool. Every metric is additive, so partial results from
+each chunk are simply summed before being written to `analytics_results`.
+
+The metrics only depend on which days a habit was completed, so the days come
+from the `habit_daily_counts` rollup rather than from `records`: it is one
+row per habit and day, and it still covers records moved to the archive.
+"""
+import argparse
+import datetime
+import multiprocessing
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Optional
+
+import numpy as np
+from sqlalchemy import Date, cast, delete, literal
+from sqlalchemy.future import select
+
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+from app.models import AnalyticsResult, HabitDailyCount
+
+RETENTION_WEEKS = 52
+MAX_STREAK = 366
+EPOCH = datetime.date(1970, 1, 1)
+
+
+# ---------- Chunk reduction (runs in pool workers) ----------
+def chunk_metrics(habit_ids: np.ndarray, days: np.ndarray) -> dict:
+    """
+    Reduce one chunk of (habit_id, epoch day) rows sorted by habit and day.
+
+    Every habit in the chunk must be complete, i.e. not continue in the next one.
+    """
+    if len(days) == 0:
+        return _empty_metrics()
+
+    # Collapse several records on the same day into one completion
+    keep = np.ones(len(days), dtype=bool)
+    keep[1:] = (habit_ids[1:] != habit_ids[:-1]) | (days[1:] != days[:-1])
+    habit_ids, days = habit_ids[keep], days[keep]
+
+    new_habit = np.ones(len(days), dtype=bool)
+    new_habit[1:] = habit_ids[1:] != habit_ids[:-1]
+    starts = np.flatnonzero(new_habit)
+    sizes = np.diff(np.append(starts, len(days)))
+    first_days = days[starts]
+
+    # Retention: share of habits from each start-month cohort still active k weeks later
+    cohorts = first_days.astype("datetime64[D]").astype("datetime64[M]").astype(np.int64)
+    cohort_values, habit_cohort = np.unique(cohorts, return_inverse=True)
+    weeks = (days - np.repeat(first_days, sizes)) // 7
+    row_habit = np.repeat(np.arange(len(starts)), sizes)
+    in_range = weeks < RETENTION_WEEKS
+    active = np.unique(row_habit[in_range] * RETENTION_WEEKS + weeks[in_range])
+    active_cohort = habit_cohort[active // RETENTION_WEEKS]
+    retention = np.bincount(
+        active_cohort * RETENTION_WEEKS + active % RETENTION_WEEKS,
+        minlength=len(cohort_values) * RETENTION_WEEKS,
+    ).reshape(len(cohort_values), RETENTION_WEEKS)
+
+    # 1970-01-01 was a Thursday; shift so that Monday is 0
+    weekdays = np.bincount((days + 3) % 7, minlength=7)
+
+    # Streaks are runs of consecutive days within one habit
+    breaks = new_habit.copy()
+    breaks[1:] |= days[1:] != days[:-1] + 1
+    run_starts = np.flatnonzero(breaks)
+    run_lengths = np.diff(np.append(run_starts, len(days)))
+    streaks = np.bincount(np.minimum(run_lengths, MAX_STREAK), minlength=MAX_STREAK + 1)
+
+    return {
+        "cohorts": cohort_values,
+        "cohort_sizes": np.bincount(habit_cohort, minlength=len(cohort_values)),
+        "retention": retention,
+        "weekdays": weekdays,
+        "streaks": streaks,
+    }
+
+
+def _empty_metrics() -> dict:
+    return {
+        "cohorts": np.zeros(0, dtype=np.int64),
+        "cohort_sizes": np.zeros(0, dtype=np.int64),
+        "retention": np.zeros((0, RETENTION_WEEKS), dtype=np.int64),
+        "weekdays": np.zeros(7, dtype=np.int64),
+        "streaks": np.zeros(MAX_STREAK + 1, dtype=np.int64),
+    }
+
+
+class MetricsAccumulator:
+    """Sums partial chunk metrics in the parent process."""
+
+    def __init__(self):
+        self.cohort_sizes: dict[int, int] = {}
+        self.retention: dict[int, np.ndarray] = {}
+        self.weekdays = np.zeros(7, dtype=np.int64)
+        self.streaks = np.zeros(MAX_STREAK + 1, dtype=np.int64)
+
+    def add(self, part: dict):
+        for cohort, size, weeks in zip(part["cohorts"], part["cohort_sizes"], part["retention"]):
+            cohort = int(cohort)
+            self.cohort_sizes[cohort] = self.cohort_sizes.get(cohort, 0) + int(size)
+            if cohort in self.retention:
+                self.retention[cohort] += weeks
+            else:
+                self.retention[cohort] = weeks.astype(np.int64)
+        self.weekdays += part["weekdays"]
+        self.streaks += part["streaks"]
+
+    def results(self) -> list[dict]:
+        rows = []
+        for cohort in sorted(self.cohort_sizes):
+            size = self.cohort_sizes[cohort]
+            month = np.datetime64(cohort, "M").astype(str)
+            rows.append({
+                "metric": "retention",
+                "cohort": month,
+                "payload": {"habits": size, "weeks": (self.retention[cohort] / size).round(4).tolist()},
+            })
+        rows.append({
+            "metric": "weekday_completions",
+            "cohort": None,
+            "payload": {"counts": self.weekdays.tolist()},
+        })
+        lengths = np.flatnonzero(self.streaks)
+        rows.append({
+            "metric": "streak_lengths",
+            "cohort": None,
+            "payload": {
+                "lengths": lengths.tolist(),
+                "counts": self.streaks[lengths].tolist(),
+                "capped_at": MAX_STREAK,
+            },
+        })
+        return rows
+
+
+# ---------- Chunked reading (parent process) ----------
+def iter_chunks(db, chunk_size: int):
+    """
+    Yield (habit_ids, days) arrays of roughly `chunk_size` rows.
+
+    Rows of the last habit in a chunk are carried over to the next one so
+    that no habit is split between two workers.
+    """
+    epoch_day = HabitDailyCount.day - cast(literal(EPOCH, literal_execute=True), Date)
+    stmt = (
+        select(HabitDailyCount.habit_id, epoch_day)
+        .order_by(HabitDailyCount.habit_id, HabitDailyCount.day)
+        .execution_options(yield_per=chunk_size)
+    )
+    carry = np.zeros((0, 2), dtype=np.int64)
+    for partition in db.execute(stmt).partitions():
+        chunk = np.concatenate([carry, np.array(partition, dtype=np.int64)])
+        last_start = np.searchsorted(chunk[:, 0], chunk[-1, 0])
+        carry = chunk[last_start:]
+        if last_start:
+            yield chunk[:last_start, 0], chunk[:last_start, 1]
+    if len(carry):
+        yield carry[:, 0], carry[:, 1]
+
+
+def compute_analytics(workers: Optional[int] = None, chunk_size: Optional[int] = None) -> list[dict]:
+    workers = workers or settings.ANALYTICS_WORKERS or multiprocessing.cpu_count()
+    chunk_size = chunk_size or settings.ANALYTICS_CHUNK_SIZE
+    accumulator = MetricsAccumulator()
+    # Spawned workers never inherit the parent's open database connections
+    context = multiprocessing.get_context("spawn")
+
+    with get_sync_db_session() as db, ProcessPoolExecutor(workers, mp_context=context) as pool:
+        pending = set()
+        for habit_ids, days in iter_chunks(db, chunk_size):
+            # Bound the number of chunks held in memory at once
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    accumulator.add(future.result())
+            pending.add(pool.submit(chunk_metrics, habit_ids, days))
+        for future in pending:
+            accumulator.add(future.result())
+
+    return accumulator.results()
+
+
+def store_results(db, rows: list[dict]):
+    """Replace the stored metrics with a fresh run in one transaction."""
+    computed_at = datetime.datetime.now(datetime.UTC)
+    db.execute(delete(AnalyticsResult).where(AnalyticsResult.metric.in_({row["metric"] for row in rows})))
+    db.add_all(AnalyticsResult(computed_at=computed_at, **row) for row in rows)
+    db.commit()
+
+
+def run_once(workers: Optional[int] = None, chunk_size: Optional[int] = None):
+    started = time.monotonic()
+    rows = compute_analytics(workers, chunk_size)
+    with get_sync_db_session() as db:
+        store_results(db, rows)
+    print(f"[INFO] Analytics recomputed: {len(rows)} results in {time.monotonic() - started:.1f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Recompute cross-user record analytics.")
+    parser.add_argument("--workers", type=int, help="Process pool size (defaults to the CPU count)")
+    parser.add_argument("--chunk-size", type=int, help="Rows read from the database per chunk")
+    parser.add_argument("--interval", type=int, help="Keep running and recompute every N seconds")
+    args = parser.parse_args()
+
+    while True:
+        try:
+            run_once(args.workers, args.chunk_size)
+        except Exception as exc:
+            if not args.interval:
+                raise
+            print(f"[ERROR] Analytics run failed: {exc}")
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Archival of cold records (see app.archive).
+
+Records dated before the start of the month ARCHIVE_AFTER_DAYS ago are
+moved habit by habit: each habit is locked like a record write would lock
+it, its old records are deleted with RETURNING, merged into a new version of
+its archive file and `record_archives` is switched to that version before
+the commit. Stats, the daily counts rollup and the leaderboards already
+account for these records and are left alone. Afterwards monthly partitions
+that lie entirely before the cutoff and ended up empty are dropped.
+"""
+import argparse
+import datetime
+
+from sqlalchemy import delete, text
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app import archive
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+from app.models import Habit, Record, RecordArchive
+from app.tasks.partitions import DEFAULT_PARTITION, month_start, partition_name
+
+HABIT_BATCH_SIZE = 1000
+
+
+def archive_cutoff(after_days: int, today: datetime.date | None = None) -> datetime.datetime:
+    """Month-aligned bound so that whole monthly partitions empty out."""
+    today = today or datetime.datetime.now(datetime.UTC).date()
+    start = month_start(today - datetime.timedelta(days=after_days))
+    return datetime.datetime.combine(start, datetime.time(), datetime.UTC)
+
+
+def archive_habit(db, habit_id: int, cutoff: datetime.datetime) -> int:
+    """Move one habit's records dated before `cutoff` into its archive; returns how many moved."""
+    locked = db.execute(select(Habit.id).where(Habit.id == habit_id).with_for_update()).scalar()
+    if locked is None:
+        db.rollback()
+        return 0
+    rows = db.execute(
+        delete(Record).where(Record.habit_id == habit_id, Record.date < cutoff).returning(Record.date, Record.id)
+    ).all()
+    if not rows:
+        db.rollback()
+        return 0
+
+    existing = db.get(RecordArchive, habit_id)
+    array = archive.from_rows(rows)
+    previous = None
+    archived_before = cutoff
+    if existing is not None:
+        previous = existing.version
+        array = archive.merge(archive.load(habit_id, previous), array)
+        archived_before = max(existing.archived_before, cutoff)
+    version = (previous or 0) + 1
+
+    archive.write(habit_id, version, array)
+    values = {
+        "habit_id": habit_id,
+        "version": version,
+        "archived_before": archived_before,
+        "record_count": array.shape[1],
+    }
+    stmt = insert(RecordArchive).values(values)
+    try:
+        db.execute(stmt.on_conflict_do_update(
+            index_elements=[RecordArchive.habit_id],
+            set_={**{key: stmt.excluded[key] for key in values if key != "habit_id"}, "archived_at": text("now()")},
+        ))
+        db.commit()
+    except Exception:
+        db.rollback()
+        archive.discard(habit_id, keep=(previous,))
+        raise
+    # Readers may have looked the previous version up just before the commit, so it stays until the next run
+    archive.discard(habit_id, keep=(version, previous))
+    return len(rows)
+
+
+def drop_empty_partitions(db, cutoff: datetime.datetime) -> list[str]:
+    """Drop monthly partitions entirely before `cutoff` that archival emptied."""
+    names = db.execute(text(
+        "SELECT child.relname FROM pg_inherits "
+        "JOIN pg_class child ON child.oid = pg_inherits.inhrelid "
+        "JOIN pg_class parent ON parent.oid = pg_inherits.inhparent "
+        "WHERE parent.relname = 'records' ORDER BY child.relname"
+    )).scalars().all()
+    last_archived = partition_name(month_start(cutoff.date() - datetime.timedelta(days=1)))
+    dropped = []
+    for name in names:
+        # Names sort chronologically; a later month may still hold live records
+        if name == DEFAULT_PARTITION or name > last_archived:
+            continue
+        if db.execute(text(f"SELECT EXISTS (SELECT 1 FROM {name})")).scalar():
+            continue
+        db.execute(text(f"ALTER TABLE records DETACH PARTITION {name}"))
+        db.execute(text(f"DROP TABLE {name}"))
+        db.commit()
+        dropped.append(name)
+    return dropped
+
+
+def archive_records_sync(db, cutoff: datetime.datetime) -> tuple[int, int]:
+    """Archive every habit's records before `cutoff`; returns (habits, records) archived."""
+    habits = records = 0
+    last_id = 0
+    while True:
+        habit_ids = db.execute(
+            select(Record.habit_id)
+            .where(Record.date < cutoff, Record.habit_id > last_id)
+            .group_by(Record.habit_id)
+            .order_by(Record.habit_id)
+            .limit(HABIT_BATCH_SIZE)
+        ).scalars().all()
+        db.rollback()
+        if not habit_ids:
+            return habits, records
+        for habit_id in habit_ids:
+            moved = archive_habit(db, habit_id, cutoff)
+            habits += moved > 0
+            records += moved
+        last_id = habit_ids[-1]
+
+
+@celery_app.task(name="archive.archive_records")
+def archive_records(after_days: int | None = None):
+    """Move records older than ARCHIVE_AFTER_DAYS into the archive and drop emptied partitions."""
+    if after_days is None:
+        after_days = settings.ARCHIVE_AFTER_DAYS
+    cutoff = archive_cutoff(after_days)
+    with get_sync_db_session() as db:
+        habits, records = archive_records_sync(db, cutoff)
+        dropped = drop_empty_partitions(db, cutoff)
+    print(f"[INFO] Archived {records} records of {habits} habits dated before {cutoff.date().isoformat()}")
+    if dropped:
+        print(f"[INFO] Dropped empty record partitions: {', '.join(dropped)}")
+    return records
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Move old records out of Postgres into the archive.")
+    parser.add_argument("--after-days", type=int, default=None,
+                        help="Archive records older than this many days (default ARCHIVE_AFTER_DAYS)")
+    args = parser.parse_args()
+    archive_records(args.after_days)
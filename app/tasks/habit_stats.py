@@ -0,0 +1,153 @@
+"""
+Backfill tasks for per-habit statistics and the daily counts rollup.
+
+Both read live records from Postgres and archived ones from app.archive.
+"""
+import argparse
+import itertools
+from typing import Optional
+
+from sqlalchemy import delete, func
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.future import select
+
+from app import archive, stats
+from app.celery_app import celery_app
+from app.core.sync_database import get_sync_db_session
+from app.models import HabitDailyCount, HabitStats, Record, RecordArchive
+
+BATCH_SIZE = 5000
+
+
+def _archived_versions(db, habit_ids: Optional[list[int]]) -> dict[int, int]:
+    stmt = select(RecordArchive.habit_id, RecordArchive.version)
+    if habit_ids is not None:
+        stmt = stmt.where(RecordArchive.habit_id.in_(habit_ids))
+    return dict(db.execute(stmt).all())
+
+
+def rebuild_stats_sync(db, habit_ids: Optional[list[int]] = None) -> int:
+    """Recompute `habit_stats` from live and archived records for the given habits (all when None)."""
+    day = stats.day_column(Record.date)
+    stmt = (
+        select(Record.habit_id, day, func.count(), func.max(Record.date))
+        .where(Record.habit_id.is_not(None))
+        .group_by(Record.habit_id, day)
+        .order_by(Record.habit_id, day)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    clear = delete(HabitStats)
+    if habit_ids is not None:
+        stmt = stmt.where(Record.habit_id.in_(habit_ids))
+        clear = clear.where(HabitStats.habit_id.in_(habit_ids))
+    db.execute(clear)
+    archived = _archived_versions(db, habit_ids)
+
+    def habit_stats(habit_id, days, total, last_completion):
+        version = archived.pop(habit_id, None)
+        if version is not None:
+            days, total, last_completion = archive.add_to_stats(
+                archive.load(habit_id, version), days, total, last_completion
+            )
+        return {"habit_id": habit_id, **stats.compute_stats(days, total, last_completion)}
+
+    rebuilt = 0
+    batch = []
+    rows = db.execute(stmt)
+    for habit_id, group in itertools.groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        batch.append(habit_stats(
+            habit_id,
+            [row[1] for row in group],
+            sum(row[2] for row in group),
+            max(row[3] for row in group),
+        ))
+        if len(batch) >= BATCH_SIZE:
+            rebuilt += _upsert_stats(db, batch)
+            batch = []
+    # Habits whose records are all archived
+    for habit_id in list(archived):
+        batch.append(habit_stats(habit_id, [], 0, None))
+        if len(batch) >= BATCH_SIZE:
+            rebuilt += _upsert_stats(db, batch)
+            batch = []
+    if batch:
+        rebuilt += _upsert_stats(db, batch)
+
+    db.commit()
+    return rebuilt
+
+
+def _upsert_stats(db, batch: list[dict]) -> int:
+    stmt = insert(HabitStats).values(batch)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[HabitStats.habit_id],
+        set_={column: stmt.excluded[column] for column in batch[0] if column != "habit_id"},
+    )
+    db.execute(stmt)
+    return len(batch)
+
+
+def rebuild_daily_counts_sync(db, habit_ids: Optional[list[int]] = None) -> int:
+    """Recompute `habit_daily_counts` from live and archived records; needed after STATS_TIMEZONE changes."""
+    day = stats.day_column(Record.date)
+    counts = (
+        select(Record.habit_id, day, func.count())
+        .where(Record.habit_id.is_not(None))
+        .group_by(Record.habit_id, day)
+    )
+    clear = delete(HabitDailyCount)
+    if habit_ids is not None:
+        counts = counts.where(Record.habit_id.in_(habit_ids))
+        clear = clear.where(HabitDailyCount.habit_id.in_(habit_ids))
+    db.execute(clear)
+    result = db.execute(
+        insert(HabitDailyCount).from_select(["habit_id", "day", "count"], counts)
+    )
+    rebuilt = result.rowcount
+
+    for habit_id, version in _archived_versions(db, habit_ids).items():
+        values = [
+            {"habit_id": habit_id, "day": day, "count": count}
+            for day, count in sorted(archive.daily_counts(archive.load(habit_id, version)).items())
+        ]
+        for start in range(0, len(values), BATCH_SIZE):
+            stmt = insert(HabitDailyCount).values(values[start:start + BATCH_SIZE])
+            result = db.execute(stmt.on_conflict_do_update(
+                index_elements=[HabitDailyCount.habit_id, HabitDailyCount.day],
+                set_={"count": HabitDailyCount.count + stmt.excluded.count},
+            ))
+            rebuilt += result.rowcount
+    db.commit()
+    return rebuilt
+
+
+@celery_app.task(name="habit_stats.rebuild_daily_counts")
+def rebuild_daily_counts(habit_ids: Optional[list[int]] = None):
+    """Backfill the per-day record counts behind the calendar view."""
+    with get_sync_db_session() as db:
+        rebuilt = rebuild_daily_counts_sync(db, habit_ids)
+    print(f"[INFO] Rebuilt {rebuilt} daily counts")
+    return rebuilt
+
+
+@celery_app.task(name="habit_stats.rebuild_habit_stats")
+def rebuild_habit_stats(habit_ids: Optional[list[int]] = None):
+    """Backfill habit stats for existing records."""
+    with get_sync_db_session() as db:
+        rebuilt = rebuild_stats_sync(db, habit_ids)
+    print(f"[INFO] Rebuilt stats for {rebuilt} habits")
+    return rebuilt
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild per-habit statistics or daily counts from records.")
+    parser.add_argument("--habit-id", type=int, action="append", dest="habit_ids",
+                        help="Only rebuild the given habit (repeatable)")
+    parser.add_argument("--daily-counts", action="store_true",
+                        help="Rebuild the daily counts rollup instead of the stats")
+    args = parser.parse_args()
+    if args.daily_counts:
+        rebuild_daily_counts(args.habit_ids)
+    else:
+        rebuild_habit_stats(args.habit_ids)
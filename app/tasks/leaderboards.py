@@ -0,0 +1,66 @@
+"""Rebuild the Redis leaderboards from Postgres."""
+import datetime
+
+from app import leaderboards
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.redis import get_sync_redis
+from app.core.sync_database import get_sync_db_session
+
+BATCH_SIZE = 5000
+
+
+def _replace_board(redis, key: str, rows, expire_at: datetime.datetime | None = None) -> int:
+    """Fill a scratch set and rename it over `key`, so readers never see a half-built board."""
+    scratch = f"{key}:rebuild"
+    redis.delete(scratch)
+    written = 0
+    batch = {}
+    for user_id, score in rows:
+        batch[user_id] = score
+        if len(batch) >= BATCH_SIZE:
+            redis.zadd(scratch, batch)
+            written += len(batch)
+            batch = {}
+    if batch:
+        redis.zadd(scratch, batch)
+        written += len(batch)
+
+    if written:
+        redis.rename(scratch, key)
+        if expire_at is not None:
+            redis.expireat(key, expire_at)
+    else:
+        redis.delete(key)
+    return written
+
+
+def rebuild_leaderboards_sync(db, redis) -> dict:
+    week = leaderboards.week_start(leaderboards.current_day())
+    boards = {
+        leaderboards.board_key("checkins", "all"): (leaderboards.checkins_query(), None),
+        leaderboards.board_key("checkins", "week"): (
+            leaderboards.checkins_query(week), leaderboards.week_expiry(week)
+        ),
+        leaderboards.board_key("streak", "all"): (leaderboards.streak_query(), None),
+    }
+    written = {}
+    for key, (query, expire_at) in boards.items():
+        rows = db.execute(query.execution_options(yield_per=BATCH_SIZE))
+        written[key] = _replace_board(redis, key, rows, expire_at)
+    return written
+
+
+@celery_app.task(name="leaderboards.rebuild")
+def rebuild_leaderboards():
+    """Reconcile every leaderboard with Postgres; also drops lapsed streaks."""
+    if not settings.LEADERBOARDS_ENABLED:
+        return {}
+    with get_sync_db_session() as db:
+        written = rebuild_leaderboards_sync(db, get_sync_redis())
+    print(f"[INFO] Rebuilt leaderboards: {written}")
+    return written
+
+
+if __name__ == "__main__":
+    rebuild_leaderboards()
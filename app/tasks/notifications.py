@@ -1,64 +1,138 @@
 """Notification tasks for habit reminders."""
 import datetime
-import httpx
+from collections import defaultdict
+
 from app.celery_app import celery_app
+from app.core import metrics
 from app.core.config import settings
 from app.core.sync_database import get_sync_db_session
+from app.tasks.telegram import DeliveryResult, get_engine
 from app import crud
 
 
 @celery_app.task(name="notifications.send_telegram_reminder")
 def send_telegram_reminder(chat_id: str, text: str):
     """Send Telegram message to user."""
+    return send_telegram_batch([(chat_id, text)])
+
+
+@celery_app.task(name="notifications.send_telegram_batch")
+def send_telegram_batch(messages: list):
+    """Send a batch of (chat_id, text) Telegram messages through the shared delivery engine."""
     if not settings.TELEGRAM_BOT_TOKEN:
         print("[WARN] TELEGRAM_BOT_TOKEN not configured - skipping notification")
-        return
+        return {"sent": 0, "failed": 0}
+
+    results = get_engine().send_batch([(chat_id, text) for chat_id, text in messages])
+    for result in results:
+        if not result.ok:
+            print(f"[ERROR] Telegram send to {result.chat_id} failed after {result.attempts} attempts: {result.error}")
+    sent = sum(result.ok for result in results)
+    print(f"[TG] Sent {sent}/{len(results)} messages")
+    return {"sent": sent, "failed": len(results) - sent}
+
+
+REMINDER_TEXT = "Привет! 🌱 Не забудь выполнить привычки сегодня."
+MAX_RETRY_DELAY_SECONDS = 3600
+
+
+def enqueue_due_reminders() -> int:
+    """
+    Move every due reminder from the schedule into the notification outbox.
+
+    Claiming a reminder and writing its outbox row happen in one transaction,
+    so a reminder is neither lost nor queued twice if the process dies.
+    """
+    queued = 0
+    while True:
+        with get_sync_db_session() as db:
+            claimed = crud.claim_due_reminders_sync(db, settings.REMINDER_BATCH_SIZE)
+            queued += crud.enqueue_reminders_sync(db, claimed)
+            db.commit()
+        metrics.REMINDERS_FOUND.inc(len(claimed))
+        if len(claimed) < settings.REMINDER_BATCH_SIZE:
+            return queued
 
-    url = f"https://api.telegram.org/bot{settings.TELEGRAM_BOT_TOKEN}/sendMessage"
-    try:
-        response = httpx.post(url, json={"chat_id": chat_id, "text": text})
-        response.raise_for_status()
-        print(f"[TG] Sent to {chat_id}: {text}")
-    except Exception as e:
-        print(f"[ERROR] Telegram send failed: {e}")
+
+def dispatch_outbox() -> int:
+    """
+    Deliver claimable outbox rows, one message per chat, and record the outcome.
+
+    Several dispatchers may run at once: rows are leased with SKIP LOCKED.
+    """
+    sent = 0
+    while True:
+        with get_sync_db_session() as db:
+            rows = crud.claim_outbox_batch_sync(
+                db, settings.OUTBOX_BATCH_SIZE, settings.OUTBOX_LEASE_SECONDS
+            )
+            db.commit()
+        if not rows:
+            return sent
+
+        # Group habits by chat to avoid duplicate messages
+        ids_by_chat = defaultdict(list)
+        attempts_by_chat = defaultdict(int)
+        missing_chat = []
+        for outbox_id, user_id, chat_id, attempts in rows:
+            if not chat_id:
+                missing_chat.append(outbox_id)
+                continue
+            ids_by_chat[chat_id].append(outbox_id)
+            attempts_by_chat[chat_id] = max(attempts_by_chat[chat_id], attempts)
+
+        chats = list(ids_by_chat)
+        if not settings.TELEGRAM_BOT_TOKEN:
+            print("[WARN] TELEGRAM_BOT_TOKEN not configured - outbox rows left for retry")
+            results = [DeliveryResult(chat_id, False, 0, "Bot token not configured", retryable=True) for chat_id in chats]
+        else:
+            results = get_engine().send_batch([(chat_id, REMINDER_TEXT) for chat_id in chats])
+
+        given_up = len(missing_chat)
+        with get_sync_db_session() as db:
+            if missing_chat:
+                crud.mark_outbox_sync(db, missing_chat, "failed", "User has no telegram_chat_id")
+            for chat_id, result in zip(chats, results):
+                ids = ids_by_chat[chat_id]
+                if result.ok:
+                    crud.mark_outbox_sync(db, ids, "sent")
+                    sent += 1
+                elif result.retryable and attempts_by_chat[chat_id] < settings.OUTBOX_MAX_ATTEMPTS:
+                    delay = min(60 * 2 ** (attempts_by_chat[chat_id] - 1), MAX_RETRY_DELAY_SECONDS)
+                    crud.mark_outbox_sync(db, ids, "retrying", result.error, retry_in=delay)
+                else:
+                    crud.mark_outbox_sync(db, ids, "failed", result.error)
+                    given_up += 1
+                    print(f"[ERROR] Reminder to chat {chat_id} failed: {result.error}")
+            db.commit()
+        metrics.REMINDERS_SENT.inc(sum(result.ok for result in results))
+        metrics.REMINDERS_FAILED.inc(given_up)
+        print(f"[INFO] Delivered {sent} reminders, {len(rows)} outbox rows processed")
+
+        if len(rows) < settings.OUTBOX_BATCH_SIZE:
+            return sent
 
 
 @celery_app.task(bind=True)
 def send_daily_reminders(self):
-    """Send daily habit reminders to users."""
+    """Queue habit reminders that are due now and deliver the outbox."""
     try:
-        with get_sync_db_session() as db:
-            users = crud.get_users_with_due_reminders_sync(db)
-            print(f"[INFO] Found {len(users)} users with due reminders")
-
-            if not users:
-                print("[INFO] No users with due reminders found")
-                return
-
-            # Group habits by user to avoid duplicate messages
-            for user in users:
-                if not user.telegram_chat_id:
-                    print(f"[WARN] User {user.id} has no telegram_chat_id - skipping")
-                    continue
-                
-                # Get user's habits that need reminders now
-                now = datetime.datetime.now(datetime.UTC)
-                # Convert to naive datetime for comparison with database values
-                now_naive = now.replace(tzinfo=None)
-                due_habits = [habit for habit in user.habits 
-                             if habit.reminder_date and habit.reminder_date <= now_naive]
-                
-                if not due_habits:
-                    print(f"[INFO] User {user.id} has no habits due today")
-                    continue
-                
-                text = f"Привет! 🌱 Не забудь выполнить привычки сегодня."
-                
-                # Send single reminder per user
-                send_telegram_reminder.delay(user.telegram_chat_id, text)
-                print(f"[INFO] Sent reminder to user {user.id} for {len(due_habits)} habits")
-                
+        queued = enqueue_due_reminders()
+        if not queued:
+            print("[INFO] No users with due reminders found")
+        return dispatch_outbox()
     except Exception as exc:
         print(f"[ERROR] Daily reminders task failed: {exc}")
+        # Safe to retry: claims are idempotent and sent rows are never re-sent
         raise self.retry(exc=exc, countdown=60, max_retries=3)
 
+
+@celery_app.task(name="notifications.prune_outbox")
+def prune_outbox():
+    """Drop delivered and failed outbox rows past the retention window."""
+    cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=settings.OUTBOX_RETENTION_DAYS)
+    with get_sync_db_session() as db:
+        pruned = crud.prune_outbox_sync(db, cutoff)
+        db.commit()
+    print(f"[INFO] Pruned {pruned} outbox rows")
+    return pruned
@@ -0,0 +1,78 @@
+"""
+Monthly partitions of the `records` table.
+
+`records` is range partitioned on `date` with one partition per calendar
+month (UTC bounds) plus `records_default`, which catches dates no partition
+covers yet. This task keeps RECORD_PARTITION_MONTHS_AHEAD months of
+partitions ready ahead of time. When it creates a month that already has
+rows in the default partition, those rows are moved into the new partition
+before it is attached.
+"""
+import datetime
+
+from sqlalchemy import text
+
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+
+DEFAULT_PARTITION = "records_default"
+
+
+def month_start(day: datetime.date) -> datetime.date:
+    return day.replace(day=1)
+
+
+def next_month(month: datetime.date) -> datetime.date:
+    return datetime.date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def partition_name(month: datetime.date) -> str:
+    return f"records_y{month.year}m{month.month:02d}"
+
+
+def ensure_partition(db, month: datetime.date) -> bool:
+    """Create the partition for `month` unless it exists; returns True when it was created."""
+    name = partition_name(month)
+    exists = db.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+    if exists is not None:
+        return False
+
+    lower = f"{month.isoformat()} 00:00:00+00"
+    upper = f"{next_month(month).isoformat()} 00:00:00+00"
+    bounds = {"lower": lower, "upper": upper}
+    # Attaching scans the default partition for rows in the new range, so move them out first
+    db.execute(text(f"CREATE TABLE {name} (LIKE records INCLUDING DEFAULTS INCLUDING CONSTRAINTS)"))
+    db.execute(text(
+        f"WITH moved AS (DELETE FROM {DEFAULT_PARTITION} WHERE date >= :lower AND date < :upper RETURNING *) "
+        f"INSERT INTO {name} SELECT * FROM moved"
+    ), bounds)
+    db.execute(text(f"ALTER TABLE records ATTACH PARTITION {name} FOR VALUES FROM ('{lower}') TO ('{upper}')"))
+    return True
+
+
+def ensure_partitions_sync(db, months_ahead: int, today: datetime.date | None = None) -> list[str]:
+    month = month_start(today or datetime.datetime.now(datetime.UTC).date())
+    created = []
+    for _ in range(months_ahead + 1):
+        if ensure_partition(db, month):
+            created.append(partition_name(month))
+        month = next_month(month)
+    db.commit()
+    return created
+
+
+@celery_app.task(name="partitions.ensure_record_partitions")
+def ensure_record_partitions(months_ahead: int | None = None):
+    """Create the current and upcoming monthly partitions of `records`."""
+    if months_ahead is None:
+        months_ahead = settings.RECORD_PARTITION_MONTHS_AHEAD
+    with get_sync_db_session() as db:
+        created = ensure_partitions_sync(db, months_ahead)
+    if created:
+        print(f"[INFO] Created record partitions: {', '.join(created)}")
+    return created
+
+
+if __name__ == "__main__":
+    ensure_record_partitions()
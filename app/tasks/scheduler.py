@@ -0,0 +1,87 @@
+"""
+Event-driven reminder scheduler.
+
+Runs as its own process (`python -m app.tasks.scheduler`). Habits waiting for
+a reminder are ordered by `next_reminder_at` through a partial index, so the
+scheduler only ever reads the next fire time, sleeps until then and is woken
+early over Redis when a habit with an earlier reminder is created. Due
+reminders go through the notification outbox, whose retry times are part
+of the same wake-up computation.
+"""
+import datetime
+import time
+
+from prometheus_client import start_http_server
+from redis.exceptions import RedisError
+
+from app import crud
+from app.core import profiler
+from app.core.config import settings
+from app.core.redis import REMINDER_WAKE_CHANNEL, get_sync_redis
+from app.core.sync_database import get_sync_db_session
+from app.tasks.notifications import dispatch_outbox, enqueue_due_reminders
+
+
+def seconds_until_next_reminder() -> float:
+    with get_sync_db_session() as db:
+        next_at = crud.next_reminder_time_sync(db)
+    if next_at is None:
+        return settings.REMINDER_MAX_SLEEP_SECONDS
+    delay = (next_at - datetime.datetime.now(datetime.UTC)).total_seconds()
+    return min(max(delay, 0.0), settings.REMINDER_MAX_SLEEP_SECONDS)
+
+
+class WakeListener:
+    """Blocks until a wake-up is published or the timeout passes; degrades to sleep without Redis."""
+
+    def __init__(self):
+        self._pubsub = None
+        try:
+            # Subscribe before the first schedule read so no wake-up is missed
+            self._subscribe()
+        except RedisError as exc:
+            print(f"[WARN] Reminder wake channel unavailable: {exc}")
+
+    def _subscribe(self):
+        if self._pubsub is None:
+            pubsub = get_sync_redis().pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(REMINDER_WAKE_CHANNEL)
+            self._pubsub = pubsub
+        return self._pubsub
+
+    def wait(self, timeout: float):
+        deadline = time.monotonic() + timeout
+        try:
+            pubsub = self._subscribe()
+            while (remaining := deadline - time.monotonic()) > 0:
+                if pubsub.get_message(timeout=remaining) is not None:
+                    # Coalesce a burst of wake-ups into one re-check
+                    while pubsub.get_message(timeout=0) is not None:
+                        pass
+                    return
+        except RedisError as exc:
+            print(f"[WARN] Reminder wake channel unavailable: {exc}")
+            self._pubsub = None
+            time.sleep(max(deadline - time.monotonic(), 0))
+
+
+def run():
+    if settings.SCHEDULER_METRICS_PORT:
+        start_http_server(settings.SCHEDULER_METRICS_PORT)
+    listener = WakeListener()
+    print("[INFO] Reminder scheduler started")
+    while True:
+        try:
+            with profiler.profile("reminder scheduler iteration"):
+                enqueue_due_reminders()
+                dispatch_outbox()
+                timeout = seconds_until_next_reminder()
+        except Exception as exc:
+            print(f"[ERROR] Reminder scheduler iteration failed: {exc}")
+            timeout = settings.REMINDER_MAX_SLEEP_SECONDS
+        if timeout > 0:
+            listener.wait(timeout)
+
+
+if __name__ == "__main__":
+    run()
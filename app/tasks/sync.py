@@ -0,0 +1,18 @@
+"""Housekeeping for delta sync (GET /sync)."""
+import datetime
+
+from app import crud
+from app.celery_app import celery_app
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+
+
+@celery_app.task(name="sync.prune_tombstones")
+def prune_tombstones():
+    """Drop tombstones past SYNC_TOMBSTONE_RETENTION_DAYS; clients with older cursors resync in full."""
+    cutoff = datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=settings.SYNC_TOMBSTONE_RETENTION_DAYS)
+    with get_sync_db_session() as db:
+        pruned = crud.prune_tombstones_sync(db, cutoff)
+        db.commit()
+    print(f"[INFO] Pruned {pruned} sync tombstones")
+    return pruned
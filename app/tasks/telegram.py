@@ -0,0 +1,181 @@
+"""
+Telegram delivery engine.
+
+One keep-alive `httpx.Client` per process is shared by every send. Token
+buckets keep us under Telegram's global (~30 msg/s) and per-chat (~1 msg/s)
+limits; a 429 pauses the affected chat for the `retry_after` Telegram asks
+for, and transport errors or 5xx answers are retried with backoff. Batches
+are fanned out over a small thread pool, one job per chat so that messages
+to the same chat keep their order.
+"""
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Optional
+
+import httpx
+
+from app.core.config import settings
+
+MAX_BACKOFF_SECONDS = 30
+CHAT_BUCKETS_LIMIT = 10_000
+
+
+class TokenBucket:
+    """Thread-safe token bucket that blocks callers until a token is available."""
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(rate, 1.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._blocked_until = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if now >= self._blocked_until and self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = max(self._blocked_until - now, (1 - self._tokens) / self.rate)
+            time.sleep(wait)
+
+    def block_for(self, seconds: float):
+        """Hand out no tokens for `seconds`, e.g. after a 429."""
+        with self._lock:
+            self._blocked_until = max(self._blocked_until, time.monotonic() + seconds)
+
+    @property
+    def idle(self) -> bool:
+        return time.monotonic() >= self._blocked_until and self._tokens >= self.capacity
+
+
+@dataclass
+class DeliveryResult:
+    chat_id: str
+    ok: bool
+    attempts: int
+    error: Optional[str] = None
+    retryable: bool = False
+
+
+class TelegramDeliveryEngine:
+    def __init__(
+        self,
+        token: str,
+        base_url: str = "https://api.telegram.org",
+        global_rate: float = 30,
+        per_chat_rate: float = 1,
+        concurrency: int = 8,
+        max_retries: int = 3,
+    ):
+        self.token = token
+        self.per_chat_rate = per_chat_rate
+        self.max_retries = max_retries
+        self.concurrency = concurrency
+        self._client = httpx.Client(
+            base_url=base_url,
+            timeout=10.0,
+            limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+        )
+        self._global = TokenBucket(global_rate)
+        self._chats: dict[str, TokenBucket] = {}
+        self._chats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix="telegram")
+
+    def _chat_bucket(self, chat_id: str) -> TokenBucket:
+        with self._chats_lock:
+            bucket = self._chats.get(chat_id)
+            if bucket is None:
+                if len(self._chats) >= CHAT_BUCKETS_LIMIT:
+                    self._chats = {key: value for key, value in self._chats.items() if not value.idle}
+                bucket = self._chats[chat_id] = TokenBucket(self.per_chat_rate, capacity=1)
+            return bucket
+
+    def send(self, chat_id: str, text: str) -> DeliveryResult:
+        chat_id = str(chat_id)
+        chat_bucket = self._chat_bucket(chat_id)
+        error = None
+        for attempt in range(1, self.max_retries + 2):
+            chat_bucket.acquire()
+            self._global.acquire()
+            try:
+                response = self._client.post(
+                    f"/bot{self.token}/sendMessage", json={"chat_id": chat_id, "text": text}
+                )
+            except httpx.TransportError as exc:
+                error = f"transport error: {exc}"
+                time.sleep(min(2 ** (attempt - 1), MAX_BACKOFF_SECONDS))
+                continue
+
+            if response.status_code == 200:
+                return DeliveryResult(chat_id, True, attempt)
+            error = f"HTTP {response.status_code}: {response.text[:200]}"
+            if response.status_code == 429:
+                chat_bucket.block_for(_retry_after(response))
+            elif response.status_code >= 500:
+                time.sleep(min(2 ** (attempt - 1), MAX_BACKOFF_SECONDS))
+            else:
+                # Blocked bot, unknown chat, bad request: retrying will not help
+                return DeliveryResult(chat_id, False, attempt, error)
+        return DeliveryResult(chat_id, False, self.max_retries + 1, error, retryable=True)
+
+    def send_batch(self, messages: list[tuple[str, str]]) -> list[DeliveryResult]:
+        """Send (chat_id, text) pairs; results come back in input order."""
+        by_chat = defaultdict(list)
+        for index, (chat_id, text) in enumerate(messages):
+            by_chat[str(chat_id)].append((index, text))
+
+        def send_chat(chat_id, items):
+            return [(index, self.send(chat_id, text)) for index, text in items]
+
+        results: list[Optional[DeliveryResult]] = [None] * len(messages)
+        for future in [self._pool.submit(send_chat, chat_id, items) for chat_id, items in by_chat.items()]:
+            for index, result in future.result():
+                results[index] = result
+        return results
+
+    def close(self):
+        self._pool.shutdown(wait=True)
+        self._client.close()
+
+
+def _retry_after(response: httpx.Response) -> float:
+    try:
+        return float(response.json()["parameters"]["retry_after"])
+    except (ValueError, KeyError, TypeError):
+        return float(response.headers.get("Retry-After", 1))
+
+
+_engine: Optional[TelegramDeliveryEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_engine() -> TelegramDeliveryEngine:
+    """Per-process engine so that connections and rate limits are shared by all tasks."""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            _engine = TelegramDeliveryEngine(
+                settings.TELEGRAM_BOT_TOKEN,
+                base_url=settings.TELEGRAM_API_URL,
+                global_rate=settings.TELEGRAM_GLOBAL_RATE,
+                per_chat_rate=settings.TELEGRAM_PER_CHAT_RATE,
+                concurrency=settings.TELEGRAM_CONCURRENCY,
+                max_retries=settings.TELEGRAM_MAX_RETRIES,
+            )
+        return _engine
+
+
+def close_engine():
+    global _engine
+    with _engine_lock:
+        if _engine is not None:
+            _engine.close()
+            _engine = None
@@ -0,0 +1,312 @@
+"""
+HTTP load test and latency regression check for the API routes.
+
+    python -m benchmarks.load_test --users 2000 --requests 2000 --concurrency 50
+    python -m benchmarks.load_test --transport uvicorn --workers 4
+    python -m benchmarks.load_test --update-baseline
+
+Seeds users, habits and records straight into the configured database
+(every seeded user shares one bcrypt hash, so seeding does not take hours),
+then drives each route concurrently through httpx.AsyncClient, either
+in-process over ASGITransport or against a uvicorn subprocess. It reports
+p50/p95/p99 latency and requests per second per route. Results are compared
+with the stored baseline, and the run exits with status 1 when a route's
+p95 grows or its RPS drops by more than --threshold. Seeded rows are
+deleted at the end unless --keep-data is given.
+"""
+import argparse
+import asyncio
+import datetime
+import json
+import random
+import socket
+import subprocess
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Awaitable, Callable
+
+import httpx
+from sqlalchemy import delete, insert, select
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from app.core.config import settings
+from app.core.passwords import pwd_context
+from app.models import Habit, Record, User
+from app.routes.users import create_access_token
+
+DEFAULT_BASELINE = Path(__file__).with_name("baseline.json")
+PASSWORD = "load-test-password"
+SEED_CHUNK_SIZE = 5000
+
+
+@dataclass
+class Seed:
+    prefix: str
+    users: list[tuple[int, str, str]]  # (id, email, token)
+    habits: dict[int, list[int]]  # user id -> habit ids
+
+
+@dataclass
+class RouteResult:
+    requests: int
+    errors: int
+    rps: float
+    p50_ms: float
+    p95_ms: float
+    p99_ms: float
+
+
+async def seed(users: int, habits_per_user: int, records_per_habit: int) -> Seed:
+    prefix = f"load-{uuid.uuid4().hex[:8]}"
+    password_hash = pwd_context.hash(PASSWORD)
+    now = datetime.datetime.now(datetime.UTC)
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        async with engine.begin() as connection:
+            await connection.execute(insert(User), [
+                {"email": f"{prefix}-{n}@example.com", "password_hash": password_hash} for n in range(users)
+            ])
+            user_rows = (await connection.execute(
+                select(User.id, User.email).where(User.email.like(f"{prefix}-%")).order_by(User.id)
+            )).all()
+            await connection.execute(insert(Habit), [
+                {"user_id": user_id, "title": f"Habit {n}", "description": "Seeded by the load test"}
+                for user_id, _ in user_rows for n in range(habits_per_user)
+            ])
+            habit_rows = (await connection.execute(
+                select(Habit.id, Habit.user_id).where(Habit.user_id.in_([user_id for user_id, _ in user_rows]))
+            )).all()
+            records = [
+                {"habit_id": habit_id, "date": now - datetime.timedelta(days=day)}
+                for habit_id, _ in habit_rows for day in range(records_per_habit)
+            ]
+            for start in range(0, len(records), SEED_CHUNK_SIZE):
+                await connection.execute(insert(Record), records[start:start + SEED_CHUNK_SIZE])
+    finally:
+        await engine.dispose()
+
+    habits: dict[int, list[int]] = {}
+    for habit_id, user_id in habit_rows:
+        habits.setdefault(user_id, []).append(habit_id)
+    tokens = [
+        (user_id, email, create_access_token({"sub": str(user_id)}, settings.ACCESS_TOKEN_EXPIRE_MINUTES))
+        for user_id, email in user_rows
+    ]
+    print(f"[INFO] Seeded {len(user_rows)} users, {len(habit_rows)} habits, {len(records)} records ({prefix})")
+    return Seed(prefix, tokens, habits)
+
+
+async def cleanup(prefix: str):
+    engine = create_async_engine(settings.DATABASE_URL)
+    try:
+        async with engine.begin() as connection:
+            seeded = select(User.id).where(User.email.like(f"{prefix}-%"))
+            habits = select(Habit.id).where(Habit.user_id.in_(seeded))
+            await connection.execute(delete(Record).where(Record.habit_id.in_(habits)))
+            await connection.execute(delete(Habit).where(Habit.user_id.in_(seeded)))
+            await connection.execute(delete(User).where(User.id.in_(seeded)))
+    finally:
+        await engine.dispose()
+
+
+def percentile(sorted_values: list[float], fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+async def drive(
+    client: httpx.AsyncClient, call: Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]],
+    requests: int, concurrency: int,
+) -> RouteResult:
+    """Run `requests` calls with `concurrency` workers; call(client, n) issues the n-th request."""
+    latencies: list[float] = []
+    errors = 0
+    counter = iter(range(requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            started = time.perf_counter()
+            try:
+                response = await call(client, n)
+                failed = response.status_code >= 400
+            except httpx.HTTPError:
+                failed = True
+            latencies.append(time.perf_counter() - started)
+            errors += failed
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return RouteResult(
+        requests=requests,
+        errors=errors,
+        rps=round(requests / elapsed, 1),
+        p50_ms=round(percentile(latencies, 0.50) * 1000, 2),
+        p95_ms=round(percentile(latencies, 0.95) * 1000, 2),
+        p99_ms=round(percentile(latencies, 0.99) * 1000, 2),
+    )
+
+
+def scenarios(data: Seed) -> dict[str, Callable[[httpx.AsyncClient, int], Awaitable[httpx.Response]]]:
+    def user(n: int):
+        user_id, email, token = data.users[n % len(data.users)]
+        return user_id, email, {"Authorization": f"Bearer {token}"}
+
+    def habit(n: int):
+        user_id, _, headers = user(n)
+        return random.choice(data.habits[user_id]), headers
+
+    async def register(client, n):
+        return await client.post(
+            "/users/register", json={"email": f"{data.prefix}-new-{n}@example.com", "password": PASSWORD}
+        )
+
+    async def token(client, n):
+        _, email, _ = user(n)
+        return await client.post("/users/token", data={"username": email, "password": PASSWORD})
+
+    async def list_habits(client, n):
+        return await client.get("/habits/", headers=user(n)[2])
+
+    async def create_habit(client, n):
+        return await client.post("/habits/", json={"title": f"Load habit {n}"}, headers=user(n)[2])
+
+    async def list_records(client, n):
+        habit_id, headers = habit(n)
+        return await client.get("/records/", params={"habit_id": habit_id}, headers=headers)
+
+    async def create_record(client, n):
+        habit_id, headers = habit(n)
+        now = datetime.datetime.now(datetime.UTC).isoformat()
+        return await client.post("/records/", json={"habit_id": habit_id, "date": now}, headers=headers)
+
+    async def dashboard(client, n):
+        return await client.get("/habits/dashboard", headers=user(n)[2])
+
+    return {
+        "POST /users/register": register,
+        "POST /users/token": token,
+        "GET /habits/": list_habits,
+        "POST /habits/": create_habit,
+        "GET /habits/dashboard": dashboard,
+        "GET /records/": list_records,
+        "POST /records/": create_record,
+    }
+
+
+def regressions(results: dict[str, dict], baseline: dict[str, dict], threshold: float) -> list[str]:
+    problems = []
+    for route, result in results.items():
+        previous = baseline.get(route)
+        if previous is None:
+            continue
+        if result["p95_ms"] > previous["p95_ms"] * (1 + threshold):
+            problems.append(f"{route}: p95 {result['p95_ms']} ms vs baseline {previous['p95_ms']} ms")
+        if result["rps"] < previous["rps"] * (1 - threshold):
+            problems.append(f"{route}: {result['rps']} rps vs baseline {previous['rps']} rps")
+    return problems
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def start_uvicorn(workers: int) -> tuple[subprocess.Popen, str]:
+    port = free_port()
+    process = subprocess.Popen([
+        sys.executable, "-m", "uvicorn", "app.main:app",
+        "--host", "127.0.0.1", "--port", str(port), "--workers", str(workers), "--log-level", "warning",
+    ])
+    url = f"http://127.0.0.1:{port}"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            httpx.get(f"{url}/", timeout=1)
+            return process, url
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not start within 30s")
+
+
+async def run(args) -> dict[str, dict]:
+    data = await seed(args.users, args.habits_per_user, args.records_per_habit)
+    process = None
+    try:
+        if args.transport == "uvicorn":
+            process, url = start_uvicorn(args.workers)
+            client = httpx.AsyncClient(
+                base_url=url, timeout=60,
+                limits=httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency),
+            )
+        else:
+            from app.main import app
+            client = httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test", timeout=60)
+
+        results = {}
+        async with client:
+            for route, call in scenarios(data).items():
+                if args.routes and route not in args.routes:
+                    continue
+                # bcrypt routes are CPU bound by design; a smaller sample keeps the run short
+                requests = args.auth_requests if route.startswith("POST /users") else args.requests
+                result = await drive(client, call, requests, args.concurrency)
+                results[route] = asdict(result)
+                print(
+                    f"{route:<22} {result.rps:>9.1f} rps  p50 {result.p50_ms:>8.2f} ms  "
+                    f"p95 {result.p95_ms:>8.2f} ms  p99 {result.p99_ms:>8.2f} ms  errors {result.errors}"
+                )
+        return results
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+        if not args.keep_data:
+            await cleanup(data.prefix)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--habits-per-user", type=int, default=3)
+    parser.add_argument("--records-per-habit", type=int, default=90)
+    parser.add_argument("--requests", type=int, default=2000, help="requests per route")
+    parser.add_argument("--auth-requests", type=int, default=200, help="requests per register/token route")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--transport", choices=["asgi", "uvicorn"], default="asgi")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers")
+    parser.add_argument("--route", dest="routes", action="append", help="only run this route (repeatable)")
+    parser.add_argument("--baseline", type=Path, default=DEFAULT_BASELINE)
+    parser.add_argument("--update-baseline", action="store_true")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative regression")
+    parser.add_argument("--keep-data", action="store_true")
+    args = parser.parse_args()
+
+    results = asyncio.run(run(args))
+
+    if args.update_baseline:
+        args.baseline.write_text(json.dumps(results, indent=2, sort_keys=True) + "\n")
+        print(f"[INFO] Baseline written to {args.baseline}")
+        return
+    if not args.baseline.exists():
+        print(f"[WARN] No baseline at {args.baseline}; run with --update-baseline to create one")
+        return
+    problems = regressions(results, json.loads(args.baseline.read_text()), args.threshold)
+    for problem in problems:
+        print(f"[ERROR] Regression: {problem}")
+    if problems:
+        sys.exit(1)
+    print(f"[INFO] No regressions beyond {args.threshold:.0%} against {args.baseline}")
+
+
+if __name__ == "__main__":
+    main()
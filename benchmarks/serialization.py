@@ -0,0 +1,61 @@
+"""
+Cost of encoding record listings: response_model path vs row tuples.
+
+    python -m benchmarks.serialization --records 10000 --repeat 20
+
+The "pydantic" path is what FastAPI does for `response_model=list[RecordOut]`
+(validate ORM objects, jsonable_encoder, stdlib json). The other paths encode
+(habit_id, date, id) tuples with app.core.serialization.
+"""
+import argparse
+import datetime
+import json
+import time
+
+from fastapi.encoders import jsonable_encoder
+from pydantic import TypeAdapter
+
+from app import schemas
+from app.core import serialization
+from app.models import Record
+
+
+def bench(label: str, func, repeat: int):
+    func()
+    started = time.perf_counter()
+    for _ in range(repeat):
+        body = func()
+    elapsed = (time.perf_counter() - started) / repeat
+    print(f"{label:<14} {elapsed * 1000:8.2f} ms  {len(body):>10} bytes")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--records", type=int, default=10_000)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    start = datetime.datetime(2024, 1, 1, tzinfo=datetime.UTC)
+    rows = [(n % 50 + 1, start + datetime.timedelta(hours=n), n + 1) for n in range(args.records)]
+    orm_records = [Record(habit_id=habit_id, date=date, id=record_id) for habit_id, date, record_id in rows]
+    adapter = TypeAdapter(list[schemas.RecordOut])
+    columns = serialization.RECORD_COLUMNS
+
+    def pydantic_path():
+        models = adapter.validate_python(orm_records, from_attributes=True)
+        return json.dumps(jsonable_encoder(models)).encode()
+
+    def representation(media_type, encoding=None):
+        rep = serialization.Representation(media_type, encoding)
+        return lambda: serialization.render_rows(rep, columns, rows)[0]
+
+    print(f"{args.records} records, mean of {args.repeat} runs")
+    bench("pydantic", pydantic_path, args.repeat)
+    bench("orjson", representation(serialization.JSON), args.repeat)
+    bench("msgpack", representation(serialization.MSGPACK), args.repeat)
+    bench("orjson+gzip", representation(serialization.JSON, "gzip"), args.repeat)
+    bench("orjson+br", representation(serialization.JSON, "br"), args.repeat)
+
+
+if __name__ == "__main__":
+    main()
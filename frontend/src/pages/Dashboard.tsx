@@ -19,21 +19,16 @@ const Dashboard: React.FC = () => {
 
   useEffect(() => {
     loadHabits();
-  }, []);
+  }, [currentMonth]);
 
   const loadHabits = async () => {
     try {
       setLoading(true);
-      const habitsData = await habitsAPI.getHabits();
+      // Habits and their records for the displayed month in a single request
+      const habitsData = await habitsAPI.getDashboard(startOfMonth(currentMonth).toISOString());
       setHabits(habitsData);
-      // Load records for each habit
-      const recordsPromises = habitsData.map(async (h) => {
-        const recs = await recordsAPI.getRecords(h.id);
-        return [h.id, recs] as [number, Record[]];
-      });
-      const results = await Promise.all(recordsPromises);
       const map: { [key: number]: Record[] } = {};
-      results.forEach(([hid, recs]) => { map[hid] = recs; });
+      habitsData.forEach((h) => { map[h.id] = h.records; });
       setRecordsByHabit(map);
     } catch (error: any) {
       toast.error('Failed to load habits');
@@ -1,5 +1,5 @@
 import axios from 'axios';
-import { User, UserCreate, Token, Habit, HabitCreate } from '../types';
+import { User, UserCreate, Token, Habit, HabitCreate, HabitWithRecords } from '../types';
 
 const API_BASE_URL = '/api';
 
@@ -58,6 +58,11 @@ export const habitsAPI = {
     return response.data;
   },
 
+  getDashboard: async (since?: string): Promise<HabitWithRecords[]> => {
+    const response = await api.get('/habits/dashboard', { params: since ? { since } : {} });
+    return response.data;
+  },
+
   createHabit: async (habitData: HabitCreate): Promise<Habit> => {
     const response = await api.post('/habits/', habitData);
     return response.data;
@@ -33,6 +33,10 @@ export interface Record {
   date: string;
 }
 
+export interface HabitWithRecords extends Habit {
+  records: Record[];
+}
+
 export interface RecordCreate {
   habit_id: number;
   date: string;
@@ -0,0 +1,86 @@
+"""
+Local stand-in for the Telegram Bot API.
+
+Implements `sendMessage` with Telegram-style global and per-chat rate limits
+(answering 429 with `parameters.retry_after`), and records what it delivered.
+Run it standalone with `uvicorn tests.telegram_stub:app --port 8081` and point
+TELEGRAM_API_URL at it, or start it in-process with `StubServer`.
+"""
+import socket
+import threading
+import time
+from collections import defaultdict, deque
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+def create_app(global_rate: int = 30, per_chat_rate: int = 1, retry_after: int = 1) -> FastAPI:
+    stub = FastAPI(title="Telegram Bot API stub")
+    stub.state.delivered = []
+    stub.state.throttled = 0
+    sent_at = deque()
+    sent_at_by_chat = defaultdict(deque)
+
+    def over_limit(window: deque, limit: int, now: float) -> bool:
+        while window and window[0] <= now - 1:
+            window.popleft()
+        return len(window) >= limit
+
+    @stub.post("/bot{token}/sendMessage")
+    async def send_message(token: str, request: Request):
+        payload = await request.json()
+        chat_id = str(payload.get("chat_id"))
+        if not chat_id or not payload.get("text"):
+            return JSONResponse(
+                {"ok": False, "error_code": 400, "description": "Bad Request: message text is empty"},
+                status_code=400,
+            )
+
+        now = time.monotonic()
+        if over_limit(sent_at, global_rate, now) or over_limit(sent_at_by_chat[chat_id], per_chat_rate, now):
+            stub.state.throttled += 1
+            return JSONResponse(
+                {
+                    "ok": False,
+                    "error_code": 429,
+                    "description": f"Too Many Requests: retry after {retry_after}",
+                    "parameters": {"retry_after": retry_after},
+                },
+                status_code=429,
+            )
+
+        sent_at.append(now)
+        sent_at_by_chat[chat_id].append(now)
+        stub.state.delivered.append((chat_id, payload["text"]))
+        return {"ok": True, "result": {"message_id": len(stub.state.delivered), "chat": {"id": chat_id}}}
+
+    return stub
+
+
+app = create_app()
+
+
+class StubServer:
+    """Runs a stub app on a free local port in a background thread."""
+
+    def __init__(self, stub: FastAPI):
+        self.app = stub
+        with socket.socket() as sock:
+            sock.bind(("127.0.0.1", 0))
+            self.port = sock.getsockname()[1]
+        self.url = f"http://127.0.0.1:{self.port}"
+        config = uvicorn.Config(stub, host="127.0.0.1", port=self.port, log_level="warning")
+        self._server = uvicorn.Server(config)
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join()
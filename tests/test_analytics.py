@@ -0,0 +1,44 @@
+import numpy as np
+
+from app.tasks.analytics import MetricsAccumulator, chunk_metrics, iter_chunks
+
+
+def test_chunk_metrics_are_additive():
+    # Habit 1: three consecutive days plus a duplicate check-in, habit 2: two separate days
+    habit_ids = np.array([1, 1, 1, 1, 2, 2])
+    days = np.array([0, 1, 1, 2, 0, 9])
+
+    whole = MetricsAccumulator()
+    whole.add(chunk_metrics(habit_ids, days))
+    split = MetricsAccumulator()
+    split.add(chunk_metrics(habit_ids[:4], days[:4]))
+    split.add(chunk_metrics(habit_ids[4:], days[4:]))
+
+    assert whole.results() == split.results()
+    streaks = next(row for row in whole.results() if row["metric"] == "streak_lengths")["payload"]
+    assert dict(zip(streaks["lengths"], streaks["counts"])) == {1: 2, 3: 1}
+    retention = next(row for row in whole.results() if row["metric"] == "retention")["payload"]
+    assert retention["habits"] == 2
+    assert retention["weeks"][:2] == [1.0, 0.5]
+    weekdays = next(row for row in whole.results() if row["metric"] == "weekday_completions")
+    assert sum(weekdays["payload"]["counts"]) == 5
+
+
+class DailyCountsSession:
+    """Stands in for the sync session: hands out (habit_id, epoch day) rows in fixed partitions."""
+
+    def __init__(self, partitions):
+        self._partitions = partitions
+
+    def execute(self, statement):
+        assert "habit_daily_counts" in str(statement)
+        return self
+
+    def partitions(self):
+        return iter(self._partitions)
+
+
+def test_iter_chunks_reads_daily_counts_without_splitting_habits():
+    db = DailyCountsSession([[(1, 0), (1, 1), (2, 0)], [(2, 5), (3, 1)], [(3, 2)]])
+    chunks = [(habit_ids.tolist(), days.tolist()) for habit_ids, days in iter_chunks(db, 3)]
+    assert chunks == [([1, 1], [0, 1]), ([2, 2], [0, 5]), ([3, 3], [1, 2])]
@@ -0,0 +1,105 @@
+import datetime
+
+import numpy as np
+import pytest
+
+from app import archive
+from app.core.config import settings
+from app.tasks.archive import archive_cutoff
+
+
+def at(day, hour=0):
+    return datetime.datetime(2024, 1, day, hour, tzinfo=datetime.UTC)
+
+
+@pytest.fixture
+def archive_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    archive.load.cache_clear()
+    yield tmp_path
+    archive.load.cache_clear()
+
+
+def test_micros_round_trip():
+    moment = datetime.datetime(2024, 3, 5, 7, 8, 9, 123456, tzinfo=datetime.UTC)
+    assert archive.from_micros(archive.to_micros(moment)) == moment
+    assert archive.to_micros(moment.replace(tzinfo=None)) == archive.to_micros(moment)
+
+
+def test_write_load_and_discard(archive_dir):
+    array = archive.from_rows([(at(3), 30), (at(1), 10), (at(1), 5)])
+    assert array[1].tolist() == [5, 10, 30]
+    archive.write(7, 1, array)
+    archive.write(7, 2, archive.merge(array, archive.from_rows([(at(2), 20)])))
+
+    loaded = archive.load(7, 2)
+    assert isinstance(loaded, np.memmap)
+    assert loaded[1].tolist() == [5, 10, 20, 30]
+
+    archive.discard(7, keep=(2,))
+    assert not archive.archive_path(7, 1).exists()
+    assert archive.archive_path(7, 2).exists()
+    archive.discard(7)
+    assert not archive.archive_path(7, 2).exists()
+
+
+def test_select_range_bounds_cursor_and_limit():
+    array = archive.from_rows([(at(1), 1), (at(2), 2), (at(2), 3), (at(3), 4), (at(4), 5)])
+
+    assert [r.id for r in archive.select_range(array, 9)] == [1, 2, 3, 4, 5]
+    assert [r.id for r in archive.select_range(array, 9, at(2), at(4))] == [2, 3, 4]
+    assert [r.id for r in archive.select_range(array, 9, after=(at(2), 2))] == [3, 4, 5]
+    assert [r.id for r in archive.select_range(array, 9, after=(at(2), 3), limit=1)] == [4]
+
+    record = archive.select_range(array, 9, limit=1)[0]
+    assert (record.habit_id, record.date, record.id) == (9, at(1), 1)
+
+
+def test_reaches():
+    bound = at(10)
+    assert archive.reaches(bound)
+    assert archive.reaches(bound, at(9))
+    assert not archive.reaches(bound, at(10))
+    assert not archive.reaches(bound, at(1), (at(11), 3))
+
+
+def test_add_to_stats_merges_days():
+    array = archive.from_rows([(at(1, 8), 1), (at(1, 9), 2), (at(2), 3)])
+    days, total, last = archive.add_to_stats(array, [datetime.date(2024, 1, 3)], 1, at(3))
+    assert days == [datetime.date(2024, 1, d) for d in (1, 2, 3)]
+    assert total == 4
+    assert last == at(3)
+
+    days, total, last = archive.add_to_stats(array, [], 0, None)
+    assert total == 3 and last == at(2)
+
+
+def test_remove_splits_records_off():
+    array = archive.from_rows([(at(1), 1), (at(2), 2), (at(3), 3)])
+    kept, removed = archive.remove(array, 9, [2, 4])
+    assert kept[1].tolist() == [1, 3]
+    assert removed == [archive.ArchivedRecord(9, at(2), 2)]
+
+    empty, _ = archive.remove(kept, 9, [1, 3])
+    assert empty.shape == (2, 0)
+    assert archive.add_to_stats(empty, [datetime.date(2024, 1, 5)], 1, at(5)) == ([datetime.date(2024, 1, 5)], 1, at(5))
+
+
+def test_export_merger_interleaves_archived_records():
+    merger = archive.ExportMerger({
+        1: archive.from_rows([(at(1), 10), (at(5), 50)]),
+        2: archive.from_rows([(at(1), 20)]),
+    })
+    habit = lambda habit_id: (habit_id, f"h{habit_id}", None, None)
+
+    rows = merger.feed([(*habit(1), 30, at(3))])
+    rows += merger.feed([(*habit(1), 60, at(6)), (*habit(2), None, None), (*habit(3), None, None)])
+    rows += merger.finish()
+
+    assert [(row[0], row[4]) for row in rows] == [(1, 10), (1, 30), (1, 50), (1, 60), (2, 20), (3, None)]
+    assert rows[2][5] == at(5)
+
+
+def test_archive_cutoff_is_month_aligned():
+    cutoff = archive_cutoff(365, datetime.date(2026, 10, 18))
+    assert cutoff == datetime.datetime(2025, 10, 1, tzinfo=datetime.UTC)
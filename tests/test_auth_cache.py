@@ -0,0 +1,27 @@
+import pytest
+
+from app.core import auth_cache
+from app.core.cache import TTLCache
+from app.routes.users import create_access_token
+
+
+def test_ttl_cache_evicts_least_recently_used():
+    cache = TTLCache(max_entries=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    cache.set("d", 4, ttl=0)
+    assert cache.get("d") is None
+
+
+def test_resolve_token_is_cached_and_rejects_garbage():
+    auth_cache.clear()
+    token = create_access_token({"sub": "42"}, 5)
+    assert auth_cache.resolve_token(token) == 42
+    assert len(auth_cache._tokens) == 1
+    assert auth_cache.resolve_token(token) == 42
+    with pytest.raises(auth_cache.InvalidToken):
+        auth_cache.resolve_token("not-a-token")
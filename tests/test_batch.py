@@ -0,0 +1,99 @@
+import random
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from pydantic import ValidationError
+
+from app import schemas
+from app.main import app
+
+
+def test_batch_request_validation():
+    batch = schemas.BatchRequest.model_validate({"operations": [
+        {"op": "create_habit", "title": "Read", "ref": "read"},
+        {"op": "create_record", "habit_ref": "read", "date": "2025-01-01T08:00:00+00:00"},
+        {"op": "delete_record", "habit_id": 1, "record_id": 2},
+    ]})
+    assert [op.op for op in batch.operations] == ["create_habit", "create_record", "delete_record"]
+
+    with pytest.raises(ValidationError):
+        schemas.BatchRequest.model_validate({"operations": [{"op": "rename_habit", "habit_id": 1}]})
+    with pytest.raises(ValidationError):
+        schemas.BatchRequest.model_validate({"operations": [
+            {"op": "create_record", "date": "2025-01-01T08:00:00+00:00"},
+        ]})
+    with pytest.raises(ValidationError):
+        schemas.BatchRequest.model_validate({"operations": [
+            {"op": "create_habit", "title": "A", "ref": "x"},
+            {"op": "create_habit", "title": "B", "ref": "x"},
+        ]})
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_applies_operations_in_order():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        habit = (await client.post("/habits/", json={"title": "Run"}, headers=headers)).json()
+        record = (await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2025-02-01T07:00:00+00:00"
+        }, headers=headers)).json()
+
+        response = await client.post("/batch", json={"operations": [
+            {"op": "create_habit", "title": "Read", "ref": "read"},
+            {"op": "create_record", "habit_ref": "read", "date": "2025-02-01T21:00:00+00:00"},
+            {"op": "create_record", "habit_id": habit["id"], "date": "2025-02-02T07:00:00+00:00"},
+            {"op": "delete_record", "habit_id": habit["id"], "record_id": record["id"]},
+            {"op": "delete_record", "habit_id": habit["id"], "record_id": record["id"]},
+            {"op": "create_record", "habit_id": 0, "date": "2025-02-02T07:00:00+00:00"},
+        ]}, headers=headers)
+        assert response.status_code == 200
+        results = response.json()["results"]
+        assert [r["status"] for r in results] == [201, 201, 201, 200, 404, 404]
+
+        read_id = results[0]["id"]
+        records = (await client.get("/records/", params={"habit_id": read_id}, headers=headers)).json()
+        assert [r["id"] for r in records] == [results[1]["id"]]
+        stats = (await client.get(f"/habits/{habit['id']}/stats", headers=headers)).json()
+        assert stats["total_completions"] == 1
+
+        response = await client.post("/batch", json={"operations": [
+            {"op": "delete_habit", "habit_id": read_id},
+            {"op": "create_record", "habit_id": read_id, "date": "2025-02-03T07:00:00+00:00"},
+        ]}, headers=headers)
+        assert [r["status"] for r in response.json()["results"]] == [200, 404]
+        habits = (await client.get("/habits/", headers=headers)).json()
+        assert [h["id"] for h in habits] == [habit["id"]]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_batch_accepts_mixed_naive_and_aware_reminders():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        response = await client.post("/batch", json={"operations": [
+            {"op": "create_habit", "title": "Water", "reminder_date": "2030-01-01T09:00:00"},
+            {"op": "create_habit", "title": "Walk", "reminder_date": "2030-01-01T10:00:00+02:00"},
+        ]}, headers=headers)
+        assert response.status_code == 200
+        assert [r["status"] for r in response.json()["results"]] == [201, 201]
@@ -0,0 +1,35 @@
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import QueuePool
+
+from app.core import engine_profiles
+from app.core.config import settings
+
+
+def test_settings_override_profile_values(monkeypatch):
+    monkeypatch.setattr(settings, "DB_POOL_SIZE", 7)
+    profile = engine_profiles.get_profile("prod")
+    assert profile.pool_size == 7
+    assert profile.max_overflow == engine_profiles.PROFILES["prod"].max_overflow
+    with pytest.raises(ValueError):
+        engine_profiles.get_profile("staging")
+
+
+def test_pgbouncer_profile_disables_prepared_statement_caches():
+    options = engine_profiles.engine_options(engine_profiles.get_profile("pgbouncer"), "asyncpg")
+    connect_args = options["connect_args"]
+    assert connect_args["statement_cache_size"] == 0
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert connect_args["prepared_statement_name_func"]() != connect_args["prepared_statement_name_func"]()
+
+
+def test_pool_status_counts_checkouts(tmp_path):
+    options = engine_profiles.engine_options(engine_profiles.get_profile("prod"), "pysqlite")
+    engine = create_engine(f"sqlite:///{tmp_path / 'pool.db'}", poolclass=QueuePool, **options)
+    try:
+        with engine.connect():
+            status = engine_profiles.pool_status(engine)
+            assert status["checked_out"] == 1
+        assert engine_profiles.pool_status(engine)["checked_in"] == 1
+    finally:
+        engine.dispose()
@@ -0,0 +1,84 @@
+import asyncio
+
+import pytest
+
+from app.core import events
+from app.core.config import settings
+
+
+class MemoryPubSub:
+    def __init__(self):
+        self.channels = set()
+        self.messages = asyncio.Queue()
+
+    async def subscribe(self, channel):
+        self.channels.add(channel)
+
+    async def unsubscribe(self, channel):
+        self.channels.discard(channel)
+
+    async def get_message(self, ignore_subscribe_messages=False, timeout=0.0):
+        try:
+            return await asyncio.wait_for(self.messages.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+    async def aclose(self):
+        pass
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.bus = MemoryPubSub()
+
+    def pubsub(self, ignore_subscribe_messages=False):
+        return self.bus
+
+    async def publish(self, channel, data):
+        if channel in self.bus.channels:
+            await self.bus.messages.put({"type": "message", "channel": channel.encode(), "data": data})
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    memory = MemoryRedis()
+    monkeypatch.setattr(events, "get_redis", lambda: memory)
+    monkeypatch.setattr(settings, "EVENTS_ENABLED", True)
+    return memory
+
+
+@pytest.mark.asyncio
+async def test_hub_fans_out_per_user_and_unsubscribes(redis):
+    hub = events.EventHub(max_streams=10, queue_size=2)
+    phone = await hub.open(1)
+    laptop = await hub.open(1)
+    other = await hub.open(2)
+    assert redis.bus.channels == {"events:user:1", "events:user:2"}
+    assert hub.streams == 3
+
+    await events.publish(1, {"type": "changed"})
+    assert await asyncio.wait_for(phone.get(), 2) == b'{"type":"changed"}'
+    assert await asyncio.wait_for(laptop.get(), 2) == b'{"type":"changed"}'
+    assert other.empty()
+
+    await hub.close(1, phone)
+    assert "events:user:1" in redis.bus.channels
+    await hub.close(1, laptop)
+    await hub.close(1, laptop)
+    assert redis.bus.channels == {"events:user:2"}
+    assert hub.streams == 1
+    await hub.shutdown()
+
+
+@pytest.mark.asyncio
+async def test_hub_drops_events_for_full_queues_and_limits_streams(redis):
+    hub = events.EventHub(max_streams=1, queue_size=1)
+    queue = await hub.open(1)
+    with pytest.raises(events.TooManyStreams):
+        await hub.open(2)
+
+    for _ in range(3):
+        hub._deliver({"type": "message", "channel": b"events:user:1", "data": b"{}"})
+    assert queue.qsize() == 1
+    await hub.close(1, queue)
+    await hub.shutdown()
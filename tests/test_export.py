@@ -0,0 +1,70 @@
+import csv
+import io
+import json
+import random
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app import crud
+from app.main import app
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_export_streams_ndjson_and_csv_across_batches(monkeypatch):
+    # Several batches for a handful of rows, so ordering has to hold across batch boundaries
+    monkeypatch.setattr(crud, "EXPORT_BATCH_SIZE", 2)
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        run = (await client.post("/habits/", json={"title": "Run", "description": "5k"}, headers=headers)).json()
+        empty = (await client.post("/habits/", json={"title": "Read"}, headers=headers)).json()
+        swim = (await client.post("/habits/", json={"title": "Swim"}, headers=headers)).json()
+        run_records = {}
+        for date in ("2025-03-03T07:00:00+00:00", "2025-03-01T07:00:00+00:00",
+                     "2025-03-02T07:00:00+00:00", "2025-03-01T07:00:00+00:00"):
+            record = (await client.post("/records/", json={"habit_id": run["id"], "date": date}, headers=headers)).json()
+            run_records[record["id"]] = date
+        swim_record = (await client.post("/records/", json={
+            "habit_id": swim["id"],
+            "date": "2025-03-05T18:00:00+00:00"
+        }, headers=headers)).json()
+        # Same-day records keep their id order
+        run_order = sorted(run_records, key=lambda record_id: (run_records[record_id], record_id))
+
+        response = await client.get("/export/", headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("application/x-ndjson")
+        lines = [json.loads(line) for line in response.text.splitlines()]
+        assert [(line["type"], line["id"]) for line in lines] == [
+            ("habit", run["id"]),
+            *[("record", record_id) for record_id in run_order],
+            ("habit", empty["id"]),
+            ("habit", swim["id"]),
+            ("record", swim_record["id"]),
+        ]
+        assert lines[0]["title"] == "Run" and lines[0]["description"] == "5k"
+        assert all(line["habit_id"] == run["id"] for line in lines[1:5])
+
+        response = await client.get("/export/", params={"format": "csv"}, headers=headers)
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/csv")
+        rows = list(csv.reader(io.StringIO(response.text)))
+        assert rows[0] == ["habit_id", "habit_title", "habit_description", "reminder_date", "record_id", "date"]
+        assert [(row[0], row[4]) for row in rows[1:]] == [
+            *[(str(run["id"]), str(record_id)) for record_id in run_order],
+            (str(empty["id"]), ""),
+            (str(swim["id"]), str(swim_record["id"])),
+        ]
+        assert rows[1][1:3] == ["Run", "5k"]
+        assert rows[5][1:] == ["Read", "", "", "", ""]
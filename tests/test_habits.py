@@ -3,7 +3,10 @@ import random
 
 import pytest
 from httpx import AsyncClient, ASGITransport
+from sqlalchemy import select
+from app.core.sync_database import get_sync_db_session
 from app.main import app
+from app.models import Record
 
 @pytest.mark.asyncio(loop_scope="session")
 async def test_create_habit():
@@ -31,3 +34,105 @@ async def test_create_habit():
         assert response.status_code == 200
         data = response.json()
         assert data["title"] == "Test habit"
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_dashboard_returns_habits_with_records():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        habit = (await client.post("/habits/", json={"title": "Run"}, headers=headers)).json()
+        await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2020-01-01T08:00:00+00:00"
+        }, headers=headers)
+        await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2030-01-01T08:00:00+00:00"
+        }, headers=headers)
+
+        response = await client.get("/habits/dashboard", params={"since": "2025-01-01T00:00:00+00:00"}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert [h["id"] for h in data] == [habit["id"]]
+        assert [r["date"][:4] for r in data[0]["records"]] == ["2030"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_calendar_counts_records_per_day():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        habit = (await client.post("/habits/", json={"title": "Stretch"}, headers=headers)).json()
+        created = []
+        for date in ["2024-01-01T08:00:00+00:00", "2024-01-01T20:00:00+00:00", "2024-03-01T08:00:00+00:00"]:
+            record = await client.post("/records/", json={"habit_id": habit["id"], "date": date}, headers=headers)
+            created.append(record.json())
+        await client.delete(f"/records/{created[1]['id']}", params={"habit_id": habit["id"]}, headers=headers)
+
+        response = await client.get(f"/habits/{habit['id']}/calendar", params={"year": 2024}, headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["start"] == "2024-01-01"
+        assert len(data["counts"]) == 366
+        assert data["counts"][0] == 1
+        assert data["counts"][31 + 29] == 1
+        assert sum(data["counts"]) == 2
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_deleting_a_habit_deletes_its_records_on_every_path():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        record_ids = []
+        habit_ids = []
+        for title in ("Single", "Batch"):
+            habit = (await client.post("/habits/", json={"title": title}, headers=headers)).json()
+            habit_ids.append(habit["id"])
+            record = (await client.post("/records/", json={
+                "habit_id": habit["id"],
+                "date": "2025-05-01T07:00:00+00:00"
+            }, headers=headers)).json()
+            record_ids.append(record["id"])
+
+        response = await client.delete(f"/habits/{habit_ids[0]}", headers=headers)
+        assert response.status_code == 200
+        response = await client.post("/batch", json={"operations": [
+            {"op": "delete_habit", "habit_id": habit_ids[1]},
+        ]}, headers=headers)
+        assert [r["status"] for r in response.json()["results"]] == [200]
+
+        with get_sync_db_session() as db:
+            left = db.execute(select(Record.id).where(Record.id.in_(record_ids))).scalars().all()
+        assert left == []
@@ -0,0 +1,42 @@
+import datetime
+
+import pytest
+
+from app import leaderboards
+
+
+def test_board_keys_per_metric_and_period():
+    day = datetime.date(2026, 1, 1)
+    assert leaderboards.board_key("checkins", "week", day) == "leaderboard:checkins:week:2026-W01"
+    assert leaderboards.board_key("checkins", "week", datetime.date(2025, 12, 29)).endswith("2026-W01")
+    assert leaderboards.board_key("streak", "all") == "leaderboard:streak:all"
+    with pytest.raises(ValueError):
+        leaderboards.board_key("streak", "week")
+    with pytest.raises(ValueError):
+        leaderboards.board_key("minutes", "all")
+
+
+def test_week_boards_expire_after_the_kept_weeks(monkeypatch):
+    monkeypatch.setattr(leaderboards.settings, "LEADERBOARD_WEEKS_KEPT", 2)
+    expiry = leaderboards.week_expiry(datetime.date(2026, 1, 1))
+    assert expiry == datetime.datetime(2026, 1, 19, tzinfo=datetime.UTC)
+
+
+class ScoresRedis:
+    def __init__(self, scores):
+        self.scores = scores
+
+    async def zmscore(self, key, members):
+        return [self.scores.get(member) for member in members]
+
+
+@pytest.mark.asyncio
+async def test_among_ranks_only_the_given_users(monkeypatch):
+    monkeypatch.setattr(leaderboards, "get_redis", lambda: ScoresRedis({1: 5.0, 2: 9.0, 3: 5.0}))
+    entries = await leaderboards.among("checkins", "all", [3, 1, 2, 4])
+    assert entries == [
+        {"rank": 1, "user_id": 2, "score": 9},
+        {"rank": 2, "user_id": 1, "score": 5},
+        {"rank": 3, "user_id": 3, "score": 5},
+        {"rank": 4, "user_id": 4, "score": 0},
+    ]
@@ -0,0 +1,38 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import create_engine, text
+
+from app.core import metrics
+from app.main import app
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_metrics_endpoint_reports_route_templates_and_pools():
+    async with AsyncClient(transport=ASGITransport(app=app), base_url="http://test") as ac:
+        await ac.get("/")
+        await ac.get("/habits/999/stats")
+        await ac.get("/no-such-page")
+        response = await ac.get("/metrics")
+
+    assert response.status_code == 200
+    body = response.text
+    assert 'http_request_duration_seconds_count{method="GET",route="/",status="200"}' in body
+    assert 'route="/habits/{habit_id}/stats",status="401"' in body
+    assert 'route="unmatched",status="404"' in body
+    assert 'db_pool_connections{engine="async",state="size"}' in body
+
+
+def test_instrumented_engine_counts_queries_per_request_context():
+    engine = create_engine("sqlite://")
+    metrics.instrument_engine(engine, "test")
+    stats = metrics.QueryStats()
+    token = metrics._request_queries.set(stats)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            connection.execute(text("SELECT 2"))
+    finally:
+        metrics._request_queries.reset(token)
+        engine.dispose()
+    assert stats.count == 2
+    assert metrics.DB_QUERIES.labels("test")._value.get() == 2
@@ -0,0 +1,152 @@
+import datetime
+import random
+
+import pytest
+from sqlalchemy import delete, update
+
+from app import crud
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+from app.models import Habit, NotificationOutbox, User
+from app.tasks import notifications
+from app.tasks.telegram import DeliveryResult
+
+FIRE_AT = datetime.datetime(2025, 6, 1, 8, 0, tzinfo=datetime.UTC)
+
+
+@pytest.fixture
+def owner():
+    """A user with a chat id and three habits; everything is removed afterwards."""
+    suffix = random.randint(1, 10_000_000)
+    with get_sync_db_session() as db:
+        user = User(email=f"outbox{suffix}", password_hash="x", telegram_chat_id=f"chat-{suffix}")
+        db.add(user)
+        db.flush()
+        habits = [Habit(title=f"Habit {n}", user_id=user.id) for n in range(3)]
+        db.add_all(habits)
+        db.commit()
+        user_id, habit_ids = user.id, [habit.id for habit in habits]
+    yield user_id, f"chat-{suffix}", habit_ids
+    with get_sync_db_session() as db:
+        db.execute(delete(NotificationOutbox).where(NotificationOutbox.user_id == user_id))
+        db.execute(delete(Habit).where(Habit.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+
+
+def outbox_rows(db, user_id):
+    return db.execute(
+        NotificationOutbox.__table__.select()
+        .where(NotificationOutbox.user_id == user_id)
+        .order_by(NotificationOutbox.habit_id)
+    ).all()
+
+
+def test_enqueue_is_idempotent(owner):
+    user_id, chat_id, habit_ids = owner
+    claimed = [(habit_ids[0], user_id, FIRE_AT), (habit_ids[1], user_id, FIRE_AT)]
+    with get_sync_db_session() as db:
+        assert crud.enqueue_reminders_sync(db, claimed) == 2
+        db.commit()
+        # A replayed claim hits uq_notification_outbox_user_habit_fire
+        assert crud.enqueue_reminders_sync(db, claimed) == 0
+        assert crud.enqueue_reminders_sync(db, [(habit_ids[0], user_id, FIRE_AT + datetime.timedelta(days=1))]) == 1
+        db.commit()
+        rows = outbox_rows(db, user_id)
+    assert len(rows) == 3
+    assert {row.status for row in rows} == {"pending"}
+    assert {row.chat_id for row in rows} == {chat_id}
+
+
+def test_claim_skips_locked_rows_and_reclaims_expired_leases(owner):
+    user_id, chat_id, habit_ids = owner
+    with get_sync_db_session() as db:
+        crud.enqueue_reminders_sync(db, [(habit_id, user_id, FIRE_AT) for habit_id in habit_ids[:2]])
+        db.commit()
+
+    with get_sync_db_session() as first, get_sync_db_session() as second:
+        leased = [row for row in crud.claim_outbox_batch_sync(first, 10_000, 300) if row.user_id == user_id]
+        assert len(leased) == 2
+        assert {row.attempts for row in leased} == {1}
+        # Rows leased by an uncommitted claim are skipped, not waited for
+        assert not [row for row in crud.claim_outbox_batch_sync(second, 10_000, 300) if row.user_id == user_id]
+        second.rollback()
+        first.commit()
+        # A live lease is not claimable either
+        assert not [row for row in crud.claim_outbox_batch_sync(second, 10_000, 300) if row.user_id == user_id]
+        second.rollback()
+
+        expired = datetime.datetime.now(datetime.UTC) - datetime.timedelta(seconds=1)
+        second.execute(
+            update(NotificationOutbox)
+            .where(NotificationOutbox.id == leased[0].id)
+            .values(next_attempt_at=expired)
+        )
+        second.commit()
+        reclaimed = [row for row in crud.claim_outbox_batch_sync(second, 10_000, 300) if row.user_id == user_id]
+        second.commit()
+    assert [(row.id, row.attempts) for row in reclaimed] == [(leased[0].id, 2)]
+
+
+class FailingEngine:
+    def __init__(self):
+        self.batches = []
+
+    def send_batch(self, messages):
+        self.batches.append(messages)
+        return [DeliveryResult(chat_id, False, 1, "Bad Gateway", retryable=True) for chat_id, _ in messages]
+
+
+def test_dispatch_backs_off_then_gives_up(owner, monkeypatch):
+    user_id, chat_id, habit_ids = owner
+    engine = FailingEngine()
+    monkeypatch.setattr(settings, "TELEGRAM_BOT_TOKEN", "token")
+    monkeypatch.setattr(settings, "OUTBOX_MAX_ATTEMPTS", 3)
+    monkeypatch.setattr(notifications, "get_engine", lambda: engine)
+    with get_sync_db_session() as db:
+        crud.enqueue_reminders_sync(db, [(habit_ids[0], user_id, FIRE_AT)])
+        db.commit()
+
+    for attempt, expected_delay in ((1, 60), (2, 120)):
+        started = datetime.datetime.now(datetime.UTC)
+        notifications.dispatch_outbox()
+        with get_sync_db_session() as db:
+            [row] = outbox_rows(db, user_id)
+            assert (row.status, row.attempts, row.last_error) == ("retrying", attempt, "Bad Gateway")
+            delay = (row.next_attempt_at - started).total_seconds()
+            assert expected_delay <= delay < expected_delay + 30
+            # Make the retry due now instead of waiting out the backoff
+            db.execute(
+                update(NotificationOutbox)
+                .where(NotificationOutbox.id == row.id)
+                .values(next_attempt_at=started - datetime.timedelta(seconds=1))
+            )
+            db.commit()
+
+    notifications.dispatch_outbox()
+    with get_sync_db_session() as db:
+        [row] = outbox_rows(db, user_id)
+    assert (row.status, row.attempts) == ("failed", 3)
+    assert sum(chat_id in dict(batch) for batch in engine.batches) == 3
+    with get_sync_db_session() as db:
+        assert not [row for row in crud.claim_outbox_batch_sync(db, 10_000, 300) if row.user_id == user_id]
+        db.rollback()
+
+
+def test_prune_drops_only_finished_rows(owner):
+    user_id, chat_id, habit_ids = owner
+    with get_sync_db_session() as db:
+        crud.enqueue_reminders_sync(db, [(habit_id, user_id, FIRE_AT) for habit_id in habit_ids])
+        db.commit()
+        sent, failed, pending = (row.id for row in outbox_rows(db, user_id))
+        crud.mark_outbox_sync(db, [sent], "sent")
+        crud.mark_outbox_sync(db, [failed], "failed", "Forbidden: bot was blocked by the user")
+        db.commit()
+
+        crud.prune_outbox_sync(db, datetime.datetime.now(datetime.UTC) - datetime.timedelta(days=1))
+        db.commit()
+        assert len(outbox_rows(db, user_id)) == 3
+
+        crud.prune_outbox_sync(db, datetime.datetime.now(datetime.UTC) + datetime.timedelta(minutes=1))
+        db.commit()
+        assert [row.id for row in outbox_rows(db, user_id)] == [pending]
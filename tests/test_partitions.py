@@ -0,0 +1,39 @@
+import datetime
+
+from app.tasks import partitions
+
+
+def test_month_arithmetic_and_names():
+    assert partitions.month_start(datetime.date(2026, 2, 17)) == datetime.date(2026, 2, 1)
+    assert partitions.next_month(datetime.date(2026, 12, 1)) == datetime.date(2027, 1, 1)
+    assert partitions.next_month(datetime.date(2026, 1, 1)) == datetime.date(2026, 2, 1)
+    assert partitions.partition_name(datetime.date(2026, 3, 1)) == "records_y2026m03"
+
+
+class RecordingSession:
+    def __init__(self, existing):
+        self.existing = existing
+        self.statements = []
+        self.committed = False
+
+    def execute(self, statement, params=None):
+        self.statements.append((str(statement), params))
+        outer = self
+
+        class Result:
+            def scalar(self):
+                return params["name"] if params["name"] in outer.existing else None
+
+        return Result()
+
+    def commit(self):
+        self.committed = True
+
+
+def test_ensure_partitions_only_creates_missing_months():
+    db = RecordingSession(existing={"records_y2026m10"})
+    created = partitions.ensure_partitions_sync(db, months_ahead=2, today=datetime.date(2026, 10, 18))
+    assert created == ["records_y2026m11", "records_y2026m12"]
+    assert db.committed
+    attach = [statement for statement, _ in db.statements if "ATTACH PARTITION" in statement]
+    assert attach[-1].endswith("FOR VALUES FROM ('2026-12-01 00:00:00+00') TO ('2027-01-01 00:00:00+00')")
@@ -0,0 +1,14 @@
+import pytest
+
+from app.core import passwords
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_outdated_hash_is_upgraded():
+    old_hash = passwords.pwd_context.hash(b"password123", rounds=4)
+    valid, new_hash = await passwords.verify_password("password123", old_hash)
+    assert valid
+    assert new_hash is not None and new_hash != old_hash
+
+    valid, new_hash = await passwords.verify_password("wrong", old_hash)
+    assert not valid and new_hash is None
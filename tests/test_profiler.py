@@ -0,0 +1,72 @@
+from sqlalchemy import create_engine, text
+
+from app.core import profiler
+from app.core.config import settings
+
+
+def test_profile_groups_statements_and_flags_repeats(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "SQL_PROFILE_SLOW_MS", 10_000)
+    engine = create_engine("sqlite://")
+    profiler.instrument_engine(engine)
+    try:
+        with engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+            with profiler.profile("GET /habits/", enabled=True) as current:
+                for habit_id in range(settings.SQL_PROFILE_REPEAT_THRESHOLD):
+                    connection.execute(text("SELECT :id"), {"id": habit_id})
+                connection.execute(text("SELECT 2"))
+    finally:
+        engine.dispose()
+
+    assert [group.count for group in current.groups.values()] == [settings.SQL_PROFILE_REPEAT_THRESHOLD, 1]
+    assert [group.statement for group in current.repeated] == ["SELECT ?"]
+    report = capsys.readouterr().out
+    assert "[PROFILE] GET /habits/: 6 statements" in report
+    assert "N+1? 5 identical statements: SELECT ?" in report
+
+
+def test_slow_statements_capture_a_plan(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "SQL_PROFILE_SLOW_MS", 0)
+    engine = create_engine("sqlite://")
+    profiler.instrument_engine(engine)
+    try:
+        with profiler.profile("task", enabled=True) as current, engine.connect() as connection:
+            connection.execute(text("SELECT 1"))
+    finally:
+        engine.dispose()
+
+    # SQLite has no EXPLAIN (ANALYZE, BUFFERS); the failure is reported instead of raised
+    assert len(current.slow) == 1
+    assert current.slow[0].plan[0].startswith("EXPLAIN failed")
+
+
+def test_profile_is_off_by_default():
+    with profiler.profile("GET /") as current:
+        assert current is None
+
+
+def test_only_side_effect_free_selects_are_analyzed():
+    assert profiler.can_analyze("SELECT habits.id FROM habits WHERE habits.updated_at > $1")
+    assert profiler.can_analyze("WITH recent AS (SELECT 1) SELECT * FROM recent")
+    assert not profiler.can_analyze("SELECT habits.id FROM habits WHERE habits.id = $1 FOR UPDATE")
+    assert not profiler.can_analyze("SELECT id FROM notification_outbox FOR UPDATE SKIP LOCKED")
+    assert not profiler.can_analyze("SELECT id FROM habits FOR KEY SHARE")
+    assert not profiler.can_analyze("WITH moved AS (DELETE FROM records RETURNING *) INSERT INTO records SELECT * FROM moved")
+    assert not profiler.can_analyze("UPDATE habits SET title = $1")
+
+
+def test_failed_explain_leaves_the_transaction_usable(monkeypatch, capsys):
+    monkeypatch.setattr(settings, "SQL_PROFILE_SLOW_MS", 0)
+    engine = create_engine("sqlite://")
+    profiler.instrument_engine(engine)
+    try:
+        with engine.begin() as connection:
+            connection.execute(text("CREATE TABLE items (id INTEGER PRIMARY KEY)"))
+            with profiler.profile("task", enabled=True) as current:
+                connection.execute(text("INSERT INTO items (id) VALUES (1)"))
+                connection.execute(text("SELECT id FROM items"))
+                assert connection.execute(text("SELECT count(*) FROM items")).scalar() == 1
+    finally:
+        engine.dispose()
+
+    assert current.slow[1].plan[0].startswith("EXPLAIN failed")
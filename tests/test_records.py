@@ -0,0 +1,133 @@
+import datetime
+import json
+import random
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app import archive
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+from app.main import app
+from app.tasks.archive import archive_habit
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_records_keyset_pagination():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        habit = (await client.post("/habits/", json={"title": "Stretch"}, headers=headers)).json()
+        for day in range(1, 6):
+            await client.post("/records/", json={
+                "habit_id": habit["id"],
+                "date": f"2025-03-0{day}T07:00:00+00:00"
+            }, headers=headers)
+
+        params = {"habit_id": habit["id"], "from": "2025-03-02T00:00:00+00:00", "limit": 2}
+        seen = []
+        while True:
+            response = await client.get("/records/", params=params, headers=headers)
+            assert response.status_code == 200
+            seen += [r["date"][:10] for r in response.json()]
+            if "X-Next-Cursor" not in response.headers:
+                break
+            params["cursor"] = response.headers["X-Next-Cursor"]
+
+        assert seen == ["2025-03-02", "2025-03-03", "2025-03-04", "2025-03-05"]
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_bulk_import_reports_row_errors():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        habit = (await client.post("/habits/", json={"title": "Journal"}, headers=headers)).json()
+
+        response = await client.post("/records/bulk", json=[
+            {"habit_id": habit["id"], "date": "2024-01-01T09:00:00+00:00"},
+            {"habit_id": habit["id"], "date": "not a date"},
+            {"habit_id": habit["id"], "date": "2024-01-02T09:00:00+00:00"},
+        ], headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["inserted"] == 2
+        assert [e["index"] for e in data["errors"]] == [1]
+
+        csv_body = f"habit_id,date\n{habit['id']},2024-01-03T09:00:00+00:00\n0,2024-01-04T09:00:00+00:00\n"
+        response = await client.post(
+            "/records/bulk",
+            files={"file": ("records.csv", csv_body, "text/csv")},
+            headers=headers,
+        )
+        data = response.json()
+        assert data["inserted"] == 1
+        assert data["errors"] == [{"index": 1, "error": "Habit not found"}]
+
+        stats = (await client.get(f"/habits/{habit['id']}/stats", headers=headers)).json()
+        assert stats["total_completions"] == 3
+        assert stats["longest_streak"] == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_delete_archived_record(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    archive.load.cache_clear()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        habit = (await client.post("/habits/", json={"title": "Floss"}, headers=headers)).json()
+        old = []
+        for day in (1, 2):
+            old.append((await client.post("/records/", json={
+                "habit_id": habit["id"],
+                "date": f"2020-01-0{day}T07:00:00+00:00"
+            }, headers=headers)).json())
+        with get_sync_db_session() as db:
+            assert archive_habit(db, habit["id"], datetime.datetime(2021, 1, 1, tzinfo=datetime.UTC)) == 2
+
+        listed = (await client.get("/records/", params={"habit_id": habit["id"]}, headers=headers)).json()
+        assert [r["id"] for r in listed] == [old[0]["id"], old[1]["id"]]
+
+        response = await client.delete(f"/records/{old[0]['id']}", params={"habit_id": habit["id"]}, headers=headers)
+        assert response.status_code == 200
+        response = await client.post("/batch", json={"operations": [
+            {"op": "delete_record", "habit_id": habit["id"], "record_id": old[1]["id"]},
+            {"op": "delete_record", "habit_id": habit["id"], "record_id": old[1]["id"]},
+        ]}, headers=headers)
+        assert [r["status"] for r in response.json()["results"]] == [200, 404]
+
+        listed = (await client.get("/records/", params={"habit_id": habit["id"]}, headers=headers)).json()
+        assert listed == []
+        stats = (await client.get(f"/habits/{habit['id']}/stats", headers=headers)).json()
+        assert stats["total_completions"] == 0
+        export = (await client.get("/export/", headers=headers)).text.splitlines()
+        assert [json.loads(line)["type"] for line in export] == ["habit"]
+    archive.load.cache_clear()
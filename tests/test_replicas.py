@@ -0,0 +1,52 @@
+import pytest
+
+from app.core import database, replicas
+from app.core.config import settings
+
+
+@pytest.fixture
+def replica_set(monkeypatch):
+    # Nothing listens on port 1, so every replica is unreachable
+    monkeypatch.setattr(settings, "DB_REPLICA_RETRY_SECONDS", 60)
+    replica_set = replicas.ReplicaSet(["127.0.0.1:1", "localhost:1"])
+    monkeypatch.setattr(replicas, "replica_set", replica_set)
+    monkeypatch.setattr(replicas, "is_pinned", _not_pinned)
+    return replica_set
+
+
+async def _not_pinned(user_id):
+    return False
+
+
+def test_round_robin_rotates_through_healthy_replicas(replica_set):
+    first, second = replica_set.replicas
+    assert replica_set.candidates() == [first, second]
+    assert replica_set.candidates() == [second, first]
+    replica_set.mark_down(first)
+    assert replica_set.candidates() == [second]
+
+
+def test_unknown_strategy_is_rejected():
+    with pytest.raises(ValueError):
+        replicas.ReplicaSet([], "random")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_read_session_falls_back_to_primary_when_replicas_are_down(replica_set):
+    async with replicas.read_session(1) as session:
+        assert session.bind is database.engine
+    assert not any(replica.healthy for replica in replica_set.replicas)
+    assert replica_set.candidates() == []
+    await replica_set.dispose()
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_pinned_users_read_from_primary(replica_set, monkeypatch):
+    async def pinned(user_id):
+        return True
+
+    monkeypatch.setattr(replicas, "is_pinned", pinned)
+    async with replicas.read_session(1) as session:
+        assert session.bind is database.engine
+    assert all(replica.healthy for replica in replica_set.replicas)
+    await replica_set.dispose()
@@ -0,0 +1,108 @@
+import pytest
+from starlette.requests import Request
+
+from app.core import response_cache
+from app.core.config import settings
+
+
+class MemoryRedis:
+    def __init__(self):
+        self.data = {}
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def set(self, key, value, ex=None, nx=False):
+        if nx and key in self.data:
+            return None
+        self.data[key] = value.encode() if isinstance(value, str) else value
+        return True
+
+
+def make_request(query: str = "", if_none_match: str | None = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "method": "GET", "path": "/habits/", "query_string": query.encode(), "headers": headers})
+
+
+@pytest.fixture
+def redis(monkeypatch):
+    memory = MemoryRedis()
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", True)
+    monkeypatch.setattr(response_cache, "get_redis", lambda: memory)
+    return memory
+
+
+@pytest.mark.asyncio
+async def test_cached_response_serves_hits_and_304_until_version_bump(redis):
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return b"[]", {"X-Next-Cursor": "abc"}
+
+    first = await response_cache.cached_response(make_request(), 7, build)
+    etag = first.headers["etag"]
+    second = await response_cache.cached_response(make_request(), 7, build)
+    assert len(calls) == 1
+    assert second.body == b"[]" and second.headers["x-next-cursor"] == "abc"
+    assert second.headers["etag"] == etag
+
+    not_modified = await response_cache.cached_response(make_request(if_none_match=etag), 7, build)
+    assert not_modified.status_code == 304
+    assert len(calls) == 1
+
+    await response_cache.bump_user_version(7)
+    fresh = await response_cache.cached_response(make_request(if_none_match=etag), 7, build)
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
+    assert len(calls) == 2
+
+
+@pytest.mark.asyncio
+async def test_cached_response_separates_queries_and_users(redis):
+    async def build():
+        return b"[]", {}
+
+    base = await response_cache.cached_response(make_request("limit=10"), 7, build)
+    other_query = await response_cache.cached_response(make_request("limit=20"), 7, build)
+    other_user = await response_cache.cached_response(make_request("limit=10"), 8, build)
+    assert len({base.headers["etag"], other_query.headers["etag"], other_user.headers["etag"]}) == 3
+
+
+@pytest.mark.asyncio
+async def test_cached_response_disabled_builds_without_etag(monkeypatch):
+    monkeypatch.setattr(settings, "RESPONSE_CACHE_ENABLED", False)
+
+    async def build():
+        return b"[1]", {}
+
+    response = await response_cache.cached_response(make_request(), 7, build)
+    assert response.body == b"[1]"
+    assert "etag" not in response.headers
+
+
+@pytest.mark.asyncio
+async def test_replica_build_is_not_cached_after_a_concurrent_write(redis, monkeypatch):
+    pinned = False
+
+    async def is_pinned(user_id):
+        return pinned
+
+    async def build():
+        return b"[]", {}
+
+    monkeypatch.setattr(response_cache.replicas, "is_pinned", is_pinned)
+    cached = await response_cache.cached_response(make_request(), 7, build, replica=True)
+    assert "etag" in cached.headers
+
+    # A write pinned the user and bumped the version while the replica was being read
+    await response_cache.bump_user_version(7)
+    pinned = True
+    stored = len(redis.data)
+    stale = await response_cache.cached_response(make_request(), 7, build, replica=True)
+    assert "etag" not in stale.headers
+    assert len(redis.data) == stored
+
+    primary = await response_cache.cached_response(make_request(), 7, build)
+    assert "etag" in primary.headers
+    assert len(redis.data) == stored + 1
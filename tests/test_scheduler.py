@@ -0,0 +1,84 @@
+import datetime
+import random
+
+import pytest
+from sqlalchemy import delete, select
+
+from app import crud
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+from app.models import Habit, NotificationOutbox, User
+from app.tasks import scheduler
+
+
+@pytest.fixture
+def user_id():
+    suffix = random.randint(1, 10_000_000)
+    with get_sync_db_session() as db:
+        user = User(email=f"scheduler{suffix}", password_hash="x", telegram_chat_id=f"chat-{suffix}")
+        db.add(user)
+        db.commit()
+        user_id = user.id
+    yield user_id
+    with get_sync_db_session() as db:
+        db.execute(delete(NotificationOutbox).where(NotificationOutbox.user_id == user_id))
+        db.execute(delete(Habit).where(Habit.user_id == user_id))
+        db.execute(delete(User).where(User.id == user_id))
+        db.commit()
+
+
+def add_habit(user_id: int, next_reminder_at: datetime.datetime) -> int:
+    with get_sync_db_session() as db:
+        habit = Habit(title="Stretch", user_id=user_id, reminder_date=next_reminder_at, next_reminder_at=next_reminder_at)
+        db.add(habit)
+        db.commit()
+        return habit.id
+
+
+def test_due_reminder_is_claimed_once(user_id):
+    fire_at = datetime.datetime.now(datetime.UTC) - datetime.timedelta(minutes=1)
+    due = add_habit(user_id, fire_at)
+    later = add_habit(user_id, fire_at + datetime.timedelta(days=1))
+
+    with get_sync_db_session() as first, get_sync_db_session() as second:
+        claimed = [row for row in crud.claim_due_reminders_sync(first, 10_000) if row[1] == user_id]
+        assert claimed == [(due, user_id, fire_at)]
+        # A second scheduler skips the locked habit instead of firing it again
+        assert not [row for row in crud.claim_due_reminders_sync(second, 10_000) if row[1] == user_id]
+        second.rollback()
+        first.commit()
+        assert not [row for row in crud.claim_due_reminders_sync(second, 10_000) if row[1] == user_id]
+        second.rollback()
+
+    with get_sync_db_session() as db:
+        schedule = dict(db.execute(select(Habit.id, Habit.next_reminder_at).where(Habit.user_id == user_id)).all())
+    assert schedule[due] is None
+    assert schedule[later] == fire_at + datetime.timedelta(days=1)
+
+
+def test_enqueue_due_reminders_moves_claims_to_the_outbox(user_id, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_BATCH_SIZE", 10_000)
+    fire_at = datetime.datetime.now(datetime.UTC) - datetime.timedelta(minutes=1)
+    habit_id = add_habit(user_id, fire_at)
+
+    scheduler.enqueue_due_reminders()
+    scheduler.enqueue_due_reminders()
+    with get_sync_db_session() as db:
+        rows = db.execute(
+            select(NotificationOutbox.habit_id, NotificationOutbox.fire_at)
+            .where(NotificationOutbox.user_id == user_id)
+        ).all()
+    assert rows == [(habit_id, fire_at)]
+
+
+def test_next_wake_time_is_the_earliest_pending_reminder(user_id, monkeypatch):
+    monkeypatch.setattr(settings, "REMINDER_MAX_SLEEP_SECONDS", 3600)
+    soon = datetime.datetime.now(datetime.UTC) + datetime.timedelta(minutes=10)
+    add_habit(user_id, soon + datetime.timedelta(minutes=5))
+    add_habit(user_id, soon)
+
+    with get_sync_db_session() as db:
+        next_at = crud.next_reminder_time_sync(db)
+    # Reminders of other users in the database may come even earlier
+    assert next_at is not None and next_at <= soon
+    assert 0 <= scheduler.seconds_until_next_reminder() <= 10 * 60
@@ -0,0 +1,69 @@
+import datetime
+import gzip
+import json
+
+import brotli
+import msgpack
+from pydantic import TypeAdapter
+from starlette.requests import Request
+
+from app import schemas
+from app.core import serialization
+
+
+def make_request(accept: str = "", accept_encoding: str = "") -> Request:
+    headers = [(b"accept", accept.encode()), (b"accept-encoding", accept_encoding.encode())]
+    return Request({"type": "http", "method": "GET", "path": "/", "query_string": b"", "headers": headers})
+
+
+ROWS = [
+    (1, datetime.datetime(2025, 3, 1, 8, 30, tzinfo=datetime.UTC), 10),
+    (1, datetime.datetime(2025, 3, 2, 8, 30, 0, 123456, tzinfo=datetime.UTC), 11),
+]
+
+
+def test_json_matches_response_model_output():
+    body = serialization.encode_rows(serialization.RECORD_COLUMNS, ROWS)
+    models = [schemas.RecordOut(habit_id=h, date=d, id=i) for h, d, i in ROWS]
+    assert json.loads(body) == json.loads(TypeAdapter(list[schemas.RecordOut]).dump_json(models))
+
+    habits = [("Read", None, None, 3)]
+    habit_models = [schemas.HabitOut(title="Read", description=None, reminder_date=None, id=3)]
+    assert json.loads(serialization.encode_rows(serialization.HABIT_COLUMNS, habits)) == [
+        model.model_dump(mode="json") for model in habit_models
+    ]
+
+
+def test_msgpack_round_trip_uses_iso_dates():
+    body = serialization.encode_rows(serialization.RECORD_COLUMNS, ROWS, serialization.MSGPACK)
+    decoded = msgpack.unpackb(body)
+    assert decoded == json.loads(serialization.encode_rows(serialization.RECORD_COLUMNS, ROWS))
+
+
+def test_negotiate_prefers_highest_quality():
+    assert serialization.negotiate(make_request()) == (serialization.JSON, None)
+    assert serialization.negotiate(make_request("application/msgpack")).media_type == serialization.MSGPACK
+    assert serialization.negotiate(
+        make_request("application/json, application/msgpack;q=0.5")
+    ).media_type == serialization.JSON
+    assert serialization.negotiate(make_request(accept_encoding="gzip, br")).encoding == "gzip"
+    assert serialization.negotiate(make_request(accept_encoding="gzip;q=0.5, br")).encoding == "br"
+    assert serialization.negotiate(make_request(accept_encoding="br;q=0, deflate")).encoding is None
+
+
+def test_render_rows_compresses_large_bodies_only():
+    small, headers = serialization.render_rows(
+        serialization.Representation(serialization.JSON, "gzip"), serialization.RECORD_COLUMNS, ROWS
+    )
+    assert "Content-Encoding" not in headers
+
+    rows = ROWS * 200
+    plain = serialization.encode_rows(serialization.RECORD_COLUMNS, rows)
+    gzipped, headers = serialization.render_rows(
+        serialization.Representation(serialization.JSON, "gzip"), serialization.RECORD_COLUMNS, rows
+    )
+    assert headers["Content-Encoding"] == "gzip" and gzip.decompress(gzipped) == plain
+    brotlied, headers = serialization.render_rows(
+        serialization.Representation(serialization.JSON, "br"), serialization.RECORD_COLUMNS, rows
+    )
+    assert headers["Content-Encoding"] == "br" and brotli.decompress(brotlied) == plain
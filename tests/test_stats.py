@@ -0,0 +1,114 @@
+import datetime
+import random
+from types import SimpleNamespace
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+from app.main import app
+from app import stats
+
+
+def at(day):
+    return datetime.datetime.combine(day, datetime.time(12), tzinfo=datetime.UTC)
+
+
+def empty_stats():
+    return SimpleNamespace(**stats.compute_stats([], 0, None))
+
+
+def test_incremental_stats_match_full_recompute():
+    today = datetime.date(2026, 3, 15)
+    days = [today - datetime.timedelta(days=n) for n in (40, 12, 11, 10, 3, 2, 1, 0)]
+    habit_stats = empty_stats()
+    for day in days:
+        assert stats.apply_completion(habit_stats, at(day))
+
+    expected = stats.compute_stats(days, len(days), at(today))
+    assert vars(habit_stats) == expected
+    assert habit_stats.current_streak == 4
+    assert habit_stats.longest_streak == 4
+
+    snapshot = stats.snapshot(1, habit_stats, today)
+    assert snapshot["completion_rate_7d"] == round(4 / 7, 4)
+    assert snapshot["completion_rate_30d"] == round(7 / 30, 4)
+
+
+def test_backdated_record_requires_recompute():
+    today = datetime.date(2026, 3, 15)
+    habit_stats = empty_stats()
+    stats.apply_completion(habit_stats, at(today))
+    assert not stats.apply_completion(habit_stats, at(today - datetime.timedelta(days=1)))
+    # Same day as an existing completion only bumps the total
+    assert stats.apply_completion(habit_stats, at(today) - datetime.timedelta(hours=1))
+    assert habit_stats.total_completions == 2
+
+
+def test_broken_streak_reads_as_zero():
+    today = datetime.date(2026, 3, 15)
+    habit_stats = empty_stats()
+    stats.apply_completion(habit_stats, at(today - datetime.timedelta(days=3)))
+    assert stats.snapshot(1, habit_stats, today)["current_streak"] == 0
+    assert stats.snapshot(1, habit_stats, today)["longest_streak"] == 1
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_habit_stats_endpoint():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        habit = (await client.post("/habits/", json={"title": "Read"}, headers=headers)).json()
+        now = datetime.datetime.now(datetime.UTC)
+        for days_ago in (2, 1, 0):
+            response = await client.post("/records/", json={
+                "habit_id": habit["id"],
+                "date": (now - datetime.timedelta(days=days_ago)).isoformat()
+            }, headers=headers)
+            assert response.status_code == 200
+
+        response = await client.get(f"/habits/{habit['id']}/stats", headers=headers)
+        assert response.status_code == 200
+        data = response.json()
+        assert data["total_completions"] == 3
+        assert data["current_streak"] == 3
+        assert data["longest_streak"] == 3
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_naive_record_date_on_existing_day():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+
+        habit = (await client.post("/habits/", json={"title": "Meditate"}, headers=headers)).json()
+        response = await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2025-01-01T07:00:00+00:00"
+        }, headers=headers)
+        assert response.status_code == 200
+        response = await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2025-01-01T08:00:00"
+        }, headers=headers)
+        assert response.status_code == 200
+
+        data = (await client.get(f"/habits/{habit['id']}/stats", headers=headers)).json()
+        assert data["total_completions"] == 2
@@ -0,0 +1,100 @@
+import datetime
+import random
+
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from app import archive, crud
+from app.core.config import settings
+from app.core.sync_database import get_sync_db_session
+from app.main import app
+from app.tasks.archive import archive_habit
+
+
+def test_sync_cursor_round_trip():
+    issued_at = datetime.datetime(2026, 5, 1, 12, 30, tzinfo=datetime.UTC)
+    assert crud.decode_sync_cursor(crud.encode_sync_cursor(123456, issued_at)) == (123456, issued_at)
+    with pytest.raises(ValueError):
+        crud.decode_sync_cursor("bm90LWEtY3Vyc29y")
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_sync_returns_changes_since_cursor():
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        habit = (await client.post("/habits/", json={"title": "Walk"}, headers=headers)).json()
+        first = (await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2025-04-01T07:00:00+00:00"
+        }, headers=headers)).json()
+
+        full = (await client.get("/sync", headers=headers)).json()
+        assert full["reset"] is True
+        assert [h["id"] for h in full["habits"]] == [habit["id"]]
+        assert [r["id"] for r in full["records"]] == [first["id"]]
+
+        idle = (await client.get("/sync", params={"cursor": full["cursor"]}, headers=headers)).json()
+        assert idle["reset"] is False
+        assert idle["habits"] == idle["records"] == idle["deleted_records"] == []
+
+        second = (await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2025-04-02T07:00:00+00:00"
+        }, headers=headers)).json()
+        await client.delete(f"/records/{first['id']}", params={"habit_id": habit["id"]}, headers=headers)
+
+        delta = (await client.get("/sync", params={"cursor": idle["cursor"]}, headers=headers)).json()
+        assert [r["id"] for r in delta["records"]] == [second["id"]]
+        assert delta["deleted_records"] == [first["id"]]
+
+        response = await client.get("/sync", params={"cursor": "garbage"}, headers=headers)
+        assert response.status_code == 400
+
+
+@pytest.mark.asyncio(loop_scope="session")
+async def test_full_sync_includes_archived_records(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ARCHIVE_DIR", str(tmp_path))
+    archive.load.cache_clear()
+    transport = ASGITransport(app=app)
+    async with AsyncClient(transport=transport, base_url="http://test") as client:
+        email = "email" + str(random.randint(1, 100000))
+        await client.post("/users/register", json={
+            "email": email,
+            "password": "password123"
+        })
+        login_resp = await client.post("/users/token", data={
+            "username": email,
+            "password": "password123"
+        })
+        headers = {"Authorization": f"Bearer {login_resp.json()['access_token']}"}
+        habit = (await client.post("/habits/", json={"title": "Swim"}, headers=headers)).json()
+        old = (await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2020-01-10T07:00:00+00:00"
+        }, headers=headers)).json()
+        recent = (await client.post("/records/", json={
+            "habit_id": habit["id"],
+            "date": "2025-04-01T07:00:00+00:00"
+        }, headers=headers)).json()
+        cursor = (await client.get("/sync", headers=headers)).json()["cursor"]
+
+        cutoff = datetime.datetime(2021, 1, 1, tzinfo=datetime.UTC)
+        with get_sync_db_session() as db:
+            assert archive_habit(db, habit["id"], cutoff) == 1
+
+        full = (await client.get("/sync", headers=headers)).json()
+        assert [r["id"] for r in full["records"]] == [old["id"], recent["id"]]
+        # Archival is not a deletion
+        delta = (await client.get("/sync", params={"cursor": cursor}, headers=headers)).json()
+        assert delta["deleted_records"] == []
+    archive.load.cache_clear()
@@ -0,0 +1,35 @@
+from app.tasks.telegram import TelegramDeliveryEngine
+from tests.telegram_stub import StubServer, create_app
+
+
+def test_delivery_engine_honors_retry_after():
+    stub = create_app(global_rate=100, per_chat_rate=2, retry_after=1)
+    with StubServer(stub) as server:
+        # The engine's own per-chat limit is looser than the server's, so 429s happen
+        engine = TelegramDeliveryEngine("token", base_url=server.url, per_chat_rate=100, concurrency=4)
+        messages = [(f"chat-{chat}", f"message {n}") for chat in range(3) for n in range(3)]
+        try:
+            results = engine.send_batch(messages)
+        finally:
+            engine.close()
+
+    assert all(result.ok for result in results)
+    assert stub.state.throttled > 0
+    assert sorted(stub.state.delivered) == sorted(messages)
+    # Messages to one chat keep their order
+    chat_0 = [text for chat_id, text in stub.state.delivered if chat_id == "chat-0"]
+    assert chat_0 == ["message 0", "message 1", "message 2"]
+
+
+def test_permanent_errors_are_not_retried():
+    stub = create_app()
+    with StubServer(stub) as server:
+        engine = TelegramDeliveryEngine("token", base_url=server.url)
+        try:
+            [result] = engine.send_batch([("chat-1", "")])
+        finally:
+            engine.close()
+
+    assert not result.ok
+    assert result.attempts == 1
+    assert not result.retryable